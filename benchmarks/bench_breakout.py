@@ -0,0 +1,51 @@
+"""
+Per-publish cost of breaking a device all publish out into point topics as devices get wider.
+Compares the projected breakout new_data uses (consumed points only, no meta) with breaking out
+every point and its meta.
+
+    python benchmarks/bench_breakout.py --points 20 200 1000
+"""
+import argparse
+import logging
+import timeit
+
+from ilc.ilc_agent import ILCAgent
+from ilc.projection import PointProjection
+
+DEVICE = "CAMPUS/BUILDING/RTU1"
+CONSUMED = ["FirstStageCooling", "ZoneTemperature", "ZoneTemperatureSetPoint", "SupplyFanStatus",
+            "OutdoorAirTemperature"]
+
+
+def publish(point_count):
+    values = dict((point, 1.0) for point in CONSUMED)
+    for i in range(point_count - len(CONSUMED)):
+        values["Analog Value {}".format(i)] = float(i)
+    meta = dict((point, {"units": "degreesFahrenheit", "type": "float", "tz": "US/Pacific"}) for point in values)
+    return [values, meta]
+
+
+def run(point_counts, messages):
+    agent = ILCAgent(None)
+    projection = PointProjection(DEVICE + "/" + point for point in CONSUMED)
+    topic = "devices/{}/all".format(DEVICE)
+    print("{:>8} {:>18} {:>18}".format("points", "projected us/msg", "full us/msg"))
+    for count in point_counts:
+        message = publish(count)
+        projected = timeit.timeit(lambda: agent.breakout_all_publish(topic, message, projection, include_meta=False),
+                                  number=messages)
+        full = timeit.timeit(lambda: agent.breakout_all_publish(topic, message), number=messages)
+        print("{:>8} {:>18.1f} {:>18.1f}".format(count, projected / messages * 1e6, full / messages * 1e6))
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--points", type=int, nargs="+", default=[20, 200, 1000])
+    arg_parser.add_argument("--messages", type=int, default=200)
+    args = arg_parser.parse_args()
+    logging.disable(logging.CRITICAL)
+    run(args.points, args.messages)
+
+
+if __name__ == "__main__":
+    main()
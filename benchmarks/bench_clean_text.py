@@ -0,0 +1,47 @@
+"""
+Cost of cleaning the point names of a device publish.  Compares utils.clean_text, which uses a
+precompiled translation table and a memo, with the previous implementation that compiled a regular
+expression on every call.
+
+    python benchmarks/bench_clean_text.py --points 200 --messages 500
+"""
+import argparse
+import logging
+import re
+import timeit
+
+from ilc.utils import clean_text, parse_sympy
+
+
+def legacy_clean_text(text, rep=None):
+    rep = rep if rep else {" ": ""}
+    rep = dict((re.escape(k), v) for k, v in rep.items())
+    pattern = re.compile("|".join(rep.keys()))
+    return pattern.sub(lambda m: rep[re.escape(m.group(0))], text)
+
+
+def run(point_count, messages):
+    names = ["Analog Value {}".format(i) if i % 2 else "AnalogValue{}".format(i) for i in range(point_count)]
+    values = dict((name, float(i)) for i, name in enumerate(names))
+    results = [
+        ("clean_text", lambda: [clean_text(name) for name in names]),
+        ("legacy clean_text", lambda: [legacy_clean_text(name) for name in names]),
+        ("parse_sympy(dict)", lambda: parse_sympy(values)),
+    ]
+    print("{:>20} {:>16} {:>16}".format("", "us/publish", "ns/name"))
+    for label, func in results:
+        elapsed = timeit.timeit(func, number=messages) / messages
+        print("{:>20} {:>16.1f} {:>16.1f}".format(label, elapsed * 1e6, elapsed / point_count * 1e9))
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--points", type=int, default=200)
+    arg_parser.add_argument("--messages", type=int, default=500)
+    args = arg_parser.parse_args()
+    logging.disable(logging.CRITICAL)
+    run(args.points, args.messages)
+
+
+if __name__ == "__main__":
+    main()
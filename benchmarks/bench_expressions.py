@@ -0,0 +1,70 @@
+"""
+Compare sympy substitution against the compiled expression path used by FormulaCriterion,
+DeviceStatus and ControlSetting.
+
+    python benchmarks/bench_expressions.py --formulas 2000
+"""
+import argparse
+import logging
+import random
+import timeit
+
+from sympy.parsing.sympy_parser import parse_expr
+
+from ilc.expressions import CompiledExpression
+from ilc.utils import parse_sympy
+
+FORMULAS = [
+    ("1/(AverageZoneTemperature-CoolingTemperatureSetPoint)", ["AverageZoneTemperature", "CoolingTemperatureSetPoint"]),
+    ("Abs(ZoneTemperature-ZoneSetPoint)*SupplyFanSpeed/100.0", ["ZoneTemperature", "ZoneSetPoint", "SupplyFanSpeed"]),
+    ("2809.8*FirstStageCooling-500.0", ["FirstStageCooling"]),
+]
+
+CONDITIONS = [
+    ("FirstStageCooling", ["FirstStageCooling"]),
+    (["Eq(CompressorCommand,1)", "&", "Eq(ReversingValve,0)"], ["CompressorCommand", "ReversingValve"]),
+    (["ZoneTemperature > 72.0", "|", "SupplyFanStatus < 1"], ["ZoneTemperature", "SupplyFanStatus"]),
+]
+
+
+def build(count, templates, condition=False):
+    expressions = []
+    for i in range(count):
+        operation, args = templates[i % len(templates)]
+        expr = parse_expr(parse_sympy(operation, condition=condition))
+        values = {arg: random.uniform(60.0, 80.0) for arg in args}
+        expressions.append((CompiledExpression(expr, args), values))
+    return expressions
+
+
+def run(label, expressions, repeat):
+    count = len(expressions)
+
+    def sympy_pass():
+        for compiled, values in expressions:
+            compiled.subs(values)
+
+    def compiled_pass():
+        for compiled, values in expressions:
+            compiled.evaluate(values)
+
+    sympy_time = min(timeit.repeat(sympy_pass, number=1, repeat=repeat))
+    compiled_time = min(timeit.repeat(compiled_pass, number=1, repeat=repeat))
+    print("{}: {}".format(label, count))
+    print("sympy subs:  {:10.3f} ms/pass  {:8.2f} us/expr".format(sympy_time * 1e3, sympy_time / count * 1e6))
+    print("compiled:    {:10.3f} ms/pass  {:8.2f} us/expr".format(compiled_time * 1e3, compiled_time / count * 1e6))
+    print("speedup:     {:10.1f}x".format(sympy_time / compiled_time))
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--formulas", type=int, default=1000)
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    args = arg_parser.parse_args()
+    logging.disable(logging.CRITICAL)
+    run("formulas", build(args.formulas, FORMULAS), args.repeat)
+    run("conditions", build(args.formulas, CONDITIONS, condition=True), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
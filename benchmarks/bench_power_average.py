@@ -0,0 +1,54 @@
+"""
+Per-sample cost of the building power averages as the meter rate grows.  Compares the streaming
+PowerAverager used by ILCAgent.calculate_average_power with the previous approach of copying and
+sorting the whole window on every sample.
+
+    python benchmarks/bench_power_average.py --rates 1 10 --window 15
+"""
+import argparse
+import logging
+import os
+import random
+import sys
+import timeit
+from datetime import datetime, timedelta
+
+from ilc.power_average import PowerAverager
+
+# The reference implementation lives with the tests that check PowerAverager against it.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "tests"))
+from legacy_power_average import LegacyAverager  # noqa: E402
+
+
+def run(rates, window_minutes, samples):
+    window = timedelta(minutes=window_minutes)
+    start = datetime(2026, 7, 1)
+    rng = random.Random(0)
+    print("{:>8} {:>10} {:>18} {:>18}".format("rate Hz", "window N", "streaming us/smp", "legacy us/smp"))
+    for rate in rates:
+        step = timedelta(seconds=1.0 / rate)
+        # Fill the window first so the timed samples all slide a full window.
+        fill = int(window.total_seconds() * rate)
+        data = [(start + step * i, rng.uniform(100.0, 500.0)) for i in range(fill + samples)]
+        results = []
+        for averager in (PowerAverager(window), LegacyAverager(window)):
+            for current_time, current_power in data[:fill]:
+                averager.update(current_time, current_power)
+            timed = data[fill:]
+            elapsed = timeit.timeit(lambda: [averager.update(t, p) for t, p in timed], number=1)
+            results.append(elapsed / samples * 1e6)
+        print("{:>8} {:>10} {:>18.2f} {:>18.2f}".format(rate, fill, *results))
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--rates", type=float, nargs="+", default=[1, 10])
+    arg_parser.add_argument("--window", type=float, default=15, help="averaging window in minutes")
+    arg_parser.add_argument("--samples", type=int, default=200)
+    args = arg_parser.parse_args()
+    logging.disable(logging.CRITICAL)
+    run(args.rates, args.window, args.samples)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Per-message cost of routing a device publish to criteria and control objects as the number of
+configured devices grows.  Compares the routing index built in ILCAgent.setup_topics with the
+previous approach of intersecting every configured topic list on each publish.
+
+    python benchmarks/bench_routing.py --devices 10 100 1000 3000
+"""
+import argparse
+import logging
+import timeit
+from datetime import datetime
+
+from ilc.control_handler import ControlCluster, ControlContainer
+from ilc.criteria_handler import CriteriaCluster, CriteriaContainer
+from ilc.ilc_agent import ILCAgent
+
+EXTRA_POINTS = 50
+
+
+def device_criteria(topic):
+    return {
+        "FirstStageCooling": {
+            "curtail": {
+                "device_topic": topic,
+                "zonetemperature-setpoint": {
+                    "operation": "1/(AverageZoneTemperature-CoolingTemperatureSetPoint)",
+                    "operation_type": "formula",
+                    "operation_args": ["CoolingTemperatureSetPoint", "AverageZoneTemperature"],
+                    "minimum": 0,
+                    "maximum": 10
+                },
+                "rated-power": {"on_value": 6.0, "off_value": 0.0, "operation_type": "status",
+                                "point_name": "FirstStageCooling"},
+                "history-zonetemperature": {"comparison_type": "direct", "operation_type": "history",
+                                            "point_name": "AverageZoneTemperature", "previous_time": 15}
+            }
+        }
+    }
+
+
+def device_control(topic):
+    return {
+        "FirstStageCooling": {
+            "device_topic": topic,
+            "device_status": {"condition": "FirstStageCooling", "device_status_args": ["FirstStageCooling"]},
+            "curtail_settings": {"point": "ZoneTemperatureSetPoint", "control_method": "offset", "offset": 2.0,
+                                 "load": 6.0}
+        }
+    }
+
+
+def build(device_count):
+    topics = ["CAMPUS/BUILDING/RTU{}".format(i) for i in range(device_count)]
+    criteria_container = CriteriaContainer()
+    control_container = ControlContainer()
+    criteria_config = {"RTU{}".format(i): device_criteria(topic) for i, topic in enumerate(topics)}
+    control_config = {"RTU{}".format(i): device_control(topic) for i, topic in enumerate(topics)}
+    criteria_container.add_criteria_cluster(CriteriaCluster(1.0, {}, {}, criteria_config, "record", None))
+    control_container.add_control_cluster(ControlCluster(control_config, "platform.actuator", "record", None))
+    return topics, criteria_container, control_container
+
+
+class Router(object):
+    """Carries just the state ILCAgent.setup_topics/route_data need."""
+    setup_topics = ILCAgent.setup_topics
+    route_data = ILCAgent.route_data
+
+    def __init__(self, criteria_container, control_container):
+        self.criteria_container = criteria_container
+        self.control_container = control_container
+        self.setup_topics()
+
+
+class LegacyRouter(object):
+    """Topic-list intersection routing as it was before the routing index."""
+    def __init__(self, criteria_container, control_container):
+        self.criteria_topics = criteria_container.get_ingest_topic_dict()
+        self.control_topics = control_container.get_ingest_topic_dict()
+        self.all_criteria_topics = [t for lst in self.criteria_topics.values() for t in lst]
+        self.all_control_topics = [t for lst in self.control_topics.values() for t in lst]
+
+    @staticmethod
+    def ingest(all_topics, topic_dict, data_topics, now):
+        device_topics = {}
+        matched = set(all_topics).intersection(set(data_topics))
+        for topic, value in data_topics.items():
+            if topic in matched:
+                device_topics[topic] = value
+        device_set = set(device_topics)
+        for device, topic_lst in topic_dict.items():
+            if set(topic_lst).intersection(device_set):
+                device.ingest_data(now, device_topics)
+
+    def route_data(self, data_topics, now):
+        self.ingest(self.all_criteria_topics, self.criteria_topics, data_topics, now)
+        self.ingest(self.all_control_topics, self.control_topics, data_topics, now)
+
+
+def publish(topic):
+    data = {
+        topic + "/FirstStageCooling": 1,
+        topic + "/AverageZoneTemperature": 74.0,
+        topic + "/CoolingTemperatureSetPoint": 72.0,
+        topic + "/ZoneTemperatureSetPoint": 72.0,
+    }
+    for i in range(EXTRA_POINTS):
+        data["{}/Point{}".format(topic, i)] = float(i)
+    return data
+
+
+def run(device_counts, messages):
+    now = datetime.utcnow()
+    print("{:>8} {:>16} {:>16}".format("devices", "index us/msg", "legacy us/msg"))
+    for count in device_counts:
+        topics, criteria_container, control_container = build(count)
+        samples = [publish(topics[i % count]) for i in range(messages)]
+        routers = (Router(criteria_container, control_container), LegacyRouter(criteria_container, control_container))
+        results = []
+        for router in routers:
+            elapsed = timeit.timeit(lambda: [router.route_data(sample, now) for sample in samples], number=1)
+            results.append(elapsed / messages * 1e6)
+        print("{:>8} {:>16.1f} {:>16.1f}".format(count, *results))
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--devices", type=int, nargs="+", default=[10, 100, 1000])
+    arg_parser.add_argument("--messages", type=int, default=200)
+    args = arg_parser.parse_args()
+    logging.disable(logging.CRITICAL)
+    run(args.devices, args.messages)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Scale benchmarks of the agent's hot paths on synthetic campuses.  Each size gets a configuration from
+ilc.synthetic.generate_campus and is driven through the replay harness' in-process vip and actuator.
+
+Timed per size: startup (agent construction and reset_parameters), new_data ingest, breakout_all_publish,
+pulling the first k devices from iter_score_order (the lazy path modify_load and reset_devices use) after a
+full round of device data and when cached, the full get_score_order for comparison,
+calculate_average_power and modify_load.  Results are printed and written as JSON so runs can be compared across versions.
+
+    python benchmarks/bench_scale.py --devices 100 1000 10000 --output scale.json
+"""
+import argparse
+import copy
+import json
+import logging
+import platform
+import time
+
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+
+from ilc.replay import ReplayHarness
+from ilc.synthetic import generate_campus, generate_recording
+
+START = datetime(2026, 7, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def timed(func, repeat=1):
+    """
+    :return: best wall time of repeat calls in seconds
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def result(devices, name, seconds, operations=1):
+    return {"devices": devices, "benchmark": name, "seconds": seconds, "operations": operations,
+            "us_per_op": seconds / operations * 1e6}
+
+
+def mark_all_dirty(agent):
+    for device in agent.criteria_container.devices.values():
+        for criteria in device.criteria.values():
+            criteria.mark_dirty()
+
+
+def run_size(devices, criteria_count, extra_points, repeat, top_k):
+    config = generate_campus(devices, criteria_count)
+    results = []
+
+    harnesses = []
+    seconds = timed(lambda: harnesses.append(ReplayHarness(copy.deepcopy(config))))
+    results.append(result(devices, "startup", seconds))
+    harness = harnesses[0]
+    agent = harness.agent
+
+    records = generate_recording(config, START, minutes=20, extra_points=extra_points)
+    meter_topic = "devices/{}/all".format(config["power_meter"]["device_topic"])
+    device_records = [record for record in records if record["topic"] != meter_topic]
+    meter_records = [record for record in records if record["topic"] == meter_topic]
+    # History criteria need a window of samples before the timed round.
+    harness.replay(records[:-len(records) // 2])
+    last_round = device_records[-devices:]
+
+    def ingest():
+        for record in last_round:
+            agent.new_data("pubsub", "replay", "", record["topic"], record["headers"], record["message"])
+    results.append(result(devices, "new_data", timed(ingest, repeat), len(last_round)))
+
+    def breakout():
+        for record in last_round:
+            agent.breakout_all_publish(record["topic"], record["message"], agent.projection, include_meta=False)
+    results.append(result(devices, "breakout_all_publish", timed(breakout, repeat), len(last_round)))
+
+    def top_k_after_data():
+        mark_all_dirty(agent)
+        list(islice(agent.criteria_container.iter_score_order("curtail"), top_k))
+    results.append(result(devices, "iter_score_order_top_{}".format(top_k), timed(top_k_after_data, repeat)))
+    results.append(result(devices, "iter_score_order_top_{}_cached".format(top_k),
+                          timed(lambda: list(islice(agent.criteria_container.iter_score_order("curtail"), top_k)),
+                                repeat)))
+
+    def score_after_data():
+        mark_all_dirty(agent)
+        agent.criteria_container.get_score_order("curtail")
+    results.append(result(devices, "get_score_order", timed(score_after_data, repeat)))
+    results.append(result(devices, "get_score_order_cached",
+                          timed(lambda: agent.criteria_container.get_score_order("curtail"), repeat)))
+
+    samples = [(record["message"][0]["WholeBuildingPower"], START + timedelta(minutes=minute))
+               for minute, record in enumerate(meter_records * 10)]
+
+    def average_power():
+        for power, sample_time in samples:
+            agent.calculate_average_power(power, sample_time)
+    results.append(result(devices, "calculate_average_power", timed(average_power, repeat), len(samples)))
+
+    agent.state = "curtail"
+    agent.hold = lambda: None
+
+    def curtail():
+        agent.devices.clear()
+        agent.avg_power = agent.demand_limit * 1.2
+        agent.current_time = START
+        agent.modify_load()
+    results.append(result(devices, "modify_load", timed(curtail, repeat)))
+    return results
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--devices", type=int, nargs="+", default=[100, 1000, 10000])
+    arg_parser.add_argument("--criteria", type=int, default=5, help="criteria per device")
+    arg_parser.add_argument("--extra-points", type=int, default=20, help="unused points per device publish")
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    arg_parser.add_argument("--top-k", type=int, default=10, help="devices pulled from the lazy score order")
+    arg_parser.add_argument("--label", default="", help="label stored with the results, e.g. a version")
+    arg_parser.add_argument("--output", help="write the results to this JSON file")
+    args = arg_parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    results = []
+    print("{:>8} {:<32} {:>12} {:>12}".format("devices", "benchmark", "seconds", "us/op"))
+    for devices in args.devices:
+        for item in run_size(devices, args.criteria, args.extra_points, args.repeat, args.top_k):
+            print("{:>8} {:<32} {:>12.4f} {:>12.1f}".format(item["devices"], item["benchmark"], item["seconds"],
+                                                           item["us_per_op"]))
+            results.append(item)
+    if args.output:
+        report = {"label": args.label, "python": platform.python_version(), "criteria": args.criteria,
+                  "extra_points": args.extra_points, "results": results}
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Time get_score_order with the array scoring engine against the previous dictionary based
+input_matrix/build_score path, and the incremental cost when only a fraction of devices
+received new data since the previous ranking.
+
+    python benchmarks/bench_scoring.py --rows 1000 10000 30000 --changed 0.01
+"""
+import argparse
+import logging
+import random
+import timeit
+
+import numpy as np
+
+from ilc.criteria_handler import CriteriaCluster, CriteriaContainer
+from ilc.ilc_matrices import (build_score, calc_column_sums, extract_criteria, input_matrix, normalize_matrix,
+                              normalize_columns, score_array)
+
+PAIRWISE = {
+    "zonetemperature-setpoint": {"history-zonetemperature": 5, "room-type": 8, "rated-power": 6, "stage": 2},
+    "history-zonetemperature": {"room-type": 5, "rated-power": 3},
+    "rated-power": {"room-type": 3},
+    "stage": {"history-zonetemperature": 3, "room-type": 6, "rated-power": 4},
+    "room-type": {}
+}
+
+
+def build(rows, clusters=4):
+    container = CriteriaContainer()
+    rng = random.Random(0)
+    labels, matrix, _ = extract_criteria({"curtail": PAIRWISE})
+    row_average = normalize_matrix(matrix, calc_column_sums(matrix))
+    per_cluster = rows // clusters
+    for c in range(clusters):
+        config = {}
+        for i in range(per_cluster):
+            criteria = {"device_topic": "CAMPUS/BUILDING/C{}RTU{}".format(c, i)}
+            for label in PAIRWISE:
+                criteria[label] = {"operation_type": "constant", "value": rng.uniform(0.0, 10.0)}
+            criteria["rated-power"] = {"operation_type": "status", "on_value": rng.uniform(1.0, 10.0),
+                                       "point_name": "FirstStageCooling"}
+            config["C{}RTU{}".format(c, i)] = {"Stage1": {"curtail": criteria}}
+        container.add_criteria_cluster(CriteriaCluster(1.0 + c, labels, row_average, config, "record", None))
+    return container
+
+
+def legacy_score_order(container, state):
+    all_scored = []
+    for cluster in container.clusters:
+        evaluations = cluster.get_all_evaluations(state)
+        input_arr = input_matrix(evaluations, cluster.criteria_labels[state])
+        all_scored.extend(build_score(input_arr, cluster.row_average[state], cluster.priority))
+    all_scored.sort(reverse=True)
+    return [x[1] for x in all_scored]
+
+
+def ranking_only(container, matrices, state):
+    all_keys = []
+    all_scores = []
+    for cluster, (keys, evaluations, col_sums) in zip(container.clusters, matrices):
+        all_keys.extend(keys)
+        all_scores.append(score_array(normalize_columns(evaluations, col_sums), cluster.row_average[state],
+                                      cluster.priority))
+    ranks = np.concatenate([container.get_rank_array(cluster, state) for cluster in container.clusters])
+    order = np.lexsort((ranks, np.concatenate(all_scores)))[::-1]
+    return [all_keys[index] for index in order.tolist()]
+
+
+def mark_all_dirty(container):
+    for device in container.devices.values():
+        for criteria in device.criteria.values():
+            criteria.mark_dirty()
+
+
+def ingest_changes(container, fraction, rng):
+    names = list(container.devices)
+    for name in rng.sample(names, max(1, int(len(names) * fraction))):
+        for criteria in container.devices[name].criteria.values():
+            criteria.ingest_data(None, {criteria.criteria["rated-power"].point_name: rng.randint(0, 1)})
+
+
+def timed(setup, func, repeat):
+    results = []
+    for _ in range(repeat):
+        setup()
+        results.append(timeit.timeit(func, number=1))
+    return min(results)
+
+
+def run(row_counts, fraction, repeat):
+    rng = random.Random(1)
+    print("{:>8} {:>12} {:>12} {:>14} {:>12}".format("rows", "legacy ms", "full ms", "incremental ms",
+                                                      "ranking ms"))
+    for rows in row_counts:
+        container = build(rows)
+        container.get_score_order("curtail")
+        legacy = timed(lambda: mark_all_dirty(container), lambda: legacy_score_order(container, "curtail"), repeat)
+        full = timed(lambda: mark_all_dirty(container), lambda: container.get_score_order("curtail"), repeat)
+        incremental = timed(lambda: ingest_changes(container, fraction, rng),
+                            lambda: container.get_score_order("curtail"), repeat)
+        matrices = [cluster.get_evaluation_matrix("curtail") for cluster in container.clusters]
+        ranking = timed(lambda: None, lambda: ranking_only(container, matrices, "curtail"), repeat)
+        print("{:>8} {:>12.2f} {:>12.2f} {:>14.2f} {:>12.2f}".format(rows, legacy * 1e3, full * 1e3,
+                                                                     incremental * 1e3, ranking * 1e3))
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000])
+    arg_parser.add_argument("--changed", type=float, default=0.01,
+                            help="fraction of devices with new data between rankings")
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    args = arg_parser.parse_args()
+    logging.disable(logging.CRITICAL)
+    run(args.rows, args.changed, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
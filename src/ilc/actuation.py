@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*- {{{
+# ===----------------------------------------------------------------------===
+#
+#                 Installable Component of Eclipse VOLTTRON
+#
+# ===----------------------------------------------------------------------===
+#
+# Copyright 2022 Battelle Memorial Institute
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+# ===----------------------------------------------------------------------===
+# }}}
+
+import logging
+
+import gevent
+from gevent.lock import BoundedSemaphore
+from gevent.pool import Pool
+
+from volttron.utils import setup_logging
+
+setup_logging()
+_log = logging.getLogger(__name__)
+
+
+class ActuationPool(object):
+    """
+    Runs actuator work (get_point/set_point round trips for one device) on a gevent pool.
+
+    pool_size bounds the total number of devices handled at once and actuator_concurrency bounds the
+    number handled at once through any single actuator agent.  With a pool size of 1 the work is run
+    inline, one device at a time, exactly as it would be without the pool.
+
+    batch_size is the number of devices on the same actuator that are handled by one multi-point call
+    (get_multiple_points/set_multiple_points).  With a batch size of 1 every device is handled on its own.
+    """
+    def __init__(self, pool_size=1, actuator_concurrency=None, batch_size=1):
+        """
+        :param pool_size: maximum number of devices handled concurrently
+        :param actuator_concurrency: maximum number of devices handled concurrently per actuator,
+            defaults to pool_size
+        :param batch_size: maximum number of devices handled by one multi-point call
+        """
+        self.pool_size = max(1, int(pool_size))
+        self.batch_size = max(1, int(batch_size))
+        if actuator_concurrency is None:
+            actuator_concurrency = self.pool_size
+        self.actuator_concurrency = max(1, int(actuator_concurrency))
+        self.pool = Pool(self.pool_size)
+        self.limits = {}
+
+    @property
+    def concurrent(self):
+        return self.pool_size > 1
+
+    @property
+    def batched(self):
+        return self.batch_size > 1
+
+    @property
+    def wave_size(self):
+        """
+        Number of devices that can be in progress at once.
+        """
+        return self.pool_size * self.batch_size
+
+    def limit(self, actuator):
+        semaphore = self.limits.get(actuator)
+        if semaphore is None:
+            semaphore = self.limits[actuator] = BoundedSemaphore(self.actuator_concurrency)
+        return semaphore
+
+    def run(self, actuator, func, *args):
+        with self.limit(actuator):
+            return func(*args)
+
+    def map(self, func, items):
+        """
+        Call func for every item and return the results in item order.
+        :param func: callable taking the item as its only argument
+        :param items: list of (actuator, item) tuples
+        :return: list of results
+        """
+        if not self.concurrent or len(items) <= 1:
+            return [func(item) for _, item in items]
+        greenlets = [self.pool.spawn(self.run, actuator, func, item) for actuator, item in items]
+        gevent.joinall(greenlets)
+        results = []
+        for greenlet in greenlets:
+            if not greenlet.successful():
+                raise greenlet.exception
+            results.append(greenlet.value)
+        return results
+
+    def map_batches(self, func, items):
+        """
+        Group items by actuator into batches of up to batch_size, call func once per batch and return
+        the results in item order.
+        :param func: callable taking an actuator and a list of items and returning a list with a result
+            per item
+        :param items: list of (actuator, item) tuples
+        :return: list of results
+        """
+        batches = []
+        open_batches = {}
+        for index, (actuator, item) in enumerate(items):
+            batch = open_batches.get(actuator)
+            if batch is None or len(batch[1]) >= self.batch_size:
+                batch = open_batches[actuator] = (actuator, [], [])
+                batches.append(batch)
+            batch[1].append(index)
+            batch[2].append(item)
+
+        batch_results = self.map(lambda batch: func(batch[0], batch[2]),
+                                 [(batch[0], batch) for batch in batches])
+        results = [None] * len(items)
+        for batch, batch_result in zip(batches, batch_results):
+            for index, result in zip(batch[1], batch_result):
+                results[index] = result
+        return results
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*- {{{
+# ===----------------------------------------------------------------------===
+#
+#                 Installable Component of Eclipse VOLTTRON
+#
+# ===----------------------------------------------------------------------===
+#
+# Copyright 2022 Battelle Memorial Institute
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+# ===----------------------------------------------------------------------===
+# }}}
+
+
+import hashlib
+import json
+import logging
+
+from volttron.utils import setup_logging
+
+from ilc.ilc_matrices import (CONSISTENCY_THRESHOLD, calc_column_sums, consistency_ratio, extract_criteria,
+                              normalize_matrix, priority_vector)
+
+setup_logging()
+_log = logging.getLogger(__name__)
+
+# Maximum number of compiled pairwise configurations kept by a compiler.
+CACHE_SIZE = 256
+
+
+def config_digest(pairwise_config):
+    """
+    Content hash of a configuration.  Key order is kept since it sets the criteria label order of a
+    pairwise criteria configuration.
+    :param pairwise_config: JSON serializable configuration
+    :return: hex digest
+    """
+    content = json.dumps(pairwise_config, separators=(",", ":"), default=str)
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+class AHPWeights(object):
+    """
+    Compiled pairwise criteria configuration of a cluster.
+
+    criteria_labels, criteria_matrix and row_average are keyed by state (curtail, augment) in the same
+    form extract_criteria and normalize_matrix return them.  row_average holds the weights used for
+    scoring, priority_vector the principal eigenvector and consistency_ratio the consistency of each
+    state's pairwise matrix.
+    """
+    def __init__(self, digest, criteria_labels, criteria_matrix, states):
+        self.digest = digest
+        self.criteria_labels = criteria_labels
+        self.criteria_matrix = criteria_matrix
+        self.states = states
+        self.row_average = normalize_matrix(criteria_matrix, calc_column_sums(criteria_matrix))
+        self.priority_vector = {}
+        self.consistency_ratio = {}
+        for state, matrix in criteria_matrix.items():
+            vector, _ = priority_vector(matrix)
+            self.priority_vector[state] = vector.tolist()
+            self.consistency_ratio[state] = consistency_ratio(matrix)
+
+    @property
+    def consistent(self):
+        return all(ratio <= CONSISTENCY_THRESHOLD for ratio in self.consistency_ratio.values())
+
+    def inconsistent_states(self):
+        return dict((state, ratio) for state, ratio in self.consistency_ratio.items()
+                    if ratio > CONSISTENCY_THRESHOLD)
+
+
+class AHPCompiler(object):
+    """
+    Compiles pairwise criteria configurations into AHPWeights, caching the result by content hash so
+    identical clusters and unchanged configurations are only compiled once.
+    """
+    def __init__(self, cache_size=CACHE_SIZE, tracer=None):
+        self.cache_size = cache_size
+        self.cache = {}
+        self.tracer = tracer
+
+    def compile(self, pairwise_config):
+        """
+        :param pairwise_config: pairwise criteria configuration
+        :return: AHPWeights
+        """
+        digest = config_digest(pairwise_config)
+        weights = self.cache.get(digest)
+        if weights is not None:
+            _log.debug("Pairwise configuration {} already compiled".format(digest[:12]))
+            return weights
+        criteria_labels, criteria_matrix, states = extract_criteria(pairwise_config, self.tracer)
+        weights = AHPWeights(digest, criteria_labels, criteria_matrix, states)
+        if len(self.cache) >= self.cache_size:
+            self.cache.pop(next(iter(self.cache)))
+        self.cache[digest] = weights
+        return weights
@@ -24,12 +24,15 @@
 
 import logging
 
+from collections import defaultdict
+from functools import partial
 from sympy import symbols
 from sympy.parsing.sympy_parser import parse_expr
 
 from volttron.client.messaging import headers as headers_mod
 from volttron.utils import setup_logging, format_timestamp, get_aware_utc_now
 
+from ilc.expressions import CompiledExpression
 from ilc.utils import parse_sympy, create_device_topic_map, fix_up_point_name
 
 setup_logging()
@@ -60,17 +63,41 @@ class ControlCluster(object):
 
 
 class ControlContainer(object):
-    def __init__(self):
+    def __init__(self, tracer=None):
+        self.tracer = tracer
         self.clusters = []
         self.devices = {}
         self.device_topics = set()
         self.topics_per_device = {}
         self.control_topics = {}
+        # Devices whose DeviceStatus is on, per state, kept up to date by the DeviceStatus callbacks.
+        # Values are the configuration order of the device so the legacy ordering can be restored.
+        self.active_devices = defaultdict(dict)
+        self.device_rank = {}
+        # (device_name, device_id) to its devices on every actuator, in configuration order.
+        self.key_devices = defaultdict(list)
 
     def add_control_cluster(self, cluster):
         self.clusters.append(cluster)
         self.devices.update(cluster.devices)
         self.device_topics |= cluster.device_topics
+        for (device_name, actuator), control_manager in cluster.devices.items():
+            for device_id, controls in control_manager.controls.items():
+                device = (device_name, device_id, actuator)
+                if device not in self.device_rank:
+                    self.device_rank[device] = len(self.device_rank)
+                    self.key_devices[device[:2]].append(device)
+                for state, device_status in controls.device_status.items():
+                    device_status.on_change = partial(self.set_active, state, device)
+                    device_status.tracer = self.tracer
+                    # A cluster reused on reload may already have devices on.
+                    self.set_active(state, device, device_status.command_status)
+
+    def set_active(self, state, device, status):
+        if status:
+            self.active_devices[state][device] = self.device_rank[device]
+        else:
+            self.active_devices[state].pop(device, None)
 
     def get_device_name_list(self):
         return self.devices.keys()
@@ -82,11 +109,22 @@ class ControlContainer(object):
         return self.device_topics
 
     def get_devices_status(self, state):
-        all_on_devices = []
-        for cluster in self.clusters:
-            on_device = cluster.get_all_devices_status(state)
-            all_on_devices.extend(on_device)
-        return all_on_devices
+        active = self.active_devices[state]
+        return sorted(active, key=active.get)
+
+    def iter_scored_active(self, state, score_order):
+        """
+        Lazily filter a score order down to the active devices.  Devices of the same key on several
+        actuators follow configuration order.  Only as much of score_order is consumed as the caller pulls.
+        :param state: curtail or augment
+        :param score_order: iterable of (device_name, device_id) in score order
+        :return: iterator of (device_name, device_id, actuator)
+        """
+        active = self.active_devices[state]
+        for key in score_order:
+            for device in self.key_devices.get(key, ()):
+                if device in active:
+                    yield device
 
     def ingest_data(self, time_stamp, data):
         for device in self.devices.values():
@@ -98,6 +136,31 @@ class ControlContainer(object):
                 self.control_topics[cls] = cls.get_topic_maps()
         return self.control_topics
 
+    def get_read_points(self):
+        """
+        Point topics read from the actuator to control devices (control points, equation and load
+        arguments).
+        :return: set of point topics
+        """
+        points = set()
+        for device in self.devices.values():
+            for controls in device.controls.values():
+                points.update(controls.get_read_points())
+        return points
+
+    def get_topic_consumers(self):
+        """
+        Build the routing index of point topic to the DeviceStatus and ControlSetting objects that ingest it.
+        :return: dictionary of topic to list of consumers
+        """
+        consumers = defaultdict(list)
+        for device in self.devices.values():
+            for controls in device.controls.values():
+                for consumer in controls.get_consumers():
+                    for topic in consumer.device_topic_map:
+                        consumers[topic].append(consumer)
+        return consumers
+
 
 class DeviceStatus(object):
     def __init__(self, logging_topic, parent, device_status_args=None, condition="", default_device=""):
@@ -112,31 +175,41 @@ class DeviceStatus(object):
         # self.device_status_args = device_status_args
         self.condition = parse_sympy(condition, condition=True)
         self.expr = parse_expr(self.condition)
+        self.predicate = CompiledExpression(self.expr, self.device_topic_map.values())
         self.command_status = False
+        # Called with the new command status when it changes.
+        self.on_change = None
+        # Tracer of the agent, set by the ControlContainer the device is added to.
+        self.tracer = None
         self.default_device = default_device
         self.parent = parent
         self.logging_topic = logging_topic
 
     def ingest_data(self, time_stamp, data):
+        updated = False
         for topic, point in self.device_topic_map.items():
             if topic in data:
                 self.current_device_values[point] = data[topic]
-                _log.debug("DEVICE_STATUS: {} - {} current device values: {}".format(topic,
-                                                                                     self.condition,
-                                                                                     self.current_device_values))
+                updated = True
+        if updated and self.tracer is not None and self.tracer.sample("device_status"):
+            self.tracer.record("device_status", "DEVICE_STATUS: {} current device values: {}", self.condition,
+                               dict(self.current_device_values))
         # bail if we are missing values.
         if len(self.current_device_values) < len(self.device_topic_map):
             return
 
-        conditional_points = self.current_device_values.items()
         conditional_value = False
-        if conditional_points:
-            conditional_value = self.expr.subs(conditional_points)
+        if self.current_device_values:
+            conditional_value = self.predicate.evaluate(self.current_device_values)
         try:
-            self.command_status = bool(conditional_value)
+            command_status = bool(conditional_value)
         except TypeError:
-            self.command_status = False
-        message = self.current_device_values
+            command_status = False
+        if command_status != self.command_status:
+            self.command_status = command_status
+            if self.on_change is not None:
+                self.on_change(command_status)
+        message = dict(self.current_device_values)
         message["Status"] = self.command_status
         topic = "/".join([self.logging_topic, self.default_device, "DeviceStatus"])
         # publish_data(time_stamp, message, topic, self.parent.vip.pubsub.publish)
@@ -210,6 +283,15 @@ class Controls(object):
     def reset_control_status(self):
         self.currently_controlled = False
 
+    def get_consumers(self):
+        return self.conditional_curtailments + self.conditional_augments + list(self.device_status.values())
+
+    def get_read_points(self):
+        points = []
+        for setting in self.conditional_curtailments + self.conditional_augments:
+            points.extend(setting.get_read_points())
+        return points
+
     def get_topic_maps(self):
         topics = []
         for cls in self.conditional_augments:
@@ -331,12 +413,25 @@ class ControlSetting(object):
             self.conditional_control = parse_expr(self.conditional_expr)
 
             self.device_topic_map, self.device_topics = create_device_topic_map(conditional_args, default_device)
+            self.conditional_predicate = CompiledExpression(self.conditional_control, self.device_topic_map.values())
         self.device_topics.add(self.point_device)
         self.conditional_points = []
 
     def get_point_device(self):
         return self.point_device
 
+    def get_read_points(self):
+        """
+        Point topics read from the actuator when this setting is used to control a device.
+        :return: list of point topics
+        """
+        points = [self.point]
+        if self.control_method.lower() == 'equation':
+            points.extend(point for token, point in self.equation_args)
+        if isinstance(self.load, dict):
+            points.extend(point for token, point in self.load['load_equation_args'])
+        return points
+
     def get_control_info(self):
         if self.control_method.lower() == 'equation':
             return {
@@ -379,7 +474,7 @@ class ControlSetting(object):
             return True
 
         if self.conditional_points:
-            value = self.conditional_control.subs(self.conditional_points)
+            value = self.conditional_predicate.evaluate(self.current_device_values)
             _log.debug('{} (conditional_control) evaluated to {}'.format(self.conditional_expr, value))
         else:
             value = False
@@ -23,17 +23,24 @@
 # }}}
 
 import abc
+import heapq
 import logging
 
-from collections import deque
+from bisect import bisect_left, bisect_right
+
+import numpy as np
+
+from collections import defaultdict
 from datetime import timedelta as td
+from functools import partial
 from sympy.core import numbers
 from sympy.parsing.sympy_parser import parse_expr
 
 from volttron.client.messaging import headers as headers_mod
 from volttron.utils import setup_logging, get_aware_utc_now, format_timestamp
 
-from ilc.ilc_matrices import (build_score, input_matrix)
+from ilc.expressions import CompiledExpression
+from ilc.ilc_matrices import (normalize_columns, score_array)
 from ilc.utils import parse_sympy, create_device_topic_map, fix_up_point_name
 
 setup_logging()
@@ -55,6 +62,12 @@ class CriteriaCluster(object):
         self.priority = priority
         self.criteria_labels = criteria_labels
         self.row_average = row_average
+        self.rows = {}
+        self.row_keys = {}
+        self.evaluations = {}
+        self.col_sums = {}
+        self.dirty_rows = {}
+        self.sum_updates = {}
         global mappers
         try:
             mappers = cluster_config.pop("mappers")
@@ -73,44 +86,177 @@ class CriteriaCluster(object):
                     results[name, device_id[0]] = evaluations
         return results
 
+    def get_rows(self, state):
+        """
+        Device rows of the evaluation array for a state.  Rows are fixed by the configuration.
+        :param state: curtail or augment
+        :return: list of (device_name, criteria token) tuples
+        """
+        if state not in self.rows:
+            self.rows[state] = [(name, device_id) for name, device in self.criteria.items()
+                                for device_id in device.criteria if state in device_id]
+            self.row_keys[state] = [(name, device_id[0]) for name, device_id in self.rows[state]]
+            # Every row starts dirty.  After that a row is only evaluated again when its Criteria
+            # ingests new data.
+            self.dirty_rows[state] = dirty = set(range(len(self.rows[state])))
+            for row, (name, device_id) in enumerate(self.rows[state]):
+                self.criteria[name].criteria[device_id].on_update = partial(dirty.add, row)
+        return self.rows[state]
+
+    def has_updates(self, state):
+        return state not in self.evaluations or bool(self.dirty_rows.get(state))
+
+    def get_evaluation_matrix(self, state):
+        """
+        Evaluate the criteria of every device for the state into a device x criteria array with columns
+        ordered by criteria_labels.  Only rows whose criteria received data since the previous call are
+        evaluated, and the column sums are updated by the change in those rows.
+        :param state: curtail or augment
+        :return: list of (device_name, device_id) keys, the evaluation array and its column sums
+        """
+        rows = self.get_rows(state)
+        labels = self.criteria_labels[state]
+        if rows and set(self.criteria[rows[-1][0]].criteria[rows[-1][1]].criteria) != set(labels):
+            raise Exception('Input criteria and data criteria do not match.')
+        dirty = self.dirty_rows[state]
+        matrix = self.evaluations.get(state)
+        if matrix is None:
+            dirty.clear()
+            values = [self.evaluate_row(name, device_id, labels) for name, device_id in rows]
+            matrix = self.evaluations[state] = np.array(values, dtype=float).reshape(len(rows), len(labels))
+            self.reset_col_sums(state)
+        elif dirty:
+            updated_rows = sorted(dirty)
+            dirty.clear()
+            values = [self.evaluate_row(*rows[row], labels) for row in updated_rows]
+            updated = np.array(values, dtype=float).reshape(len(updated_rows), len(labels))
+            self.col_sums[state] += (updated - matrix[updated_rows]).sum(axis=0)
+            matrix[updated_rows] = updated
+            self.sum_updates[state] += len(updated_rows)
+            # Refresh the running sums now and then so floating point error cannot accumulate.
+            if self.sum_updates[state] >= len(rows) or not np.all(np.isfinite(self.col_sums[state])):
+                self.reset_col_sums(state)
+        return self.row_keys[state], matrix, self.col_sums[state]
+
+    def evaluate_row(self, name, device_id, labels):
+        evaluation = self.criteria[name].evaluate(device_id)
+        return [evaluation[label] for label in labels]
+
+    def reset_col_sums(self, state):
+        self.col_sums[state] = self.evaluations[state].sum(axis=0)
+        self.sum_updates[state] = 0
+
 
 class CriteriaContainer(object):
-    def __init__(self):
+    def __init__(self, tracer=None):
+        self.tracer = tracer
         self.clusters = []
         self.devices = {}
         self.all_device_topics = []
         self.topics_per_device = {}
+        self.key_rank = {}
+        self.rank_arrays = {}
+        self.score_order = {}
+        self.cluster_runs = {}
 
     def add_criteria_cluster(self, cluster):
         self.clusters.append(cluster)
         self.devices.update(cluster.criteria)
-
-    def get_score_order(self, state):
-        all_scored = []
+        # Ties in score are broken by (device_name, device_id) in descending order, as a reverse sort of
+        # (score, key) tuples would.  The rank of each key is fixed by configuration so compute it once.
+        all_keys = set(self.key_rank)
+        for name, device in cluster.criteria.items():
+            for device_id, state in device.criteria:
+                all_keys.add((name, device_id))
+        self.key_rank = dict((key, rank) for rank, key in enumerate(sorted(all_keys)))
+        self.rank_arrays = {}
+        self.score_order = {}
+        self.cluster_runs = {}
+
+    def get_scored_clusters(self, state):
+        clusters = []
         for cluster in self.clusters:
-            evaluations = cluster.get_all_evaluations(state)
-
-            _log.debug('Device Evaluations: ' + str(evaluations))
-
-            if not evaluations:
+            if not cluster.get_rows(state):
                 continue
 
             if state not in cluster.criteria_labels.keys() or state not in cluster.row_average.keys():
                 _log.debug("Criteria - Not configured for current state: {}".format(state))
                 continue
-            _log.debug("EVAL: {} - {}".format(evaluations.values(), cluster.criteria_labels[state]))
-            input_arr = input_matrix(evaluations, cluster.criteria_labels[state])
-            scores = build_score(input_arr, cluster.row_average[state], cluster.priority)
-            all_scored.extend(scores)
+            clusters.append(cluster)
+        return clusters
 
-            _log.debug('Input Array: ' + str(input_arr))
-            _log.debug('Scored devices: ' + str(scores))
+    def get_score_order(self, state):
+        return list(self.update_score_order(state))
+
+    def update_score_order(self, state):
+        clusters = self.get_scored_clusters(state)
+        # Column normalization couples every row of a cluster, so any new data means re-scoring the
+        # cluster.  When nothing has changed since the last call the previous order still holds.
+        if state in self.score_order and not any(cluster.has_updates(state) for cluster in clusters):
+            return self.score_order[state]
 
-        all_scored.sort(reverse=True)
-        results = [x[1] for x in all_scored]
+        results = list(self.iter_score_order(state))
+        if not results:
+            return []
+        self.score_order[state] = results
 
         return results
 
+    def iter_score_order(self, state):
+        """
+        Lazily yield devices in score order.  The rows of each cluster are kept sorted by score and the
+        clusters are merged with a heap, so pulling the first k devices costs O(k log clusters) once the
+        clusters are scored.  Clusters without new data are not scored or sorted again.
+        :param state: curtail or augment
+        :return: iterator of (device_name, device_id)
+        """
+        runs = [self.iter_cluster_run(self.get_cluster_run(cluster, state))
+                for cluster in self.get_scored_clusters(state)]
+        for entry in heapq.merge(*runs, reverse=True):
+            yield entry[-1]
+
+    @staticmethod
+    def iter_cluster_run(run):
+        keys, scores, ranks, nans = run
+        for index in range(len(keys)):
+            yield nans[index], scores[index], ranks[index], keys[index]
+
+    def get_cluster_run(self, cluster, state):
+        """
+        Rows of a cluster sorted by descending score, ties broken by descending key rank.  NaN scores
+        sort first, as they do in a reversed numpy sort.
+        :return: tuple of lists of keys, scores, ranks and NaN flags
+        """
+        run_key = (id(cluster), state)
+        if run_key in self.cluster_runs and not cluster.has_updates(state):
+            return self.cluster_runs[run_key]
+        self.score_order.pop(state, None)
+
+        keys, evaluations, col_sums = cluster.get_evaluation_matrix(state)
+        # The evaluation array is updated in place, so it is only copied for sampled events.
+        if self.tracer is not None and self.tracer.sample("device_evaluations"):
+            self.tracer.record("device_evaluations", "Device Evaluations: {} - {}", cluster.criteria_labels[state],
+                               evaluations.copy())
+        scores = score_array(normalize_columns(evaluations, col_sums), cluster.row_average[state],
+                             cluster.priority)
+        if self.tracer is not None:
+            self.tracer.trace("scored_devices", "Scored devices: {}", scores)
+        ranks = self.get_rank_array(cluster, state)
+        order = np.lexsort((ranks, scores))[::-1]
+        scores = scores[order]
+        nans = np.isnan(scores)
+        run = ([keys[index] for index in order.tolist()], np.where(nans, 0.0, scores).tolist(),
+               ranks[order].tolist(), nans.tolist())
+        self.cluster_runs[run_key] = run
+        return run
+
+    def get_rank_array(self, cluster, state):
+        key = (id(cluster), state)
+        if key not in self.rank_arrays:
+            self.rank_arrays[key] = np.array([self.key_rank[row_key] for row_key in cluster.row_keys[state]],
+                                             dtype=np.int64)
+        return self.rank_arrays[key]
+
     def get_device(self, device_name):
         return self.devices[device_name]
 
@@ -122,6 +268,19 @@ class CriteriaContainer(object):
             topic_list = []
         return self.topics_per_device
 
+    def get_topic_consumers(self):
+        """
+        Build the routing index of point topic to the criterion objects that ingest it.
+        :return: dictionary of topic to list of criterion
+        """
+        consumers = defaultdict(list)
+        for device in self.devices.values():
+            for criteria in device.criteria.values():
+                for criterion in criteria.criteria.values():
+                    for topic in criterion.get_topic_list():
+                        consumers[topic].append(criterion)
+        return consumers
+
     # this passes all data coming in to all device criteria
     # TODO:  rethink this approach.  Is there a better way to create the topic map to pass only data needed
     def ingest_data(self, time_stamp, data):
@@ -166,6 +325,9 @@ class Criteria(object):
         self.device_topics = set()
         self.device_topics.add(device_topic)
         self.criteria = {}
+        self.results = {}
+        self.dirty = True
+        self.on_update = None
         for name, criterion in criteria.items():
             self.add(name, criterion, device_topic, logging_topic, parent)
 
@@ -174,13 +336,26 @@ class Criteria(object):
         operation_type = criterion.pop('operation_type')
         klass = criterion_registry[operation_type]
         self.criteria[name] = klass(device_topic=device_topic, logging_topic=logging_topic, parent=parent, **criterion)
+        self.criteria[name].on_update = self.mark_dirty
+
+    def mark_dirty(self):
+        self.dirty = True
+        if self.on_update is not None:
+            self.on_update()
 
     def evaluate(self):
-        results = {}
-        for name, criterion in self.criteria.items():
-            result = criterion.evaluate_criterion()
-            results[name] = result
-        return results
+        """
+        Evaluate all criteria.  Results are cached until one of the criteria ingests new data.
+        :return: dictionary of criteria name to value
+        """
+        if self.dirty:
+            results = {}
+            for name, criterion in self.criteria.items():
+                result = criterion.evaluate_criterion()
+                results[name] = result
+            self.results = results
+            self.dirty = False
+        return self.results
 
     def ingest_data(self, time_stamp, data):
         for criterion in self.criteria.values():
@@ -211,6 +386,15 @@ class BaseCriterion(object):
         self.device_topics = set()
         self.topic_set = set()
         self.parent = parent
+        self.on_update = None
+
+    def data_updated(self):
+        """
+        Called by ingest_data when the criterion consumed new data, so the cached evaluation is refreshed.
+        :return:
+        """
+        if self.on_update is not None:
+            self.on_update()
 
     def numeric_check(self, value):
         """
@@ -296,6 +480,7 @@ class StatusCriterion(BaseCriterion):
             value = data[self.point_name]
             # self.publish_data(self.point_name, value, time_stamp)
             self.current_status = bool(data[self.point_name])
+            self.data_updated()
 
 
 @register_criterion('constant')
@@ -325,6 +510,7 @@ class FormulaCriterion(BaseCriterion):
         self.build_ingest_map(operation_args)
         _log.debug("Device topic map: {}".format(self.device_topic_map))
         self.expr = parse_expr(parse_sympy(operation))
+        self.compiled_expr = CompiledExpression(self.expr, self.device_topic_map.values())
         self.status = False
 
         self.current_operation_values = {}
@@ -368,19 +554,22 @@ class FormulaCriterion(BaseCriterion):
 
     def evaluate(self):
         if len(self.current_operation_values) >= self.operation_arg_count:
-            point_list = self.current_operation_values.items()
-            value = self.expr.subs(point_list)
+            value = self.compiled_expr.evaluate(self.current_operation_values)
         else:
             value = self.minimum
         return value
 
     def ingest_data(self, time_stamp, data):
+        updated = False
         for topic, point in self.device_topic_map.items():
             if topic in data:
                 if not self.status or point not in self.update_points.get("nc", set()):
                     value = data[topic]
                     # self.publish_data(topic, value, time_stamp)
                     self.current_operation_values[point] = value
+                    updated = True
+        if updated:
+            self.data_updated()
 
     def criteria_status(self, status):
         self.status = status
@@ -398,13 +587,69 @@ class MapperCriterion(BaseCriterion):
         return self.value
 
 
+class HistoryBuffer(object):
+    """
+    Time ordered samples for HistoryCriterion.  Samples are kept in parallel lists read from a moving
+    start index so pruning is O(1); the lists are compacted once the pruned prefix is half the buffer.
+    """
+    MIN_COMPACT = 32
+
+    def __init__(self):
+        self.timestamps = []
+        self.values = []
+        self.start = 0
+
+    def __len__(self):
+        return len(self.timestamps) - self.start
+
+    def append(self, time_stamp, value):
+        if len(self) and time_stamp < self.timestamps[-1]:
+            index = bisect_right(self.timestamps, time_stamp, self.start)
+            self.timestamps.insert(index, time_stamp)
+            self.values.insert(index, value)
+        else:
+            self.timestamps.append(time_stamp)
+            self.values.append(value)
+
+    def prune(self, cutoff):
+        """
+        Drop samples older than cutoff.  The newest sample at or before cutoff is kept as the left
+        bracket for interpolating the value at cutoff.
+        :param cutoff: oldest time that will be evaluated
+        :return:
+        """
+        index = bisect_right(self.timestamps, cutoff, self.start) - 1
+        if index > self.start:
+            self.start = index
+            if self.start >= self.MIN_COMPACT and self.start * 2 >= len(self.timestamps):
+                del self.timestamps[:self.start]
+                del self.values[:self.start]
+                self.start = 0
+
+    def bracket(self, target):
+        """
+        Find the samples on either side of target by binary search.
+        :param target: time to interpolate
+        :return: ((pre_timestamp, pre_value), (post_timestamp, post_value)) or None if the history does not
+        reach back to target
+        """
+        if not len(self) or self.timestamps[self.start] > target:
+            return None
+        index = bisect_left(self.timestamps, target, self.start)
+        pre = max(index - 1, self.start)
+        post = pre + 1
+        if post >= len(self.timestamps):
+            return None
+        return (self.timestamps[pre], self.values[pre]), (self.timestamps[post], self.values[post])
+
+
 @register_criterion('history')
 class HistoryCriterion(BaseCriterion):
     def __init__(self, comparison_type=None, point_name=None, previous_time=None, **kwargs):
         super(HistoryCriterion, self).__init__(**kwargs)
         if comparison_type is None or point_name is None or previous_time is None:
             raise ValueError('Missing parameter')
-        self.history = deque()
+        self.history = HistoryBuffer()
         self.comparison_type = comparison_type
         self.point_name, device = fix_up_point_name(point_name, self.device_topic)
         self.device_topics.add(device)
@@ -423,19 +668,11 @@ class HistoryCriterion(BaseCriterion):
         if self.current_value is None:
             return self.minimum
 
-        pre_timestamp, pre_value = self.history.pop()
-
-        if pre_timestamp > self.history_time:
-            self.history.append((pre_timestamp, pre_value))
+        bracket = self.history.bracket(self.history_time)
+        if bracket is None:
             return self.minimum
 
-        post_timestamp, post_value = self.history.pop()
-
-        while post_timestamp < self.history_time:
-            pre_value, pre_timestamp = post_value, post_timestamp
-            post_timestamp, post_value = self.history.pop()
-
-        self.history.append((post_timestamp, post_value))
+        (pre_timestamp, pre_value), (post_timestamp, post_value) = bracket
         prev_value = self.linear_interpolation(pre_timestamp, pre_value, post_timestamp, post_value, self.history_time)
         if self.comparison_type == 'direct':
             value = abs(prev_value - self.current_value)
@@ -447,5 +684,7 @@ class HistoryCriterion(BaseCriterion):
         if self.point_name in data:
             self.history_time = time_stamp - self.previous_time_delta
             self.current_value = data[self.point_name]
-            self.history.appendleft((time_stamp, self.current_value))
+            self.history.append(time_stamp, self.current_value)
+            self.history.prune(self.history_time)
+            self.data_updated()
 
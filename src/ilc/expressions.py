@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*- {{{
+# ===----------------------------------------------------------------------===
+#
+#                 Installable Component of Eclipse VOLTTRON
+#
+# ===----------------------------------------------------------------------===
+#
+# Copyright 2022 Battelle Memorial Institute
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+# ===----------------------------------------------------------------------===
+# }}}
+
+import logging
+
+from sympy import Symbol, lambdify, sympify
+
+from volttron.utils import setup_logging
+
+setup_logging()
+_log = logging.getLogger(__name__)
+
+# Only plain Python numbers take the compiled path.  Anything else (bool, str, sympy types) is evaluated
+# by sympy so the result is identical to what expr.subs() has always returned for those inputs.
+NUMERIC_TYPES = (int, float)
+EVALUATION_ERRORS = (ArithmeticError, TypeError, ValueError, NameError)
+
+
+class CompiledExpression(object):
+    """
+    Parsed sympy expression compiled once into a callable over a fixed argument order.
+
+    The callable is produced with sympy's lambdify using the math module so evaluation is plain float
+    arithmetic.  Expressions that cannot be compiled, inputs that are not plain numbers and evaluation
+    errors (e.g. division by zero) fall back to sympy substitution.
+    """
+    def __init__(self, expr, arg_names):
+        """
+        :param expr: parsed sympy expression
+        :param arg_names: ordered names of the symbols the expression is evaluated over
+        """
+        self.expr = expr
+        self.arg_names = tuple(dict.fromkeys(arg_names))
+        self.func = self.compile()
+
+    def compile(self):
+        arg_symbols = [Symbol(name) for name in self.arg_names]
+        # subs() sympifies string keys, so a name that does not parse to its own symbol (e.g. "E")
+        # would substitute something else entirely.  Leave those to sympy.
+        for name, symbol in zip(self.arg_names, arg_symbols):
+            try:
+                if sympify(name) != symbol:
+                    _log.debug("Expression {} not compiled, argument {} is not a symbol".format(self.expr, name))
+                    return None
+            except Exception:
+                return None
+        if not self.expr.free_symbols.issubset(arg_symbols):
+            _log.debug("Expression {} not compiled, free symbols {} not in arguments {}".format(
+                self.expr, self.expr.free_symbols, self.arg_names))
+            return None
+        try:
+            return lambdify(arg_symbols, self.expr, modules="math")
+        except Exception as ex:
+            _log.debug("Expression {} could not be compiled: {}".format(self.expr, ex))
+            return None
+
+    @property
+    def compiled(self):
+        return self.func is not None
+
+    def evaluate(self, values):
+        """
+        Evaluate the expression.
+        :param values: dictionary of argument name to value
+        :return: result of the compiled callable or of sympy substitution
+        """
+        if self.func is not None:
+            try:
+                args = [values[name] for name in self.arg_names]
+            except KeyError:
+                args = None
+            if args is not None and all(type(arg) in NUMERIC_TYPES for arg in args):
+                try:
+                    return self.func(*args)
+                except EVALUATION_ERRORS:
+                    pass
+        return self.subs(values)
+
+    def subs(self, values):
+        return self.expr.subs(list(values.items()))
@@ -26,27 +26,41 @@ import dateutil.tz
 import gevent
 import logging
 import math
+import os
 import sys
 import time
 
 from datetime import timedelta as td, datetime as dt
+from functools import partial
+from itertools import chain, islice
 from dateutil import parser
 from sympy import symbols
 from sympy.parsing.sympy_parser import parse_expr
 from transitions import Machine
 # from transitions.extensions import GraphMachine as Machine
 
-from volttron.client.vip.agent import Agent, Core
+from volttron.client.vip.agent import Agent, Core, RPC
 from volttron.client.messaging import topics, headers as headers_mod
 from volttron.utils import (
-    format_timestamp, get_aware_utc_now, load_config, parse_timestamp_string, setup_logging, vip_main
+    ClientContext as cc, format_timestamp, get_aware_utc_now, load_config, parse_timestamp_string, setup_logging,
+    vip_main
 )
 from volttron.utils.jsonrpc import RemoteError
-from volttron.utils.math_utils import mean
+from volttron.utils.scheduling import periodic
 
+from ilc.actuation import ActuationPool
+from ilc.ahp import AHPCompiler, config_digest
 from ilc.control_handler import ControlCluster, ControlContainer
 from ilc.criteria_handler import CriteriaContainer, CriteriaCluster, parse_sympy
-from ilc.ilc_matrices import calc_column_sums, extract_criteria, normalize_matrix, validate_input
+from ilc.ledger import ControlledDevice, DeviceLedger
+from ilc.metrics import MetricsRegistry, timed
+from ilc.point_cache import PointCache
+from ilc.profiling import ProfileSession, profiled_message
+from ilc.power_average import PowerAverager
+from ilc.projection import PointProjection
+from ilc.subscriptions import SubscriptionManager
+from ilc.tracing import TRACE_BUFFER_SIZE, Tracer
+from ilc.utils import clean_point_topic, clean_text
 
 setup_logging()
 _log = logging.getLogger(__name__)
@@ -176,14 +190,6 @@ class ILCAgent(Agent):
         super(ILCAgent, self).__init__(**kwargs)
         #config = load_config(config_path)
         self.state = None
-        self.state_machine = Machine(model=self, states=ILCAgent.states,
-                                     transitions= ILCAgent.transitions, initial='inactive', queued=True)
-        # self.get_graph().draw('my_state_diagram.png', prog='dot')
-        self.state_machine.on_enter_curtail('modify_load')
-        self.state_machine.on_enter_augment('modify_load')
-        self.state_machine.on_enter_curtail_releasing('setup_release')
-        self.state_machine.on_enter_augment_releasing('setup_release')
-
         self.default_config = {
             "campus": "CAMPUS",
             "building": "BUILDING",
@@ -203,8 +209,15 @@ class ILCAgent(Agent):
         # TODO: Why is self.confirm_time defined as a timedelta, but only used as a datetime?
         self.confirm_time = td(minutes=self.default_config.get("confirm_time"))
         self.current_time = td(minutes=0)
+        self.metrics = MetricsRegistry()
+        self.metrics_task = None
+        self.meter_received = None
+        self.profile_session = None
+        self.profile_task = None
+        self.profile_result = None
         self.state_machine = Machine(model=self, states=ILCAgent.states,
-                                     transitions= ILCAgent.transitions, initial='inactive', queued=True)
+                                     transitions= ILCAgent.transitions, initial='inactive', queued=True,
+                                     after_state_change='record_transition')
         # self.get_graph().draw('my_state_diagram.png', prog='dot')
         self.state_machine.on_enter_curtail('modify_load')
         self.state_machine.on_enter_augment('modify_load')
@@ -220,8 +233,9 @@ class ILCAgent(Agent):
         self.action_end = None
         self.kill_signal_received = False
         self.scheduled_devices = set()
-        self.devices = []
-        self.bldg_power = []
+        self.schedule_task_count = 0
+        self.devices = DeviceLedger()
+        self.bldg_power = PowerAverager(td(minutes=15))
         self.avg_power = None
         self.device_group_size = None
         self.current_stagger = None
@@ -237,6 +251,16 @@ class ILCAgent(Agent):
         self.kill_device_topic = None
         self.load_control_modes = ["curtail"]
         self.schedule = {}
+        self.topic_consumers = {}
+        self.actuation = ActuationPool()
+        self.point_cache = PointCache()
+        self.projection = None
+        self.tracer = Tracer()
+        self.ahp_compiler = AHPCompiler(tracer=self.tracer)
+        # Clusters of the current configuration by content digest, reused on reload when unchanged.
+        self.criteria_clusters = {}
+        self.control_clusters = {}
+        self.subscriptions = None
 
     def configure_main(self, config_name, action, contents):
         config = self.default_config.copy()
@@ -290,36 +314,7 @@ class ILCAgent(Agent):
         self.update_base_topic = update_base_topic
         self.ilc_start_topic = "/".join([ilc_start_topic, "ilc/start"])
 
-        cluster_configs = config["clusters"]
-        self.criteria_container = CriteriaContainer()
-        self.control_container = ControlContainer()
-
-        for cluster_config in cluster_configs:
-            _log.debug("CLUSTER CONFIG: {}".format(cluster_config))
-            pairwise_criteria_config = cluster_config["pairwise_criteria_config"]
-
-            criteria_config = cluster_config["device_criteria_config"]
-            control_config = cluster_config["device_control_config"]
-
-            cluster_priority = cluster_config["cluster_priority"]
-            cluster_actuator = cluster_config.get("cluster_actuator", "platform.actuator")
-            # Check that all three parameters are not None
-            if pairwise_criteria_config and criteria_config and control_config:
-                criteria_labels, criteria_array, self.load_control_modes = extract_criteria(pairwise_criteria_config)
-                col_sums = calc_column_sums(criteria_array)
-                row_average = normalize_matrix(criteria_array, col_sums)
-                _log.debug("VALIDATE - criteria_array {} - col_sums {}".format(criteria_array, col_sums))
-                if not validate_input(criteria_array, col_sums):
-                    _log.debug("Inconsistent pairwise configuration. Check "
-                               "configuration in: {}".format(pairwise_criteria_config))
-                    sys.exit()
-
-                criteria_cluster = CriteriaCluster(cluster_priority, criteria_labels, row_average, criteria_config,
-                                                   self.record_topic, self)
-                self.criteria_container.add_criteria_cluster(criteria_cluster)
-                _log.debug("CONTROL config: {}, ------------------- CRITERIA config: {}".format(control_config, criteria_config))
-                control_cluster = ControlCluster(control_config, cluster_actuator, self.record_topic, self)
-                self.control_container.add_control_cluster(control_cluster)
+        self.load_clusters(config["clusters"])
 
         self.base_rpc_path = topics.RPC_DEVICE_PATH(campus="",
                                                     building="",
@@ -386,6 +381,7 @@ class ILCAgent(Agent):
         action_time = config.get("control_time", 15)
         self.action_time = td(minutes=action_time)
         self.average_window = td(minutes=config.get("average_building_power_window", 15))
+        self.bldg_power.window = self.average_window
         self.confirm_time = td(minutes=config.get("confirm_time", 5))
 
         self.actuator_schedule_buffer = td(minutes=config.get("actuator_schedule_buffer", 15)) + self.action_time
@@ -394,37 +390,113 @@ class ILCAgent(Agent):
         self.stagger_release_time = float(config.get("release_time", action_time))
         self.stagger_release = config.get("stagger_release", False)
         self.need_actuator_schedule = config.get("need_actuator_schedule", False)
+        self.actuation = ActuationPool(config.get("actuation_pool_size", 1), config.get("actuator_concurrency"),
+                                       config.get("actuator_batch_size", 1))
+        point_cache_max_age = config.get("point_cache_max_age", 0)
+        self.point_cache = PointCache(td(seconds=point_cache_max_age) if point_cache_max_age else None)
         self.demand_threshold = config.get("demand_threshold", 5.0)
         self.sim_running = config.get("simulation_running", False)
+        self.subscription_prefix_depth = config.get("subscription_prefix_depth", 0)
+        self.metrics_interval = config.get("metrics_publish_interval", 300)
+        self.profile_directory = config.get("profile_directory")
+        self.tracer.configure(config.get("trace_buffer_size", TRACE_BUFFER_SIZE), config.get("trace_sample_rates", {}))
         self.starting_base('core')
         self.config_reload_needed = False
 
+    def load_clusters(self, cluster_configs):
+        """
+        Build the criteria and control containers from the cluster configurations.  A cluster whose
+        configuration is unchanged since the previous load is reused, keeping the data it has ingested
+        (criteria history, current values, device status); only its priority is updated.  The containers
+        are always rebuilt so cached score orders never outlive a reload.
+        :param cluster_configs: list of cluster configurations
+        :return:
+        """
+        previous_criteria = self.criteria_clusters
+        previous_control = self.control_clusters
+        self.criteria_clusters = {}
+        self.control_clusters = {}
+        self.criteria_container = CriteriaContainer(self.tracer)
+        self.control_container = ControlContainer(self.tracer)
+        rebuilt = reused = 0
+
+        for cluster_config in cluster_configs:
+            _log.debug("CLUSTER CONFIG: {}".format(cluster_config))
+            pairwise_criteria_config = cluster_config["pairwise_criteria_config"]
+
+            criteria_config = cluster_config["device_criteria_config"]
+            control_config = cluster_config["device_control_config"]
+
+            cluster_priority = cluster_config["cluster_priority"]
+            cluster_actuator = cluster_config.get("cluster_actuator", "platform.actuator")
+            # Check that all three parameters are not None
+            if pairwise_criteria_config and criteria_config and control_config:
+                ahp_weights = self.ahp_compiler.compile(pairwise_criteria_config)
+                _log.debug("VALIDATE - criteria_array {} - consistency ratio {}".format(ahp_weights.criteria_matrix,
+                                                                                      ahp_weights.consistency_ratio))
+                if not ahp_weights.consistent:
+                    _log.error("Inconsistent pairwise configuration {}, cluster not loaded. Check "
+                               "configuration in: {}".format(ahp_weights.inconsistent_states(), pairwise_criteria_config))
+                    continue
+                self.load_control_modes = ahp_weights.states
+
+                # Digests are taken before the clusters are built, CriteriaCluster pops the mappers.
+                criteria_digest = config_digest([ahp_weights.digest, criteria_config, self.record_topic])
+                control_digest = config_digest([control_config, cluster_actuator, self.record_topic])
+
+                criteria_cluster = self.reuse_cluster(previous_criteria, criteria_digest)
+                if criteria_cluster is None:
+                    criteria_cluster = CriteriaCluster(cluster_priority, ahp_weights.criteria_labels,
+                                                       ahp_weights.row_average, criteria_config, self.record_topic,
+                                                       self)
+                    rebuilt += 1
+                else:
+                    criteria_cluster.priority = cluster_priority
+                    reused += 1
+                self.criteria_clusters.setdefault(criteria_digest, []).append(criteria_cluster)
+                self.criteria_container.add_criteria_cluster(criteria_cluster)
+                _log.debug("CONTROL config: {}, ------------------- CRITERIA config: {}".format(control_config, criteria_config))
+
+                control_cluster = self.reuse_cluster(previous_control, control_digest)
+                if control_cluster is None:
+                    control_cluster = ControlCluster(control_config, cluster_actuator, self.record_topic, self)
+                    rebuilt += 1
+                else:
+                    reused += 1
+                self.control_clusters.setdefault(control_digest, []).append(control_cluster)
+                self.control_container.add_control_cluster(control_cluster)
+        _log.info("Loaded clusters: {} rebuilt, {} reused".format(rebuilt, reused))
+
+    @staticmethod
+    def reuse_cluster(previous, digest):
+        """
+        Take a cluster built from identical configuration by the previous load.
+        :param previous: dictionary of digest to list of clusters, consumed
+        :param digest: configuration digest
+        :return: cluster or None
+        """
+        clusters = previous.get(digest)
+        if clusters:
+            return clusters.pop(0)
+        return None
+
 #    @Core.receiver("onstart")
     def starting_base(self, sender, **kwargs):
         """
         Startup method:
          - Setup subscriptions to curtailable devices.
          - Setup subscription to building power meter.
+        Called again on every configuration reload, only subscriptions that changed are made or removed.
         :param sender:
         :param kwargs:
         :return:
         """
-        for device_topic in self.device_topic_list:
-            _log.debug("Subscribing to " + device_topic)
-            self.vip.pubsub.subscribe(peer="pubsub",
-                                      prefix=device_topic,
-                                      callback=self.new_data)
+        subscriptions = [(device_topic, self.new_data) for device_topic in self.device_topic_list]
         if self.power_meter_topic is not None:
-            _log.debug("Subscribing to " + self.power_meter_topic)
-            self.vip.pubsub.subscribe(peer="pubsub",
-                                  prefix=self.power_meter_topic,
-                                  callback=self.load_message_handler)
+            subscriptions.append((self.power_meter_topic, self.load_message_handler))
 
         if self.kill_device_topic is not None:
-            _log.debug("Subscribing to " + self.kill_device_topic)
-            self.vip.pubsub.subscribe(peer="pubsub",
-                                      prefix=self.kill_device_topic,
-                                      callback=self.handle_agent_kill)
+            subscriptions.append((self.kill_device_topic, self.handle_agent_kill))
 
         demand_limit_handler = self.demand_limit_handler if not self.sim_running else self.simulation_demand_limit_handler
 
@@ -433,26 +505,42 @@ class ILCAgent(Agent):
         elif self.demand_schedule is not None and self.sim_running:
             self.setup_demand_schedule_sim()
 
-        self.vip.pubsub.subscribe(peer="pubsub",
-                                  prefix=self.target_agent_subscription,
-                                  callback=demand_limit_handler)
+        subscriptions.append((self.target_agent_subscription, demand_limit_handler))
         _log.debug("Target agent subscription: " + self.target_agent_subscription)
+        if self.subscriptions is None:
+            self.subscriptions = SubscriptionManager(self.vip.pubsub)
+        self.subscriptions.prefix_depth = self.subscription_prefix_depth
+        changes = self.subscriptions.update(subscriptions)
+        _log.debug("Subscriptions updated, {} changes, {} active".format(changes, len(self.subscriptions.active)))
+        if self.metrics_task is not None:
+            self.metrics_task.cancel()
+            self.metrics_task = None
+        if self.metrics_interval:
+            self.metrics_task = self.core.schedule(periodic(self.metrics_interval), self.publish_metrics)
         self.vip.pubsub.publish("pubsub", self.ilc_start_topic, headers={}, message={})
         self.setup_topics()
 
     def setup_topics(self):
-        self.criteria_topics = self.criteria_container.get_ingest_topic_dict()
-        self.control_topics = self.control_container.get_ingest_topic_dict()
-        self.all_criteria_topics = []
-        self.all_control_topics = []
-        for lst in self.criteria_topics.values():
-            self.all_criteria_topics.extend(lst)
-        for lst in self.control_topics.values():
-            self.all_control_topics.extend(lst)
+        """
+        Build the routing index used by new_data.  Each point topic maps to the criterion, DeviceStatus
+        and ControlSetting objects that consume it, so a device publish only touches those objects.
+        :return:
+        """
+        self.topic_consumers = {}
+        for consumers in (self.criteria_container.get_topic_consumers(),
+                          self.control_container.get_topic_consumers()):
+            for topic, consumer_list in consumers.items():
+                self.topic_consumers.setdefault(topic, []).extend(consumer_list)
+        # Device publishes are broken out only for the consumed points and the points curtailment reads,
+        # which the point cache can serve.
+        read_points = set(clean_point_topic(point) for point in self.control_container.get_read_points())
+        self.projection = PointProjection(set(self.topic_consumers) | read_points)
 
     @Core.receiver("onstop")
     def shutdown(self, sender, **kwargs):
         _log.debug("Shutting down ILC, releasing all controls!")
+        if self.profile_session is not None:
+            self.stop_profile()
         self.reinitialize_release()
 
     def confirm_elapsed(self):
@@ -574,7 +662,15 @@ class ILCAgent(Agent):
         }
         return
 
-    def breakout_all_publish(self, topic, message):
+    def breakout_all_publish(self, topic, message, projection=None, include_meta=True):
+        """
+        Break a device all publish out into point topics.
+        :param topic: device all topic
+        :param message: list of values and meta dictionaries
+        :param projection: PointProjection limiting the points broken out, None for all points
+        :param include_meta: False to skip the meta dictionary
+        :return: dictionaries of point topic to value and point topic to meta
+        """
         values_map = {}
         meta_map = {}
 
@@ -587,13 +683,17 @@ class ILCAgent(Agent):
 
         values, meta = message
 
-        values = parse_sympy(values)
-        meta = parse_sympy(meta)
+        if projection is not None:
+            points = projection.get_points(topic, values)
+        else:
+            points = [(point, topic + "/" + clean_text(point)) for point in values]
 
-        for point in values:
-            values_map[topic + "/" + point] = values[point]
-            if point in meta:
-                meta_map[topic + "/" + point] = meta[point]
+        for point, point_topic in points:
+            values_map[point_topic] = values[point]
+        if include_meta:
+            for point, point_topic in points:
+                if point in meta:
+                    meta_map[point_topic] = meta[point]
 
         return values_map, meta_map
 
@@ -605,42 +705,26 @@ class ILCAgent(Agent):
                     status = False
                     device_criteria.criteria_status((subdevice, state), status)
                 else:
-                    status = False
-                    for curtail_info in self.devices:
-                        if subdevice == curtail_info[1] and device_name == curtail_info[0]:
-                            status = True
-                            break
+                    status = (device_name, subdevice) in self.devices
                     device_criteria.criteria_status((subdevice, state), status)
                     _log.debug("Device: {} -- subdevice: {} -- curtail1 status: {}".format(device_name, subdevice, status))
 
-    def new_criteria_data(self, data_topics, now):
-        data_t = list(data_topics.keys())
-        device_topics = {}
-        device_criteria_topics = self.intersection(self.all_criteria_topics, data_t)
-        for topic, values in data_topics.items():
-            if topic in device_criteria_topics:
-                device_topics[topic] = values
-        device_set = set(list(device_topics.keys()))
-        for device, topic_lst in self.criteria_topics.items():
-            topic_set = set(topic_lst)
-            needed_topics = self.intersection(topic_set, device_set)
-            if needed_topics:
-                device.ingest_data(now, device_topics)
-
-    def new_control_data(self, data_topics, now):
-        data_t = list(data_topics.keys())
-        device_topics = {}
-        device_control_topics = self.intersection(self.all_control_topics, data_t)
-        for topic, values in data_topics.items():
-            if topic in device_control_topics:
-                device_topics[topic] = values
-        device_set = set(list(device_topics.keys()))
-        for device, topic_lst in self.control_topics.items():
-            topic_set = set(topic_lst)
-            needed_topics = self.intersection(topic_set, device_set)
-            if needed_topics:
-                device.ingest_data(now, device_topics)
-
+    def route_data(self, data_topics, now):
+        """
+        Pass device data to the objects that consume it.  Each consumer ingests a publish at most once.
+        :param data_topics: dictionary of point topic to value
+        :param now: timestamp of the publish
+        :return:
+        """
+        consumers = {}
+        for topic in data_topics:
+            for consumer in self.topic_consumers.get(topic, ()):
+                consumers[consumer] = None
+        for consumer in consumers:
+            consumer.ingest_data(now, data_topics)
+
+    @profiled_message
+    @timed("new_data")
     def new_data(self, peer, sender, bus, topic, header, message):
         """
         Call back method for curtailable device data subscription.
@@ -652,24 +736,16 @@ class ILCAgent(Agent):
         :param message:
         :return:
         """
-        start = time.time()
         if self.kill_signal_received:
+            self.metrics.increment("new_data.dropped")
             return
-        _log.info("Data Received for {}".format(topic))
+        self.tracer.trace("new_data", "Data Received for {}", topic)
         # self.sync_status()
         data, meta = message
         now = parse_timestamp_string(header[headers_mod.TIMESTAMP])
-        data_topics, meta_topics = self.breakout_all_publish(topic, message)
-        self.new_criteria_data(data_topics, now)
-        self.new_control_data(data_topics, now)
-        end = time.time()
-        duration = end - start
-        _log.debug("TIME: {} -- {}".format(topic, duration))
-
-    def intersection(self, topics, data):
-        topics = set(topics)
-        data = set(data)
-        return topics.intersection(data)
+        data_topics, meta_topics = self.breakout_all_publish(topic, message, self.projection, include_meta=False)
+        self.point_cache.update(now, data_topics)
+        self.route_data(data_topics, now)
 
     def check_schedule(self, current_time):
         """
@@ -742,30 +818,7 @@ class ILCAgent(Agent):
         if self.sim_running:
             self.check_schedule(current_time)
 
-        if self.bldg_power:
-            average_time = self.bldg_power[-1][0] - self.bldg_power[0][0] + td(seconds=15)
-        else:
-            average_time = td(minutes=0)
-
-        if average_time >= self.average_window and current_power > 0:
-            self.bldg_power.append((current_time, current_power))
-            self.bldg_power.pop(0)
-        elif current_power > 0:
-            self.bldg_power.append((current_time, current_power))
-
-        smoothing_constant = 2.0 / (len(self.bldg_power) + 1.0) * 2.0 if self.bldg_power else 1.0
-        smoothing_constant = smoothing_constant if smoothing_constant <= 1.0 else 1.0
-        power_sort = list(self.bldg_power)
-        power_sort.sort(reverse=True)
-        exp_power = 0
-
-        for n in range(len(self.bldg_power)):
-            exp_power += power_sort[n][1] * smoothing_constant * (1.0 - smoothing_constant) ** n
-
-        exp_power += power_sort[-1][1] * (1.0 - smoothing_constant) ** (len(self.bldg_power))
-
-        norm_list = [float(i[1]) for i in self.bldg_power]
-        average_power = mean(norm_list) if norm_list else 0.0
+        exp_power, average_power, average_time = self.bldg_power.update(current_time, current_power)
 
         _log.debug("Reported time: {} - instantaneous power: {}".format(current_time,
                                                                         current_power))
@@ -774,6 +827,8 @@ class ILCAgent(Agent):
                                                                                 exp_power))
         return exp_power, average_power, average_time
 
+    @profiled_message
+    @timed("load_message_handler")
     def load_message_handler(self, peer, sender, bus, topic, headers, message):
         """
         Call back method for building power meter. Calculates the average
@@ -787,9 +842,11 @@ class ILCAgent(Agent):
         :param message:
         :return:
         """
+        self.meter_received = time.perf_counter()
         try:
             self.sim_time += 1
             if self.kill_signal_received:
+                self.metrics.increment("load_message_handler.dropped")
                 return
             data = message[0]
             meta = message[1]
@@ -903,67 +960,70 @@ class ILCAgent(Agent):
         # self.lock = False
         self.create_application_status(result)
 
+    @timed("modify_load")
     def modify_load(self):
         """
         Curtail loads by turning off device (or device components).
         """
         _log.debug("***** ENTERING MODIFY LOADS *****************{}".format(self.state))
-        scored_devices = self.criteria_container.get_score_order(self.state)
-        _log.debug("SCORED devices: {}".format(scored_devices))
-        active_devices = self.control_container.get_devices_status(self.state)
-        _log.debug("ACTIVE devices: {}".format(active_devices))
-        score_order = [device for scored in scored_devices for device in active_devices if scored in [(device[0], device[1])]]
-        _log.debug("SCORED AND ACTIVE devices: {}".format(score_order))
-        score_order = self.actuator_request(score_order)
-
         need_curtailed = abs(self.avg_power - self.demand_limit)
         est_curtailed = 0.0
-        remaining_devices = score_order[:]
-
-        for device in self.devices:
-            if device[8] != "dollar":
-                current_tuple = (device[0], device[1], device[7])
-                if current_tuple in remaining_devices:
-                    remaining_devices.remove(current_tuple)
-
-        if not remaining_devices:
+        # Devices are pulled from the merged score order only as far as the curtailment needs, filtered
+        # to active devices that are not already controlled, and reserved a wave at a time.
+        score_order = self.criteria_container.iter_score_order(self.state)
+        # The first pull scores every cluster with new data, later pulls only walk the merge.
+        with self.metrics.timer("get_score_order"):
+            first_key = next(score_order, None)
+        if first_key is not None:
+            score_order = chain([first_key], score_order)
+        remaining_devices = (device for device in self.control_container.iter_scored_active(self.state, score_order)
+                             if not self.devices.is_controlled(*device, exclude_mode="dollar"))
+        candidates = self.iter_curtail_candidates(remaining_devices)
+        first = next(candidates, None)
+        if first is None:
             _log.debug("Everything available has already been curtailed")
             self.lock = False
             return
+        candidates = chain([first], candidates)
 
         self.lock = True
         self.state_at_actuation = self.state
         self.action_end = self.current_time + self.action_time
         self.next_confirm = self.current_time + self.confirm_time
 
-        for device in remaining_devices:
-            device_name, device_id, actuator = device
-            action_info = self.control_container.get_device((device_name, actuator)).get_control_info(device_id, self.state)
-            _log.debug("State: {} - action info: {} - device {}, {} -- remaining {}".format(self.state, action_info, device_name, device_id, remaining_devices))
-            if action_info is None:
-                continue
-            control_pt, control_value, control_load, revert_priority, revert_value, control_mode, error = self.determine_curtail_parms(action_info, device)
-            if error:
-                gevent.sleep(1)
-                continue
-            try:
-                if self.kill_signal_received:
-                    break
-                _log.debug("***** ENTER SET POINT *****************")
-                result = self.vip.rpc.call(actuator, "set_point", "ilc_agent", control_pt, control_value).get(timeout=30)
-                prefix = self.update_base_topic.split("/")[0]
-                topic = "/".join([prefix, control_pt, "Actuate"])
-                message = {"Value": control_value, "PreviousValue": revert_value}
-                self.publish_record(topic, message)
-            except (RemoteError, gevent.Timeout) as ex:
-                _log.warning("Failed to set {} to {}: {}".format(control_pt, control_value, str(ex)))
-                continue
-
-            est_curtailed += control_load
-            self.control_container.get_device((device_name, actuator)).increment_control(device_id)
-            if self.update_devices(device_name, device_id):
-                self.devices.append(
-                    [
+        # Curtail parameters are read for up to a wave of candidates ahead of the selection.  Devices are
+        # then selected in score order until the estimated load meets need_curtailed and only those are
+        # set.  Devices that fail to set are made up for from the next wave.
+        exhausted = False
+        prefetched = []
+        while (not exhausted or prefetched) and est_curtailed < need_curtailed:
+            if self.kill_signal_received:
+                break
+            wave_size = max(0, self.actuation.wave_size - len(prefetched))
+            wave = list(islice(candidates, wave_size))
+            exhausted = len(wave) < wave_size
+            prefetched.extend(zip(wave, self.actuation.map_batches(self.prepare_curtail_batch, wave)))
+
+            selected = []
+            selected_load = est_curtailed
+            while prefetched and selected_load < need_curtailed:
+                (actuator, (device, action_info)), curtail_parms = prefetched.pop(0)
+                if curtail_parms[-1]:
+                    continue
+                selected.append((actuator, (device, curtail_parms)))
+                selected_load += curtail_parms[2]
+
+            results = self.actuation.map_batches(self.set_curtail_batch, selected)
+            for (actuator, (device, curtail_parms)), success in zip(selected, results):
+                if not success:
+                    continue
+                device_name, device_id, actuator = device
+                control_pt, control_value, control_load, revert_priority, revert_value, control_mode, error = curtail_parms
+                est_curtailed += control_load
+                self.metrics.increment("devices_controlled")
+                self.control_container.get_device((device_name, actuator)).increment_control(device_id)
+                self.devices.add(
+                    ControlledDevice(
                         device_name,
                         device_id,
                         control_pt,
@@ -973,22 +1033,171 @@ class ILCAgent(Agent):
                         format_timestamp(self.current_time),
                         actuator,
                         control_mode
-                     ]
+                    )
                 )
-            if est_curtailed >= need_curtailed:
-                break
+        if self.meter_received is not None:
+            self.metrics.observe("meter_to_decision", time.perf_counter() - self.meter_received)
         self.lock = False
         self.hold()
 
-    def update_devices(self, device_name, device_id):
+    def iter_curtail_candidates(self, devices):
+        """
+        Yield the devices that have control settings for the current state, with their control info.
+        Devices are reserved with the actuator a wave at a time as they are pulled.
+        :param devices: iterator of (device_name, device_id, actuator) in score order
+        :return: iterator of (actuator, (device, control info))
+        """
+        while True:
+            wave = list(islice(devices, self.actuation.wave_size))
+            if not wave:
+                return
+            for device in self.actuator_request(wave):
+                candidate = self.get_curtail_candidate(device)
+                if candidate is not None:
+                    yield candidate
+
+    def get_curtail_candidate(self, device):
+        """
+        :param device: tuple of device_name, device_id and actuator
+        :return: tuple of actuator and (device, control info), None if the device has no control for the state
+        """
+        device_name, device_id, actuator = device
+        action_info = self.control_container.get_device((device_name, actuator)).get_control_info(device_id, self.state)
+        _log.debug("State: {} - action info: {} - device {}, {}".format(self.state, action_info, device_name, device_id))
+        if action_info is None:
+            return None
+        return actuator, (device, action_info)
+
+    def prepare_curtail_batch(self, actuator, candidates):
+        """
+        Read the curtail parameters for devices on one actuator.  When batching is configured the points
+        for all the devices are read with one get_multiple_points call.
+        :param actuator: actuator agent identity
+        :param candidates: list of tuples of device tuple and control info
+        :return: list of curtail parameters from determine_curtail_parms
+        """
+        point_values = None
+        if self.actuation.batched:
+            points = []
+            for device, action_info in candidates:
+                points.extend(self.get_curtail_points(action_info))
+            points = [point for point in dict.fromkeys(points)
+                      if self.point_cache.get(clean_point_topic(point), self.current_time) is None]
+            point_values = self.get_multiple_points(actuator, points)
+        return [self.prepare_curtail(candidate, point_values) for candidate in candidates]
+
+    def prepare_curtail(self, candidate, point_values=None):
+        """
+        Read the curtail parameters for a device.
+        :param candidate: tuple of device tuple and control info
+        :param point_values: dictionary of point values already read from the actuator
+        :return: curtail parameters from determine_curtail_parms
+        """
+        device, action_info = candidate
+        curtail_parms = self.determine_curtail_parms(action_info, device, point_values)
+        if curtail_parms[-1]:
+            gevent.sleep(1)
+        return curtail_parms
+
+    def set_curtail_batch(self, actuator, selected):
         """
-        Update devices list with only newly controlled devices.
+        Set the control points of devices on one actuator.  When batching is configured the points are
+        set with one set_multiple_points call, falling back to set_point if the call itself fails.
+        :param actuator: actuator agent identity
+        :param selected: list of tuples of device tuple and curtail parameters
+        :return: list with True for each point that was set
         """
-        for device in self.devices:
-            if device_name in device and device_id in device:
-                return False
+        if not self.actuation.batched:
+            return [self.set_curtail_point(item) for item in selected]
+        if self.kill_signal_received:
+            return [False] * len(selected)
+        topics_values = [[curtail_parms[0], curtail_parms[1]] for device, curtail_parms in selected]
+        try:
+            _log.debug("***** ENTER SET MULTIPLE POINTS *****************")
+            errors = self.call_actuator(actuator, "set_multiple_points", "ilc_agent", topics_values)
+        except (RemoteError, gevent.Timeout) as ex:
+            _log.warning("Failed to set multiple points on {}, setting points individually: {}".format(actuator, str(ex)))
+            return [self.set_curtail_point(item) for item in selected]
+
+        errors = errors or {}
+        results = []
+        for device, curtail_parms in selected:
+            control_pt, control_value, control_load, revert_priority, revert_value, control_mode, error = curtail_parms
+            if control_pt in errors:
+                _log.warning("Failed to set {} to {}: {}".format(control_pt, control_value, errors[control_pt]))
+                results.append(False)
+                continue
+            self.record_actuation(control_pt, control_value, revert_value)
+            results.append(True)
+        return results
+
+    def set_curtail_point(self, selected):
+        """
+        Set the control point of a device selected for curtailment.
+        :param selected: tuple of device tuple and curtail parameters
+        :return: True if the point was set
+        """
+        device, curtail_parms = selected
+        actuator = device[2]
+        control_pt, control_value, control_load, revert_priority, revert_value, control_mode, error = curtail_parms
+        if self.kill_signal_received:
+            return False
+        try:
+            _log.debug("***** ENTER SET POINT *****************")
+            result = self.call_actuator(actuator, "set_point", "ilc_agent", control_pt, control_value)
+            self.record_actuation(control_pt, control_value, revert_value)
+        except (RemoteError, gevent.Timeout) as ex:
+            _log.warning("Failed to set {} to {}: {}".format(control_pt, control_value, str(ex)))
+            return False
         return True
 
+    def record_actuation(self, control_pt, control_value, revert_value):
+        prefix = self.update_base_topic.split("/")[0]
+        topic = "/".join([prefix, control_pt, "Actuate"])
+        message = {"Value": control_value, "PreviousValue": revert_value}
+        self.publish_record(topic, message)
+
+    def get_multiple_points(self, actuator, points):
+        """
+        Read points with one get_multiple_points call.  Points the actuator reports an error for map to
+        a RemoteError that read_point raises, so they fail the same way a get_point call would.
+        :param actuator: actuator agent identity
+        :param points: list of point paths
+        :return: dictionary of point path to value or RemoteError, empty if the call itself failed
+        """
+        if not points:
+            return {}
+        try:
+            values, errors = self.call_actuator(actuator, "get_multiple_points", points)
+        except (RemoteError, gevent.Timeout) as ex:
+            _log.warning("Failed to get multiple points on {}, reading points individually: {}".format(actuator, str(ex)))
+            return {}
+        point_values = dict(values)
+        for point, error in (errors or {}).items():
+            point_values[point] = RemoteError("get_multiple_points failed for {}".format(point),
+                                              exc_type="RemoteError", exc_args=[point, error])
+        return point_values
+
+    def read_point(self, actuator, point, point_values=None):
+        """
+        Read a point from point_values if it was read in a batch, else from the point cache if the cached
+        value is fresh, else with a get_point call.
+        :param actuator: actuator agent identity
+        :param point: point path
+        :param point_values: dictionary of point path to value or RemoteError
+        :return: point value
+        """
+        if point_values and point in point_values:
+            value = point_values[point]
+            if isinstance(value, RemoteError):
+                raise value
+            return value
+        # The cache holds device publish topics, whose point names are cleaned.
+        value = self.point_cache.get(clean_point_topic(point), self.current_time)
+        if value is not None:
+            return value
+        return self.call_actuator(actuator, "get_point", point)
+
     def actuator_request(self, score_order):
         """
         Request schedule to interact with devices via rpc call to actuator agent.
@@ -1002,6 +1211,8 @@ class ILCAgent(Agent):
         control_devices = []
 
         already_handled = dict((device[0], True) for device in self.scheduled_devices)
+        reservations = {}
+        schedule_items = []
 
         for item in score_order:
 
@@ -1012,42 +1223,115 @@ class ILCAgent(Agent):
 
             control_device = self.base_rpc_path(path=point_device)
             if not self.need_actuator_schedule:
-                self.scheduled_devices.add((device, device_actuator, control_device))
+                self.scheduled_devices.add((device, device_actuator, control_device, control_device))
                 control_devices.append(item)
                 continue
 
-            _log.debug("Reserving device: {}".format(device))
             if device in already_handled:
-                if already_handled[device]:
-                    _log.debug("Skipping reserve device (previously reserved): " + device)
-                    control_devices.append(item)
-                continue
-
-            schedule_request = [[control_device, start_time_str, end_time_str]]
-            try:
-                if self.kill_signal_received:
-                    break
-                result = self.vip.rpc.call(device_actuator, "request_new_schedule",
-                                           self.agent_id, control_device, "HIGH", schedule_request).get(timeout=30)
-            except RemoteError as ex:
-                _log.warning("Failed to schedule device {} (RemoteError): {}".format(device, str(ex)))
-                continue
-
-            if result is not None and result["result"] == "FAILURE":
-                _log.warning("Failed to schedule device (unavailable) " + device)
-                already_handled[device] = False
-            else:
-                already_handled[device] = True
-                self.scheduled_devices.add((device, device_actuator, control_device))
+                _log.debug("Skipping reserve device (previously reserved): " + device)
+            elif device not in reservations:
+                _log.debug("Reserving device: {}".format(device))
+                reservations[device] = (device_actuator, (device_actuator, device, control_device))
+            schedule_items.append(item)
+
+        if not schedule_items:
+            return control_devices
+
+        # Devices on the same actuator are reserved with one schedule request per batch.  Devices in a
+        # batch that could not be reserved as a whole are then reserved one at a time, concurrently.
+        requests = list(reservations.values())
+        if self.kill_signal_received:
+            requests = []
+        task_ids = [None] * len(requests)
+        if self.actuation.batched:
+            task_ids = self.actuation.map_batches(partial(self.request_schedule_batch, start_time_str, end_time_str), requests)
+        retry = [index for index, task_id in enumerate(task_ids) if task_id is None]
+        retry_task_ids = self.actuation.map(partial(self.request_device_schedule, start_time_str, end_time_str),
+                                            [requests[index] for index in retry])
+        for index, task_id in zip(retry, retry_task_ids):
+            task_ids[index] = task_id
+
+        for (device_actuator, (_, device, control_device)), task_id in zip(requests, task_ids):
+            already_handled[device] = task_id is not None
+            if task_id is not None:
+                self.scheduled_devices.add((device, device_actuator, control_device, task_id))
+
+        for item in schedule_items:
+            device = item[0]
+            if already_handled.get(device):
                 control_devices.append(item)
 
         return control_devices
 
-    def determine_curtail_parms(self, control, device_dict):
+    def request_schedule_batch(self, start_time_str, end_time_str, actuator, reservations):
+        """
+        Reserve several devices on one actuator with a single schedule request.
+        :param start_time_str: schedule start
+        :param end_time_str: schedule end
+        :param actuator: actuator agent identity
+        :param reservations: list of tuples of actuator, device name and device path
+        :return: list with the task id, or None for each device if the request failed
+        """
+        if len(reservations) < 2:
+            return [None] * len(reservations)
+        self.schedule_task_count += 1
+        task_id = "{}-{}-{}".format(self.agent_id, start_time_str, self.schedule_task_count)
+        schedule_request = [[control_device, start_time_str, end_time_str] for _, device, control_device in reservations]
+        try:
+            result = self.call_actuator(actuator, "request_new_schedule",
+                                       self.agent_id, task_id, "HIGH", schedule_request)
+        except (RemoteError, gevent.Timeout) as ex:
+            _log.warning("Failed to schedule {} devices on {}: {}".format(len(reservations), actuator, str(ex)))
+            return [None] * len(reservations)
+        if result is not None and result["result"] == "FAILURE":
+            _log.debug("Batched schedule request failed on {}: {}".format(actuator, result.get("info")))
+            return [None] * len(reservations)
+        return [task_id] * len(reservations)
+
+    def request_device_schedule(self, start_time_str, end_time_str, reservation):
+        """
+        Reserve a device with its own schedule request.
+        :param start_time_str: schedule start
+        :param end_time_str: schedule end
+        :param reservation: tuple of actuator, device name and device path
+        :return: task id, None if the device could not be reserved
+        """
+        actuator, device, control_device = reservation
+        schedule_request = [[control_device, start_time_str, end_time_str]]
+        try:
+            result = self.call_actuator(actuator, "request_new_schedule",
+                                       self.agent_id, control_device, "HIGH", schedule_request)
+        except (RemoteError, gevent.Timeout) as ex:
+            _log.warning("Failed to schedule device {} (RemoteError): {}".format(device, str(ex)))
+            return None
+
+        if result is not None and result["result"] == "FAILURE":
+            _log.warning("Failed to schedule device (unavailable) " + device)
+            return None
+        return control_device
+
+    def get_curtail_points(self, control):
+        """
+        Point paths read by determine_curtail_parms for a control.
+        :param control: dictionary containing device control parameters
+        :return: list of point paths
+        """
+        points = []
+        control_load = control["load"]
+        if isinstance(control_load, dict):
+            points.extend(self.base_rpc_path(path=load_arg[1]) for load_arg in control_load["load_equation_args"])
+        points.append(self.base_rpc_path(path=control["point"]))
+        if control["control_method"].lower() == "equation":
+            points.extend(self.base_rpc_path(path=eq_arg[1]) for eq_arg in control["equation_args"])
+        return points
+
+    @timed("determine_curtail_parms")
+    def determine_curtail_parms(self, control, device_dict, point_values=None):
         """
         Pull stored curtail parameters for devices.
         :param control: dictionary containing device control parameters
         :param device_dict: tuple containing device
+        :param point_values: dictionary of point values already read from the actuator
         :return:
         """
         device, token, device_actuator = device_dict
@@ -1065,7 +1349,7 @@ class ILCAgent(Agent):
             for load_arg in control_load["load_equation_args"]:
                 point_to_get = self.base_rpc_path(path=load_arg[1])
                 try:
-                   value = self.vip.rpc.call(device_actuator, "get_point", point_to_get).get(timeout=30)
+                   value = self.read_point(device_actuator, point_to_get, point_values)
                 except RemoteError as ex:
                     _log.warning("Failed get point for load calculation {} (RemoteError): {}".format(point_to_get, str(ex)))
                     control_load = 0.0
@@ -1077,12 +1361,12 @@ class ILCAgent(Agent):
                     _log.debug("Could not convert expression for load estimation: ")
         error = False
         try:
-            revert_value = self.vip.rpc.call(device_actuator, "get_point", control_pt).get(timeout=30)
+            revert_value = self.read_point(device_actuator, control_pt, point_values)
         except (RemoteError, gevent.Timeout) as ex:
             error = True
             _log.warning("Failed get point for revert value storage {} (RemoteError): {}".format(control_pt, str(ex)))
             revert_value = None
-            return control_pt, None, control_load, revert_priority, revert_value, error
+            return control_pt, None, control_load, revert_priority, revert_value, control_mode, error
 
         if control_method.lower() == "offset":
             control_value = revert_value + control["offset"]
@@ -1092,7 +1376,7 @@ class ILCAgent(Agent):
 
             for eq_arg in control["equation_args"]:
                 point_get = self.base_rpc_path(path=eq_arg[1])
-                value = self.vip.rpc.call(device_actuator, "get_point", point_get).get(timeout=30)
+                value = self.read_point(device_actuator, point_get, point_values)
                 equation_point_values.append((eq_arg[0], value))
 
             control_value = float(equation.subs(equation_point_values))
@@ -1145,50 +1429,106 @@ class ILCAgent(Agent):
         _log.debug("Current stagger time:  {}".format(self.current_stagger))
         _log.debug("Current group size:  {}".format(self.device_group_size))
 
+    @timed("reset_devices")
     def reset_devices(self):
         """
         Release control of devices.
         :return:
         """
-        scored_devices = self.criteria_container.get_score_order(self.state_at_actuation)
-        controlled = [device for scored in scored_devices for device in self.devices if scored in [(device[0], device[1])]]
+        controlled = self.devices.ordered(self.criteria_container.iter_score_order(self.state_at_actuation))
 
         _log.debug("Controlled devices: {}".format(self.devices))
 
         currently_controlled = controlled[::-1]
         controlled_iterate = currently_controlled[:]
-        index_counter = 0
         _log.debug("Controlled devices for release reverse sort: {}".format(currently_controlled))
 
+        # Revert values are resolved in release order since get_revert_value updates the stored revert
+        # value of devices that share a point.  Distinct points are then reverted concurrently.
+        releases = []
         for item in range(self.device_group_size.pop(0)):
-            device, device_id, control_pt, revert_val, control_load, revert_priority, modified_time, actuator, control_mode = controlled_iterate[item]
-            revert_value = self.get_revert_value(device, revert_priority, revert_val)
+            controlled_device = controlled_iterate[item]
+            revert_value = self.get_revert_value(controlled_device.device_name, controlled_device.revert_priority,
+                                                 controlled_device.revert_value)
 
             _log.debug("Returned revert value: {}".format(revert_value))
+            releases.append((controlled_device.actuator,
+                             (controlled_device.actuator, controlled_device.control_pt, revert_value)))
 
-            try:
-                if revert_value is not None:
-                    result = self.vip.rpc.call(actuator, "set_point", "ilc", control_pt, revert_value).get(timeout=30)
-                    _log.debug("Reverted point: {} to value: {}".format(control_pt, revert_value))
-                else:
-                    result = self.vip.rpc.call(actuator, "revert_point", "ilc", control_pt).get(timeout=30)
-                    _log.debug("Reverted point: {} - Result: {}".format(control_pt, result))
-                if currently_controlled:
-                    _log.debug("Removing from controlled list: {} ".format(controlled_iterate[item]))
-                    self.control_container.get_device((device, actuator)).reset_control_status(device_id)
-                    index = controlled_iterate.index(controlled_iterate[item]) - index_counter
-                    currently_controlled.pop(index)
-                    index_counter += 1
-            except RemoteError as ex:
-                _log.warning("Failed to revert point {} (RemoteError): {}".format(control_pt, str(ex)))
+        start = time.perf_counter()
+        results = self.release_points(releases)
+        latency = time.perf_counter() - start
+
+        released = set()
+        for item, success in enumerate(results):
+            if not success:
                 continue
-        self.devices = currently_controlled
+            controlled_device = controlled_iterate[item]
+            _log.debug("Removing from controlled list: {} ".format(controlled_device))
+            self.control_container.get_device((controlled_device.device_name,
+                                               controlled_device.actuator)).reset_control_status(controlled_device.device_id)
+            released.add(item)
+        currently_controlled = [controlled for item, controlled in enumerate(controlled_iterate) if item not in released]
+        self.report_release(len(releases), len(released), latency)
+        self.devices.replace(currently_controlled)
         if self.current_stagger:
             self.next_release = self.current_time + td(minutes=self.current_stagger.pop(0))
         elif self.state not in ['curtail_holding', 'augment_holding', 'augment', 'curtail', 'inactive']:
             self.finished()
         self.lock = False
 
+    def release_points(self, releases):
+        """
+        Revert points, running the releases of each point one after another in release order so the point
+        ends on the value of its last release.  Different points are released concurrently.
+        :param releases: list of (actuator, (actuator, control point, revert value)) in release order
+        :return: list with the result of release_point for each release
+        """
+        point_releases = {}
+        for index, (actuator, release) in enumerate(releases):
+            point_releases.setdefault((actuator, release[1]), []).append(index)
+        groups = list(point_releases.values())
+        group_results = self.actuation.map(lambda group: [self.release_point(releases[index][1]) for index in group],
+                                           [(releases[group[0]][0], group) for group in groups])
+        results = [False] * len(releases)
+        for group, group_result in zip(groups, group_results):
+            for index, success in zip(group, group_result):
+                results[index] = success
+        return results
+
+    def release_point(self, release):
+        """
+        Revert a controlled point to its revert value, or release it on the actuator if there is none.
+        :param release: tuple of actuator, control point and revert value
+        :return: True if the point was reverted
+        """
+        actuator, control_pt, revert_value = release
+        try:
+            if revert_value is not None:
+                result = self.call_actuator(actuator, "set_point", "ilc", control_pt, revert_value)
+                _log.debug("Reverted point: {} to value: {}".format(control_pt, revert_value))
+            else:
+                result = self.call_actuator(actuator, "revert_point", "ilc", control_pt)
+                _log.debug("Reverted point: {} - Result: {}".format(control_pt, result))
+        except (RemoteError, gevent.Timeout) as ex:
+            _log.warning("Failed to revert point {} (RemoteError): {}".format(control_pt, str(ex)))
+            return False
+        return True
+
+    def report_release(self, group_size, released, latency):
+        """
+        Log and publish the time taken to release a group of devices.
+        :param group_size: number of devices in the release group
+        :param released: number of devices reverted
+        :param latency: release time in seconds
+        """
+        _log.info("Released {} of {} devices in {:.3f} s".format(released, group_size, latency))
+        if not group_size:
+            return
+        topic = "/".join([self.agent_id, "Release"])
+        message = {"GroupSize": group_size, "Released": released, "Latency": latency}
+        self.publish_record(topic, message)
+
     def get_revert_value(self, device, revert_priority, revert_value):
         """
         If BACnet priority array cannot be used this method will return the
@@ -1199,23 +1539,19 @@ class ILCAgent(Agent):
         :return:
         """
         # TODO:  Resolve issue with revert_priority as key to do BACNet release.  This is not ideal solution.
-        current_device_list = []
         if revert_priority is None:
             return None
 
-        for controlled_device in self.devices:
-            if controlled_device[0] == device:
-                current_device_list.append(controlled_device)
+        current_device_list = self.devices.device_records(device)
 
         if len(current_device_list) <= 1:
             return revert_value
 
-        index_value = max(current_device_list, key=lambda t: t[4])
-        return_value = index_value[3]
+        index_value = max(current_device_list, key=lambda t: t.control_load)
+        return_value = index_value.revert_value
         _log.debug("Stored revert value: {} for device: {}".format(return_value, device))
-        control_set_index = self.devices.index(index_value)
-        self.devices[control_set_index][3] = revert_value
-        self.devices[control_set_index][4] = revert_priority
+        index_value.revert_value = revert_value
+        index_value.control_load = revert_priority
 
         return return_value
 
@@ -1223,7 +1559,7 @@ class ILCAgent(Agent):
         if self.devices:
             self.device_group_size = [len(self.devices)]
             self.reset_devices()
-        self.devices = []
+        self.devices.clear()
         self.device_group_size = None
         self.next_release = None
         self.action_end = None
@@ -1235,15 +1571,29 @@ class ILCAgent(Agent):
                 self.reset_parameters(self.saved_config)
 
     def reset_all_devices(self):
-        for device in self.scheduled_devices:
-            try:
-                release_all = self.vip.rpc.call(device[1], "revert_device", "ilc", device[2]).get(timeout=30)
-                _log.debug("Revert device: {} with return value {}".format(device[2], release_all))
-            except RemoteError as ex:
-                _log.warning("Failed revert all on device {} (RemoteError): {}".format(device[2], str(ex)))
-            result = self.vip.rpc.call(device[1], "request_cancel_schedule", self.agent_id, device[2]).get(timeout=30)
+        # Every device is reverted before any schedule is cancelled since a batched schedule covers
+        # several devices.
+        scheduled_devices = list(self.scheduled_devices)
+        self.actuation.map(self.revert_device, [(device[1], device) for device in scheduled_devices])
+        tasks = list(dict.fromkeys((device[1], device[3]) for device in scheduled_devices))
+        self.actuation.map(self.cancel_schedule, [(task[0], task) for task in tasks])
         self.scheduled_devices = set()
 
+    def revert_device(self, scheduled_device):
+        device, actuator, control_device, task_id = scheduled_device
+        try:
+            release_all = self.call_actuator(actuator, "revert_device", "ilc", control_device)
+            _log.debug("Revert device: {} with return value {}".format(control_device, release_all))
+        except (RemoteError, gevent.Timeout) as ex:
+            _log.warning("Failed revert all on device {} (RemoteError): {}".format(control_device, str(ex)))
+
+    def cancel_schedule(self, task):
+        actuator, task_id = task
+        try:
+            result = self.call_actuator(actuator, "request_cancel_schedule", self.agent_id, task_id)
+        except (RemoteError, gevent.Timeout) as ex:
+            _log.warning("Failed to cancel schedule {} (RemoteError): {}".format(task_id, str(ex)))
+
     def create_application_status(self, result):
         """
         Publish application status.
@@ -1299,11 +1649,10 @@ class ILCAgent(Agent):
                 previous_value = data[control_pt]
                 control_time = None
                 device_state = "Inactive"
-                for item in self.devices:
-                    if device_name[0] == item[0]:
-                        previous_value = item[2]
-                        control_time = item[4]
-                        device_state = "Active"
+                for item in self.devices.device_records(device_name[0]):
+                    previous_value = item.control_pt
+                    control_time = item.control_load
+                    device_state = "Active"
 
                 if self.sim_running:
                     headers = {
@@ -1382,6 +1731,101 @@ class ILCAgent(Agent):
         self.tasks[target_info["id"]] = {"start": start_time, "end": end_time, "target": demand_goal}
         return
 
+    def call_actuator(self, actuator, method, *args):
+        """
+        Call an actuator RPC method and wait for the result, recording the round trip time.
+        :param actuator: actuator agent identity
+        :param method: RPC method name
+        :return: result of the call
+        """
+        with self.metrics.timer("rpc." + method):
+            return self.vip.rpc.call(actuator, method, *args).get(timeout=30)
+
+    def record_transition(self, *args, **kwargs):
+        self.metrics.increment("transition." + self.state)
+
+    @RPC.export
+    def get_metrics(self):
+        """
+        RPC method returning the agent's counters and latency histograms.
+        :return: dictionary of counters and histogram summaries
+        """
+        return self.metrics.snapshot()
+
+    @RPC.export
+    def start_profile(self, mode="deterministic", duration=60.0, messages=None, top=20, sort="tottime",
+                      interval=0.005):
+        """
+        RPC method starting a profiling session.  The session stops after duration seconds or after
+        messages device and meter messages are handled, whichever comes first, or on stop_profile.
+        :param mode: deterministic (cProfile) or sampling (low overhead stack sampling)
+        :param duration: session length in seconds, None to bound the session by message count only
+        :param messages: number of handled messages that ends the session
+        :param top: number of functions in the summary
+        :param sort: tottime or cumulative
+        :param interval: sampling interval in seconds
+        :return: mode and path of the profile being captured
+        """
+        if self.profile_session is not None:
+            raise RuntimeError("A {} profile is already running".format(self.profile_session.mode))
+        session = ProfileSession(mode, self.get_profile_directory(), duration=duration, messages=messages,
+                                 top=top, sort=sort, interval=interval)
+        session.start()
+        self.profile_session = session
+        self.profile_result = None
+        if duration is not None:
+            self.profile_task = self.core.schedule(get_aware_utc_now() + td(seconds=duration), self.stop_profile)
+        _log.info("Started {} profile, writing to {}".format(mode, session.path))
+        return {"mode": mode, "path": session.path}
+
+    @RPC.export
+    def stop_profile(self):
+        """
+        RPC method stopping the running profiling session.
+        :return: summary of the top functions of the running session, or of the last finished session
+        """
+        session = self.profile_session
+        if session is None:
+            return self.profile_result
+        self.profile_session = None
+        if self.profile_task is not None:
+            self.profile_task.cancel()
+            self.profile_task = None
+        self.profile_result = session.stop()
+        _log.info("Stopped {} profile after {} messages, written to {}".format(session.mode, session.handled,
+                                                                                 session.path))
+        return self.profile_result
+
+    @RPC.export
+    def get_trace(self, event=None, limit=None):
+        """
+        RPC method returning the trace ring buffer.
+        :param event: only return events of this type, e.g. new_data or device_status
+        :param limit: only return the newest limit events
+        :return: formatted events, oldest first, with per type counters and sampling rates
+        """
+        return self.tracer.dump(event, limit)
+
+    @RPC.export
+    def set_trace_rate(self, event, rate):
+        """
+        RPC method changing the sampling rate of a trace event type until the next configuration update.
+        :param event: event type
+        :param rate: fraction of events kept, 0 to 1
+        """
+        self.tracer.set_rate(event, rate)
+
+    def get_profile_directory(self):
+        if self.profile_directory is not None:
+            return self.profile_directory
+        return os.path.join(cc.get_volttron_home(), "agents", self.core.identity, "data")
+
+    def publish_metrics(self):
+        try:
+            self.publish_record("/".join([self.agent_id, "Metrics"]), self.metrics.snapshot())
+        except Exception as ex:
+            _log.debug("Unable to publish metrics: {}".format(ex))
+
     def publish_record(self, topic_suffix, message):
         if self.sim_running:
             headers = {headers_mod.DATE: format_timestamp(self.current_time)}
@@ -23,11 +23,10 @@
 # }}}
 
 import logging
-import math
-import operator
+
+import numpy as np
 
 from collections import defaultdict
-from functools import reduce
 
 from volttron.utils import load_config, setup_logging
 
@@ -38,10 +37,11 @@ logging.basicConfig(level=logging.DEBUG,
                     datefmt='%m-%d-%y %H:%M:%S')
 
 
-def extract_criteria(filename):
+def extract_criteria(filename, tracer=None):
     """
     Extract pairwise criteria parameters
     :param filename:
+    :param tracer: Tracer the configuration is recorded in
     :return:
     """
     criteria_labels = {}
@@ -49,11 +49,13 @@ def extract_criteria(filename):
     # config_matrix = load_config(filename)
     config_matrix = filename
     # check if file has been updated or uses old format
-    _log.debug("CONFIG_MATRIX: {}".format(config_matrix))
+    if tracer is not None:
+        tracer.trace("config_matrix", "CONFIG_MATRIX: {}", config_matrix)
     if "curtail" not in config_matrix.keys() and "augment" not in config_matrix.keys():
         config_matrix = {"curtail": config_matrix}
 
-    _log.debug("CONFIG_MATRIX: {}".format(config_matrix))
+    if tracer is not None:
+        tracer.trace("config_matrix", "CONFIG_MATRIX: {}", config_matrix)
     for state in config_matrix:
         index_of = dict([(a, i) for i, a in enumerate(config_matrix[state].keys())])
 
@@ -119,6 +121,51 @@ def normalize_matrix(criteria_matrix, col_sums):
     return row_sums
 
 
+# Random consistency index by matrix size (Saaty).  Larger matrices use the Alonso-Lamata estimate.
+RANDOM_INDEX = [0.0, 0.0, 0.0, 0.58, 0.9, 1.12, 1.24, 1.32, 1.41, 1.45, 1.49, 1.51, 1.48, 1.56, 1.57, 1.59]
+# Largest consistency ratio accepted for a pairwise comparison matrix.
+CONSISTENCY_THRESHOLD = 0.2
+
+
+def random_index(size):
+    """
+    Random consistency index for a pairwise matrix of the given size.
+    :param size: number of criteria
+    :return: random index
+    """
+    if size < len(RANDOM_INDEX):
+        return RANDOM_INDEX[size]
+    return (1.7699 * size - 4.3513) / (size - 1)
+
+
+def priority_vector(pairwise_matrix):
+    """
+    Principal eigenvector of a pairwise comparison matrix.
+    :param pairwise_matrix: square reciprocal matrix as a list of rows
+    :return: priority vector normalized to sum to one and the principal eigenvalue
+    """
+    matrix = np.asarray(pairwise_matrix, dtype=float)
+    eigenvalues, eigenvectors = np.linalg.eig(matrix)
+    principal = int(np.argmax(eigenvalues.real))
+    vector = np.abs(eigenvectors[:, principal].real)
+    return vector / vector.sum(), float(eigenvalues[principal].real)
+
+
+def consistency_ratio(pairwise_matrix):
+    """
+    Consistency ratio of a pairwise comparison matrix from its principal eigenvalue.  Matrices of two
+    or fewer criteria are always consistent.
+    :param pairwise_matrix: square reciprocal matrix as a list of rows
+    :return: consistency ratio
+    """
+    size = len(pairwise_matrix)
+    if size < 3:
+        return 0.0
+    _, lambda_max = priority_vector(pairwise_matrix)
+    consistency_index = (lambda_max - size) / (size - 1)
+    return consistency_index / random_index(size)
+
+
 def validate_input(pairwise_matrix, col_sums):
     """
     Validates the criteria matrix to ensure that the inputs are
@@ -129,45 +176,14 @@ def validate_input(pairwise_matrix, col_sums):
     :param col_sums:
     :return:
     """
-    # Calculate row products and take the 5th root
     _log.info("Validating matrix")
     consistent = True
     for state in pairwise_matrix:
-        random_index = [0, 0, 0, 0.58, 0.9, 1.12, 1.24, 1.32, 1.41, 1.45, 1.49]
-        roots = []
-        for row in pairwise_matrix[state]:
-            roots.append(math.pow(reduce(operator.mul, row, 1), 1.0/5))
-        # Sum the vector of products
-        root_sum = sum(roots)
-        # Calculate the priority vector
-        priority_vec = []
-        for item in roots:
-            priority_vec.append(item / root_sum)
-
-        # Calculate the priority row
-        priority_row = []
-        for i in range(0, len(col_sums[state])):
-            priority_row.append(col_sums[state][i] * priority_vec[i])
-
-        # Sum the priority row
-        priority_row_sum = sum(priority_row)
-
-        # Calculate the consistency index
-        ncols = max(len(col_sums[state]) - 1, 1)
-        consistency_index = \
-            (priority_row_sum - len(col_sums[state]))/ncols
-
-        # Calculate the consistency ratio
-        if len(col_sums[state]) < 4:
-            consistency_ratio = consistency_index
-        else:
-            rindex = random_index[len(col_sums[state])]
-            consistency_ratio = consistency_index / rindex
-
-        _log.debug("Pairwise comparison: {} - CR: {}".format(state, consistency_index))
-        if consistency_ratio > 0.2:
+        consistency = consistency_ratio(pairwise_matrix[state])
+        _log.debug("Pairwise comparison: {} - CR: {}".format(state, consistency))
+        if consistency > CONSISTENCY_THRESHOLD:
             consistent = False
-            _log.debug("Inconsistent pairwise comparison: {} - CR: {}".format(state, consistency_ratio))
+            _log.debug("Inconsistent pairwise comparison: {} - CR: {}".format(state, consistency))
 
     return consistent
 
@@ -218,3 +234,30 @@ def input_matrix(builder, criteria_labels):
                 mat_list.append(0.0)
 
     return inp_mat
+
+
+def normalize_columns(evaluations, col_sums=None):
+    """
+    Array version of input_matrix.  Divides each criteria column of the device x criteria evaluation
+    array by the column sum.  Zero evaluations stay zero.
+    :param evaluations: numpy array with one row per device and one column per criteria label
+    :param col_sums: column sums of evaluations if already known
+    :return: normalized numpy array
+    """
+    if col_sums is None:
+        col_sums = evaluations.sum(axis=0)
+    normalized = np.zeros_like(evaluations)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        np.divide(evaluations, col_sums, out=normalized, where=evaluations != 0)
+    return normalized
+
+
+def score_array(normalized, weight, priority):
+    """
+    Array version of build_score.  Returns the weighted score of each device row.
+    :param normalized: normalized device x criteria array
+    :param weight: criteria weights (row average of the pairwise matrix)
+    :param priority: cluster priority
+    :return: numpy array of scores
+    """
+    return (normalized * np.asarray(weight, dtype=float)).sum(axis=1) * priority
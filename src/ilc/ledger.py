@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*- {{{
+# ===----------------------------------------------------------------------===
+#
+#                 Installable Component of Eclipse VOLTTRON
+#
+# ===----------------------------------------------------------------------===
+#
+# Copyright 2022 Battelle Memorial Institute
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+# ===----------------------------------------------------------------------===
+# }}}
+
+
+class ControlledDevice(object):
+    """
+    A device component under control, with what is needed to release it.
+    """
+    __slots__ = ("device_name", "device_id", "control_pt", "revert_value", "control_load", "revert_priority",
+                 "modified_time", "actuator", "control_mode")
+
+    def __init__(self, device_name, device_id, control_pt, revert_value, control_load, revert_priority,
+                 modified_time, actuator, control_mode):
+        self.device_name = device_name
+        self.device_id = device_id
+        self.control_pt = control_pt
+        self.revert_value = revert_value
+        self.control_load = control_load
+        self.revert_priority = revert_priority
+        self.modified_time = modified_time
+        self.actuator = actuator
+        self.control_mode = control_mode
+
+    @property
+    def key(self):
+        return self.device_name, self.device_id
+
+    def __repr__(self):
+        return repr([getattr(self, name) for name in self.__slots__])
+
+
+class DeviceLedger(object):
+    """
+    Devices under control, in the order they were controlled (or reordered for release), indexed by
+    (device_name, device_id) and by device name.
+    """
+    def __init__(self):
+        self.records = {}
+        self.by_device = {}
+
+    def __len__(self):
+        return len(self.records)
+
+    def __bool__(self):
+        return bool(self.records)
+
+    def __iter__(self):
+        return iter(list(self.records.values()))
+
+    def __contains__(self, key):
+        return key in self.records
+
+    def __repr__(self):
+        return repr(list(self.records.values()))
+
+    def get(self, key):
+        return self.records.get(key)
+
+    def add(self, record):
+        """
+        :param record: ControlledDevice
+        :return: False if the device component is already controlled
+        """
+        if record.key in self.records:
+            return False
+        self.records[record.key] = record
+        self.by_device.setdefault(record.device_name, {})[record.key] = record
+        return True
+
+    def is_controlled(self, device_name, device_id, actuator, exclude_mode=None):
+        record = self.records.get((device_name, device_id))
+        return record is not None and record.actuator == actuator and record.control_mode != exclude_mode
+
+    def device_records(self, device_name):
+        """
+        :return: controlled components of a device in ledger order
+        """
+        return list(self.by_device.get(device_name, {}).values())
+
+    def ordered(self, keys):
+        """
+        :param keys: iterable of (device_name, device_id), only consumed until every record is found
+        :return: records of the controlled keys, in the order of keys
+        """
+        records = self.records
+        ordered = []
+        if not records:
+            return ordered
+        for key in keys:
+            record = records.get(key)
+            if record is not None:
+                ordered.append(record)
+                if len(ordered) == len(records):
+                    break
+        return ordered
+
+    def replace(self, records):
+        """
+        Replace the ledger contents, keeping the order of records.
+        """
+        self.clear()
+        for record in records:
+            self.add(record)
+
+    def clear(self):
+        self.records = {}
+        self.by_device = {}
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*- {{{
+# ===----------------------------------------------------------------------===
+#
+#                 Installable Component of Eclipse VOLTTRON
+#
+# ===----------------------------------------------------------------------===
+#
+# Copyright 2022 Battelle Memorial Institute
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+# ===----------------------------------------------------------------------===
+# }}}
+
+import time
+
+from bisect import bisect_left
+from collections import defaultdict
+from functools import wraps
+
+# Upper bounds in seconds of the latency histogram buckets, the last bucket is unbounded.
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5,
+                   5.0, 10.0, 30.0)
+
+
+class Histogram(object):
+    """
+    Fixed bucket latency histogram.  Recording a sample is a bisect and a few additions.
+    """
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.maximum:
+            self.maximum = value
+
+    def quantile(self, fraction):
+        """
+        :return: upper bound of the bucket holding the quantile, the maximum for the last bucket
+        """
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank and bucket_count:
+                return min(self.buckets[index], self.maximum) if index < len(self.buckets) else self.maximum
+        return self.maximum
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "mean": self.total / self.count if self.count else 0.0,
+            "max": self.maximum,
+            "p50": self.quantile(0.5),
+            "p90": self.quantile(0.9),
+            "p99": self.quantile(0.99),
+            "buckets": dict(zip([str(bucket) for bucket in self.buckets] + ["inf"], self.counts))
+        }
+
+
+class Timer(object):
+    def __init__(self, histogram):
+        self.histogram = histogram
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.histogram.observe(time.perf_counter() - self.start)
+        return False
+
+
+class MetricsRegistry(object):
+    """
+    Named counters and latency histograms.
+    """
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counters = defaultdict(int)
+        self.histograms = {}
+        self.started = time.time()
+
+    def increment(self, name, value=1):
+        self.counters[name] += value
+
+    def histogram(self, name):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram(self.buckets)
+        return histogram
+
+    def observe(self, name, seconds):
+        self.histogram(name).observe(seconds)
+
+    def timer(self, name):
+        """
+        Context manager recording the run time of its block, also when the block raises.
+        """
+        return Timer(self.histogram(name))
+
+    def snapshot(self):
+        return {
+            "uptime": time.time() - self.started,
+            "counters": dict(self.counters),
+            "latency": dict((name, histogram.snapshot()) for name, histogram in self.histograms.items())
+        }
+
+    def reset(self):
+        self.counters = defaultdict(int)
+        self.histograms = {}
+        self.started = time.time()
+
+
+def timed(name):
+    """
+    Method decorator recording the method run time in the instance's metrics registry.
+    :param name: histogram name
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self.metrics.timer(name):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*- {{{
+# ===----------------------------------------------------------------------===
+#
+#                 Installable Component of Eclipse VOLTTRON
+#
+# ===----------------------------------------------------------------------===
+#
+# Copyright 2022 Battelle Memorial Institute
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+# ===----------------------------------------------------------------------===
+# }}}
+
+
+class PointCache(object):
+    """
+    Latest value and timestamp of every point received on the device subscriptions.
+
+    Values are only returned while they are no older than max_age relative to the time they are
+    requested for; a max_age of None disables the cache.
+    """
+    def __init__(self, max_age=None):
+        """
+        :param max_age: maximum age of a usable value as a timedelta, None to disable the cache
+        """
+        self.max_age = max_age
+        self.values = {}
+
+    @property
+    def enabled(self):
+        return self.max_age is not None
+
+    def __len__(self):
+        return len(self.values)
+
+    def update(self, time_stamp, data):
+        """
+        Store the values of a device publish.
+        :param time_stamp: timestamp of the publish
+        :param data: dictionary of point topic to value
+        """
+        if not self.enabled:
+            return
+        for point, value in data.items():
+            if value is not None:
+                self.values[point] = (time_stamp, value)
+
+    def get(self, point, now):
+        """
+        Latest value of a point if it is fresh.
+        :param point: point topic
+        :param now: time the value is needed for
+        :return: point value, None if the point is missing or stale
+        """
+        if not self.enabled:
+            return None
+        entry = self.values.get(point)
+        if entry is None:
+            return None
+        time_stamp, value = entry
+        try:
+            if now - time_stamp > self.max_age:
+                return None
+        except TypeError:
+            # Timezone aware and naive timestamps cannot be compared, treat the value as stale.
+            return None
+        return value
+
+    def clear(self):
+        self.values = {}
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*- {{{
+# ===----------------------------------------------------------------------===
+#
+#                 Installable Component of Eclipse VOLTTRON
+#
+# ===----------------------------------------------------------------------===
+#
+# Copyright 2022 Battelle Memorial Institute
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+# ===----------------------------------------------------------------------===
+# }}}
+
+from collections import deque
+from datetime import timedelta as td
+from itertools import islice
+
+# Added to the span of the stored samples when deciding if the averaging window is full.
+SAMPLE_PADDING = td(seconds=15)
+
+
+class PowerAverager(object):
+    """
+    Streaming building power averager.
+
+    Keeps the samples of the averaging window and updates the window mean and the exponentially
+    weighted power in constant time per sample while the window length is steady.  The smoothing
+    constant depends on the number of samples, so whenever that number changes (window filling,
+    irregular meter timing) the weighted sum is recomputed over the window.  The running sums are also
+    recomputed once per window length of updates so floating point error cannot accumulate.
+    """
+    def __init__(self, window):
+        """
+        :param window: averaging window as a timedelta
+        """
+        self.window = window
+        self.times = deque()
+        self.powers = deque()
+        self.power_sum = 0.0
+        self.weighted_sum = 0.0
+        self.smoothing_constant = 1.0
+        self.tail_weight = 1.0
+        self.drop_weight = 1.0
+        self.updates = 0
+        self.ordered = True
+
+    def __len__(self):
+        return len(self.powers)
+
+    def __bool__(self):
+        return bool(self.powers)
+
+    def average_time(self):
+        if self.times:
+            return self.times[-1] - self.times[0] + SAMPLE_PADDING
+        return td(minutes=0)
+
+    def update(self, current_time, current_power):
+        """
+        Add a meter sample and return the averages.  Samples with power <= 0 are not stored.
+        :param current_time: sample time
+        :param current_power: instantaneous building power
+        :return: exponential power, average power and the window length before this sample was added
+        """
+        average_time = self.average_time()
+        if current_power > 0:
+            if self.times and current_time <= self.times[-1]:
+                self.ordered = False
+            dropped = None
+            if average_time >= self.window:
+                self.times.popleft()
+                dropped = self.powers.popleft()
+            self.times.append(current_time)
+            self.powers.append(current_power)
+            self.power_sum += current_power
+            if dropped is None:
+                self.recalculate()
+            else:
+                self.power_sum -= dropped
+                self.slide(current_power, dropped)
+
+        if not self.powers:
+            return 0.0, 0.0, average_time
+        exp_power = self.weighted_sum + self.oldest_power() * self.tail_weight
+        average_power = self.power_sum / len(self.powers)
+        return exp_power, average_power, average_time
+
+    def slide(self, new_power, dropped_power):
+        self.updates += 1
+        if not self.ordered or self.updates >= len(self.powers):
+            self.recalculate()
+            return
+        a = self.smoothing_constant
+        self.weighted_sum = a * new_power + (1.0 - a) * (self.weighted_sum - dropped_power * self.drop_weight)
+
+    def oldest_power(self):
+        if self.ordered:
+            return self.powers[0]
+        return sorted(zip(self.times, self.powers))[0][1]
+
+    def recalculate(self):
+        """
+        Recompute the weighted sum, newest sample first, and the running total from the stored samples.
+        """
+        count = len(self.powers)
+        self.ordered = all(t1 < t2 for t1, t2 in zip(self.times, islice(self.times, 1, None)))
+        a = min(2.0 / (count + 1.0) * 2.0, 1.0) if count else 1.0
+        r = 1.0 - a
+        if self.ordered:
+            newest_first = reversed(self.powers)
+        else:
+            newest_first = [power for _, power in sorted(zip(self.times, self.powers), reverse=True)]
+        weighted_sum = 0.0
+        weight = a
+        for power in newest_first:
+            weighted_sum += power * weight
+            weight *= r
+        self.weighted_sum = weighted_sum
+        self.smoothing_constant = a
+        self.tail_weight = r ** count
+        # Weight of the oldest sample in weighted_sum, removed when it leaves the window.
+        self.drop_weight = a * r ** (count - 1) if count else 0.0
+        self.power_sum = float(sum(self.powers))
+        self.updates = 0
@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*- {{{
+# ===----------------------------------------------------------------------===
+#
+#                 Installable Component of Eclipse VOLTTRON
+#
+# ===----------------------------------------------------------------------===
+#
+# Copyright 2022 Battelle Memorial Institute
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+# ===----------------------------------------------------------------------===
+# }}}
+
+import cProfile
+import os
+import pstats
+import signal
+import time
+
+from collections import Counter
+from datetime import datetime
+from functools import wraps
+
+PROFILE_MODES = ("deterministic", "sampling")
+PROFILE_SORT_KEYS = ("tottime", "cumulative")
+# Longest session start_profile accepts, in seconds.
+MAX_PROFILE_DURATION = 3600.0
+
+
+def function_label(code_key):
+    """
+    :param code_key: (filename, first line, function name) as used by cProfile
+    :return: pstats style label, e.g. .../basic.py:1045(subs)
+    """
+    return pstats.func_std_string(code_key)
+
+
+class ProfileSession(object):
+    """
+    One profiling session bounded by duration and/or message count.
+
+    deterministic mode wraps cProfile and writes a pstats file.  sampling mode uses a SIGPROF interval
+    timer to record the stack of the main thread, which is where the agent's greenlets run, and writes
+    collapsed stacks (one "caller;...;callee count" line per stack) that flame graph tools read.  Sampling
+    costs one stack walk per interval instead of a hook on every call.
+    """
+    def __init__(self, mode, directory, duration=None, messages=None, top=20, sort="tottime", interval=0.005):
+        """
+        :param mode: deterministic or sampling
+        :param directory: directory the profile is written to
+        :param duration: seconds until the agent stops the session, None for no time bound
+        :param messages: number of handled messages that stops the session, None for no message bound
+        :param top: number of functions in the summary
+        :param sort: tottime (own time or samples) or cumulative (including callees)
+        :param interval: sampling interval in seconds
+        """
+        if mode not in PROFILE_MODES:
+            raise ValueError("Profile mode must be one of {}".format(PROFILE_MODES))
+        if sort not in PROFILE_SORT_KEYS:
+            raise ValueError("Profile sort must be one of {}".format(PROFILE_SORT_KEYS))
+        if duration is None and messages is None:
+            raise ValueError("A profile needs a duration or a message count")
+        if duration is not None and not 0 < duration <= MAX_PROFILE_DURATION:
+            raise ValueError("Profile duration must be between 0 and {} seconds".format(MAX_PROFILE_DURATION))
+        if messages is not None and messages < 1:
+            raise ValueError("Profile message count must be positive")
+        if interval <= 0:
+            raise ValueError("Sampling interval must be positive")
+        self.mode = mode
+        self.directory = directory
+        self.duration = duration
+        self.messages = messages
+        self.top = top
+        self.sort = sort
+        self.interval = interval
+        self.handled = 0
+        self.profile = None
+        self.previous_handler = None
+        self.self_samples = Counter()
+        self.total_samples = Counter()
+        self.stacks = Counter()
+        # Deepest position a function was seen at, counted from the outermost frame.
+        self.depths = {}
+        self.samples = 0
+        self.started = None
+        self.start_time = None
+        self.path = None
+
+    def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self.start_time = datetime.now()
+        stamp = self.start_time.strftime("%Y%m%d-%H%M%S")
+        extension = "prof" if self.mode == "deterministic" else "folded"
+        self.path = os.path.join(self.directory, "ilc-{}-{}.{}".format(self.mode, stamp, extension))
+        self.started = time.perf_counter()
+        if self.mode == "deterministic":
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+        else:
+            self.previous_handler = signal.signal(signal.SIGPROF, self.sample)
+            signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+
+    def sample(self, signum, frame):
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+            frame = frame.f_back
+        if not stack:
+            return
+        self.samples += 1
+        self.self_samples[stack[0]] += 1
+        depth = len(stack)
+        # dict.fromkeys keeps the stack order, so recursive functions are counted once per sample.
+        for position, key in enumerate(dict.fromkeys(stack)):
+            self.total_samples[key] += 1
+            if self.depths.get(key, -1) < depth - position:
+                self.depths[key] = depth - position
+        self.stacks[tuple(reversed(stack))] += 1
+
+    def tick(self):
+        """
+        Count a handled message.
+        :return: True when the message bound is reached
+        """
+        self.handled += 1
+        return self.messages is not None and self.handled >= self.messages
+
+    def stop(self):
+        """
+        Stop profiling and write the profile.
+        :return: summary dictionary
+        """
+        elapsed = time.perf_counter() - self.started
+        if self.mode == "deterministic":
+            self.profile.disable()
+            self.profile.dump_stats(self.path)
+            functions = self.deterministic_summary()
+        else:
+            signal.setitimer(signal.ITIMER_PROF, 0, 0)
+            signal.signal(signal.SIGPROF, self.previous_handler or signal.SIG_DFL)
+            self.write_stacks()
+            functions = self.sampling_summary()
+        return {
+            "mode": self.mode,
+            "path": self.path,
+            "started": self.start_time.isoformat(),
+            "elapsed": elapsed,
+            "messages": self.handled,
+            "samples": self.samples,
+            "sort": self.sort,
+            "functions": functions
+        }
+
+    def deterministic_summary(self):
+        stats = pstats.Stats(self.profile).stats
+        index = 2 if self.sort == "tottime" else 3
+        ranked = sorted(stats.items(), key=lambda item: item[1][index], reverse=True)[:self.top]
+        return [{
+            "function": function_label(key),
+            "calls": calls,
+            "tottime": tottime,
+            "cumtime": cumtime
+        } for key, (_, calls, tottime, cumtime, _) in ranked]
+
+    def sampling_summary(self):
+        """
+        Functions ranked by the sort key.  Ties are broken by self samples and then by depth so callees
+        rank above the outer frames that are on every sample, and finally by label.
+        """
+        counts = self.self_samples if self.sort == "tottime" else self.total_samples
+        ranked = sorted(self.total_samples, key=lambda key: (-counts[key], -self.self_samples[key],
+                                                             -self.depths[key], function_label(key)))
+        return [{
+            "function": function_label(key),
+            "self_samples": self.self_samples[key],
+            "total_samples": self.total_samples[key],
+            "tottime": self.self_samples[key] * self.interval,
+            "cumtime": self.total_samples[key] * self.interval
+        } for key in ranked[:self.top]]
+
+    def write_stacks(self):
+        with open(self.path, "w") as folded:
+            for stack, samples in self.stacks.most_common():
+                folded.write("{} {}\n".format(";".join(function_label(key) for key in stack), samples))
+
+
+def profiled_message(method):
+    """
+    Handler decorator counting the message against the agent's profile session and stopping the
+    session once its message bound is reached.
+    """
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            if self.profile_session is not None and self.profile_session.tick():
+                self.stop_profile()
+    return wrapper
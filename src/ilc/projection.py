@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*- {{{
+# ===----------------------------------------------------------------------===
+#
+#                 Installable Component of Eclipse VOLTTRON
+#
+# ===----------------------------------------------------------------------===
+#
+# Copyright 2022 Battelle Memorial Institute
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+# ===----------------------------------------------------------------------===
+# }}}
+
+
+from ilc.utils import clean_text
+
+
+class PointProjection(object):
+    """
+    Projection of device all publishes onto the point topics ILC consumes.
+
+    The points of a device are learned from its first publish: every raw point name is cleaned once and
+    kept only if the resulting point topic is wanted.  Later publishes with the same point names only
+    look up the kept points.  A publish with a different set of point names is learned again.
+    """
+    def __init__(self, wanted_topics):
+        """
+        :param wanted_topics: point topics (device topic and cleaned point name) to keep
+        """
+        self.wanted_topics = set(wanted_topics)
+        self.devices = {}
+
+    def get_points(self, device_topic, values):
+        """
+        Points of a device publish to keep.
+        :param device_topic: device topic without the devices prefix and all suffix
+        :param values: values of the publish keyed by raw point name
+        :return: list of tuples of raw point name and point topic
+        """
+        learned = self.devices.get(device_topic)
+        if learned is None or learned[0] != values.keys():
+            learned = self.learn(device_topic, values)
+        return learned[1]
+
+    def learn(self, device_topic, values):
+        points = []
+        for point in values:
+            point_topic = device_topic + "/" + clean_text(point)
+            if point_topic in self.wanted_topics:
+                points.append((point, point_topic))
+        learned = self.devices[device_topic] = (frozenset(values), points)
+        return learned
@@ -0,0 +1,362 @@
+# -*- coding: utf-8 -*- {{{
+# ===----------------------------------------------------------------------===
+#
+#                 Installable Component of Eclipse VOLTTRON
+#
+# ===----------------------------------------------------------------------===
+#
+# Copyright 2022 Battelle Memorial Institute
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+# ===----------------------------------------------------------------------===
+# }}}
+
+"""
+Replay recorded message bus traffic through ILCAgent without a VOLTTRON platform.
+
+The agent is given an in-process vip (pubsub, rpc, config store and core.schedule).  Recorded device
+publishes, meter samples and target messages are published on the fake bus as fast as possible, so they
+reach new_data, load_message_handler and demand_limit_handler through the agent's own subscriptions.
+Scheduled callbacks run when the recorded time passes them.  Every control decision made through the
+actuator is recorded, and throughput and per-handler latency are reported.
+
+The recording is a file of JSON lines, one message per line:
+
+    {"topic": "devices/CAMPUS/BUILDING/RTU1/all", "headers": {"TimeStamp": "..."}, "message": [{...}, {...}]}
+
+    volttron-ilc-replay sample_configs recording.jsonl --config ilc_config
+"""
+import argparse
+import heapq
+import json
+import logging
+import os
+import sys
+import time
+
+from collections import defaultdict
+from datetime import timezone
+from itertools import count
+
+from dateutil import parser
+from volttron.utils import format_timestamp, load_config
+
+from ilc.ilc_agent import ILCAgent
+from ilc.validate_config import CLUSTER_KEYS, resolve
+
+PERCENTILES = (50, 90, 99)
+CLOCK_HEADERS = ("Date", "TimeStamp")
+
+
+def as_aware(value):
+    """
+    :return: datetime with naive values taken as UTC
+    """
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+class ReplayResult(object):
+    def __init__(self, value=None):
+        self.value = value
+
+    def get(self, timeout=None):
+        return self.value
+
+
+class ReplayBus(object):
+    """
+    Prefix matching pubsub.  Callback run time is recorded per callback name.
+    """
+    def __init__(self):
+        self.subscriptions = []
+        self.published = defaultdict(int)
+        self.latency = defaultdict(list)
+
+    def subscribe(self, peer, prefix, callback, bus="", all_platforms=False):
+        self.subscriptions.append((prefix, callback))
+        return ReplayResult()
+
+    def unsubscribe(self, peer, prefix, callback, bus="", all_platforms=False):
+        self.subscriptions = [item for item in self.subscriptions if item != (prefix, callback)]
+        return ReplayResult()
+
+    def publish(self, peer, topic, headers=None, message=None, bus=""):
+        self.published[topic] += 1
+        for prefix, callback in list(self.subscriptions):
+            if topic.startswith(prefix):
+                start = time.perf_counter()
+                callback("pubsub", "replay", bus, topic, headers or {}, message)
+                self.latency[callback.__name__].append(time.perf_counter() - start)
+        return ReplayResult()
+
+
+class ReplayActuator(object):
+    """
+    Actuator agent stand-in.  Point values are learned from the replayed device publishes, values set by
+    the agent override them until reverted.
+    """
+    def __init__(self, clock):
+        """
+        :param clock: callable returning the current replay time
+        """
+        self.clock = clock
+        self.published = {}
+        self.overrides = {}
+        self.decisions = []
+        self.task_ids = count(1)
+
+    def learn(self, topic, message):
+        levels = topic.split("/")
+        if levels[0] != "devices" or levels[-1] != "all" or not isinstance(message, list) or not message:
+            return
+        device = "/".join(levels[1:-1])
+        for point, value in message[0].items():
+            self.published[device + "/" + point] = value
+
+    def record(self, method, point, value=None):
+        self.decisions.append({"time": format_timestamp(self.clock()), "method": method, "point": point,
+                               "value": value})
+
+    def get_point(self, point):
+        if point in self.overrides:
+            return self.overrides[point]
+        return self.published.get(point)
+
+    def get_multiple_points(self, points):
+        return dict((point, self.get_point(point)) for point in points), {}
+
+    def set_point(self, requester, point, value):
+        self.overrides[point] = value
+        self.record("set_point", point, value)
+        return value
+
+    def set_multiple_points(self, requester, topics_values):
+        for point, value in topics_values:
+            self.set_point(requester, point, value)
+        return {}
+
+    def revert_point(self, requester, point):
+        self.overrides.pop(point, None)
+        self.record("revert_point", point)
+
+    def revert_device(self, requester, device):
+        for point in [point for point in self.overrides if point.startswith(device + "/")]:
+            del self.overrides[point]
+        self.record("revert_device", device)
+
+    def request_new_schedule(self, requester, task_id, priority, requests):
+        return {"result": "SUCCESS", "data": {}, "info": ""}
+
+    def request_cancel_schedule(self, requester, task_id):
+        return {"result": "SUCCESS", "data": {}, "info": ""}
+
+
+class ReplayRPC(object):
+    def __init__(self, actuator):
+        self.actuator = actuator
+
+    def call(self, peer, method, *args, **kwargs):
+        return ReplayResult(getattr(self.actuator, method)(*args, **kwargs))
+
+
+class ScheduledEvent(object):
+    def __init__(self):
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class ReplayCore(object):
+    """
+    core.schedule stand-in.  Callbacks run in time order when the replay clock reaches them.  A periodic
+    schedule (an iterator of deadlines) keeps its period but is anchored to the replay clock.
+    """
+    def __init__(self):
+        self.events = []
+        self.periodic = []
+        self.periodic_fired = 0
+        self.sequence = count()
+
+    def schedule(self, deadline, func, *args, **kwargs):
+        event = ScheduledEvent()
+        if hasattr(deadline, "tzinfo"):
+            heapq.heappush(self.events, (as_aware(deadline), next(self.sequence), event, func, args, kwargs))
+        else:
+            first = next(deadline)
+            self.periodic.append((next(deadline) - first, event, func, args, kwargs))
+        return event
+
+    def run_until(self, now):
+        """
+        :return: number of one-shot callbacks run, periodic callbacks are counted in periodic_fired
+        """
+        for period, event, func, args, kwargs in self.periodic:
+            heapq.heappush(self.events, (now + period, next(self.sequence), event, func, args,
+                                         dict(kwargs, _period=period)))
+        self.periodic = []
+        fired = 0
+        while self.events and self.events[0][0] <= now:
+            deadline, _, event, func, args, kwargs = heapq.heappop(self.events)
+            if event.cancelled:
+                continue
+            period = kwargs.get("_period")
+            if period is None:
+                func(*args, **kwargs)
+                fired += 1
+                continue
+            heapq.heappush(self.events, (deadline + period, next(self.sequence), event, func, args, kwargs))
+            kwargs = dict(kwargs)
+            del kwargs["_period"]
+            func(*args, **kwargs)
+            self.periodic_fired += 1
+        return fired
+
+
+class ReplayConfigStore(object):
+    def set_default(self, name, contents):
+        pass
+
+    def subscribe(self, callback, actions=None, pattern=None):
+        pass
+
+
+class ReplayVIP(object):
+    def __init__(self, bus, actuator):
+        self.pubsub = bus
+        self.rpc = ReplayRPC(actuator)
+        self.config = ReplayConfigStore()
+
+
+def percentiles(samples):
+    ordered = sorted(samples)
+    summary = {"count": len(ordered)}
+    for percentile in PERCENTILES:
+        index = min(len(ordered) - 1, int(round(percentile / 100.0 * (len(ordered) - 1))))
+        summary["p{}".format(percentile)] = ordered[index]
+    summary["max"] = ordered[-1]
+    return summary
+
+
+class ReplayHarness(object):
+    """
+    Drives an ILCAgent from recorded messages.
+    """
+    def __init__(self, config, agent=None):
+        """
+        :param config: main ILC configuration with the cluster configurations inline
+        :param agent: ILCAgent to drive, one is created if not given
+        """
+        if agent is None:
+            agent = ILCAgent(None)
+        self.agent = agent
+        self.now = None
+        self.bus = ReplayBus()
+        self.actuator = ReplayActuator(lambda: self.now)
+        self.core = ReplayCore()
+        self.agent.vip = ReplayVIP(self.bus, self.actuator)
+        self.agent.core = self.core
+        self.agent.configure_main("config", "NEW", config)
+        self.messages = 0
+        self.scheduled = 0
+        self.elapsed = 0.0
+
+    def advance(self, headers):
+        for name in CLOCK_HEADERS:
+            if name in headers:
+                self.now = as_aware(parser.parse(headers[name]))
+                self.scheduled += self.core.run_until(self.now)
+                return
+
+    def replay(self, records):
+        """
+        Publish recorded messages on the fake bus.
+        :param records: iterable of dictionaries with topic, headers and message
+        :return: report from report()
+        """
+        start = time.perf_counter()
+        for record in records:
+            headers = record.get("headers", {})
+            self.advance(headers)
+            self.actuator.learn(record["topic"], record["message"])
+            self.bus.publish("pubsub", record["topic"], headers=headers, message=record["message"])
+            self.messages += 1
+        self.elapsed += time.perf_counter() - start
+        return self.report()
+
+    def report(self):
+        return {
+            "messages": self.messages,
+            "elapsed": self.elapsed,
+            "messages_per_second": self.messages / self.elapsed if self.elapsed else 0.0,
+            "scheduled_callbacks": self.scheduled,
+            "latency": dict((name, percentiles(samples)) for name, samples in self.bus.latency.items()),
+            "decisions": len(self.actuator.decisions)
+        }
+
+
+def load_recording(path):
+    """
+    :param path: JSON lines recording
+    :return: iterator of message dictionaries
+    """
+    with open(path) as recording:
+        for line in recording:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def load_agent_config(config_dir, config_name="config"):
+    """
+    Load the main ILC configuration and inline the cluster configurations, as the config store does.
+    """
+    config = load_config(os.path.join(config_dir, config_name))
+    for cluster_config in config.get("clusters", []):
+        for keys in CLUSTER_KEYS:
+            cluster_config[keys[0]] = resolve(config_dir, cluster_config, keys)
+    return config
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("config_dir", help="directory holding the ILC configuration files")
+    arg_parser.add_argument("recording", help="JSON lines file of recorded messages")
+    arg_parser.add_argument("--config", default="config", help="name of the main ILC configuration file")
+    arg_parser.add_argument("--decisions", help="write the control decisions to this JSON file")
+    arg_parser.add_argument("--verbose", action="store_true", help="show agent debug logging")
+    args = arg_parser.parse_args(argv)
+    if not args.verbose:
+        logging.disable(logging.INFO)
+    harness = ReplayHarness(load_agent_config(args.config_dir, args.config))
+    report = harness.replay(load_recording(args.recording))
+    print("{} messages in {:.3f} s, {:.1f} messages/s, {} scheduled callbacks, {} decisions".format(
+        report["messages"], report["elapsed"], report["messages_per_second"], report["scheduled_callbacks"],
+        report["decisions"]))
+    print("{:<32} {:>8} {:>10} {:>10} {:>10} {:>10}".format("handler", "count", "p50 ms", "p90 ms", "p99 ms",
+                                                            "max ms"))
+    for name, summary in sorted(report["latency"].items()):
+        print("{:<32} {:>8} {:>10.3f} {:>10.3f} {:>10.3f} {:>10.3f}".format(
+            name, summary["count"], summary["p50"] * 1e3, summary["p90"] * 1e3, summary["p99"] * 1e3,
+            summary["max"] * 1e3))
+    if args.decisions:
+        with open(args.decisions, "w") as output:
+            json.dump(harness.actuator.decisions, output, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
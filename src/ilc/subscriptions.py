@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*- {{{
+# ===----------------------------------------------------------------------===
+#
+#                 Installable Component of Eclipse VOLTTRON
+#
+# ===----------------------------------------------------------------------===
+#
+# Copyright 2022 Battelle Memorial Institute
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+# ===----------------------------------------------------------------------===
+# }}}
+
+import logging
+
+from volttron.utils import setup_logging
+
+setup_logging()
+_log = logging.getLogger(__name__)
+
+
+class SubscriptionManager(object):
+    """
+    Registry of the agent's pubsub subscriptions.
+
+    update() is given the complete set of wanted (topic, callback) subscriptions and subscribes or
+    unsubscribes only the difference from the active set, so reloading the configuration never adds a
+    second subscription for a topic.  With a prefix depth, topics of the form devices/.../all that
+    share their first prefix_depth topic levels are served by one prefix subscription and routed to
+    their callbacks in process by exact topic.  Publishes under the prefix that no topic was registered
+    for are dropped.
+    """
+    def __init__(self, pubsub, prefix_depth=0):
+        """
+        :param pubsub: vip pubsub subsystem
+        :param prefix_depth: number of topic levels of consolidated prefix subscriptions, 0 disables
+        """
+        self.pubsub = pubsub
+        self.prefix_depth = prefix_depth
+        self.active = set()
+        self.routes = {}
+
+    def consolidated_prefix(self, topic):
+        """
+        :return: prefix subscription serving the topic or None if it is subscribed directly
+        """
+        levels = topic.split("/")
+        if not self.prefix_depth or levels[-1] != "all" or len(levels) <= self.prefix_depth + 1:
+            return None
+        return "/".join(levels[:self.prefix_depth]) + "/"
+
+    def plan(self, wanted):
+        """
+        :param wanted: iterable of (topic, callback)
+        :return: set of (prefix, callback) subscriptions and the routes of consolidated topics
+        """
+        wanted = list(dict.fromkeys(wanted))
+        groups = {}
+        for topic, callback in wanted:
+            prefix = self.consolidated_prefix(topic)
+            if prefix is not None:
+                groups.setdefault(prefix, set()).add(topic)
+        subscriptions = set()
+        routes = {}
+        for topic, callback in wanted:
+            prefix = self.consolidated_prefix(topic)
+            # A prefix subscription only pays off when it replaces several topic subscriptions.
+            if prefix is not None and len(groups[prefix]) > 1:
+                subscriptions.add((prefix, self.dispatch))
+                routes.setdefault(topic, []).append(callback)
+            else:
+                subscriptions.add((topic, callback))
+        return subscriptions, routes
+
+    def update(self, wanted):
+        """
+        Make the active subscriptions match wanted.
+        :param wanted: iterable of (topic, callback)
+        :return: number of subscribe and unsubscribe calls made
+        """
+        subscriptions, self.routes = self.plan(wanted)
+        removed = self.active - subscriptions
+        added = subscriptions - self.active
+        for prefix, callback in sorted(removed, key=lambda item: item[0]):
+            _log.debug("Unsubscribing from {}".format(prefix))
+            self.pubsub.unsubscribe(peer="pubsub", prefix=prefix, callback=callback)
+        for prefix, callback in sorted(added, key=lambda item: item[0]):
+            _log.debug("Subscribing to {}".format(prefix))
+            self.pubsub.subscribe(peer="pubsub", prefix=prefix, callback=callback)
+        self.active = subscriptions
+        return len(removed) + len(added)
+
+    def dispatch(self, peer, sender, bus, topic, headers, message):
+        for callback in self.routes.get(topic, ()):
+            callback(peer, sender, bus, topic, headers, message)
+
+    def clear(self):
+        return self.update(())
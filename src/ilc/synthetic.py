@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*- {{{
+# ===----------------------------------------------------------------------===
+#
+#                 Installable Component of Eclipse VOLTTRON
+#
+# ===----------------------------------------------------------------------===
+#
+# Copyright 2022 Battelle Memorial Institute
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+# ===----------------------------------------------------------------------===
+# }}}
+
+"""
+Synthetic campus configurations and device traffic for benchmarks and replay.
+
+generate_campus builds a main ILC configuration with the cluster configurations inline, as the config
+store delivers them.  Every device has one component with a mix of formula, status, history, mapper and
+constant criteria, a device status and an offset curtailment.  generate_recording produces matching device
+and meter publishes for the replay harness.
+"""
+import random
+
+from datetime import timedelta as td
+
+from volttron.utils import format_timestamp
+
+CRITERION_KINDS = ("formula", "status", "history", "mapper", "constant")
+ZONE_TYPES = {"Office": 3.0, "Conference": 5.0, "Lobby": 7.0, "Storage": 9.0}
+DEVICE_POINTS = ("FirstStageCooling", "ZoneTemperature", "ZoneTemperatureSetPoint")
+METER_POINT = "WholeBuildingPower"
+COMPONENT = "FirstStageCooling"
+
+
+def criteria_labels(criteria_count, kinds=CRITERION_KINDS):
+    """
+    :return: criteria names, cycling through the criterion kinds
+    """
+    return ["{}-{}".format(kinds[index % len(kinds)], index) for index in range(criteria_count)]
+
+
+def pairwise_config(labels, rng):
+    """
+    Exactly consistent pairwise comparisons of random criteria weights.
+    """
+    weights = [rng.uniform(1.0, 9.0) for _ in labels]
+    config = {}
+    for i, label in enumerate(labels):
+        config[label] = dict((labels[j], weights[i] / weights[j]) for j in range(i + 1, len(labels)))
+    return {"curtail": config}
+
+
+def criterion_config(label, rng):
+    kind = label.split("-")[0]
+    if kind == "formula":
+        return {"operation_type": "formula",
+                "operation": "Abs(ZoneTemperature-ZoneTemperatureSetPoint)+1",
+                "operation_args": {"always": ["ZoneTemperature", "ZoneTemperatureSetPoint"]},
+                "minimum": 0, "maximum": 10}
+    if kind == "status":
+        return {"operation_type": "status", "point_name": "FirstStageCooling",
+                "on_value": round(rng.uniform(2.0, 10.0), 1), "off_value": 0.0}
+    if kind == "history":
+        return {"operation_type": "history", "comparison_type": "direct", "point_name": "ZoneTemperature",
+                "previous_time": 15, "minimum": 0, "maximum": 10}
+    if kind == "mapper":
+        return {"operation_type": "mapper", "dict_name": "zone_type", "map_key": rng.choice(sorted(ZONE_TYPES))}
+    return {"operation_type": "constant", "value": float(rng.randint(1, 9))}
+
+
+def device_name(index):
+    return "RTU{}".format(index)
+
+
+def device_topic(campus, building, index):
+    return "/".join([campus, building, device_name(index)])
+
+
+def generate_campus(device_count, criteria_count=5, cluster_size=500, kinds=CRITERION_KINDS, seed=0,
+                    campus="CAMPUS", building="BUILDING", demand_limit=None):
+    """
+    :param device_count: number of devices
+    :param criteria_count: number of criteria per device
+    :param cluster_size: maximum number of devices per cluster
+    :param kinds: criterion kinds to cycle through
+    :param seed: random seed, the same arguments always give the same configuration
+    :param demand_limit: demand limit, defaults to half the summed device load
+    :return: main ILC configuration
+    """
+    rng = random.Random(seed)
+    labels = criteria_labels(criteria_count, kinds)
+    clusters = []
+    total_load = 0.0
+    for first in range(0, device_count, cluster_size):
+        criteria = {"mappers": {"zone_type": dict(ZONE_TYPES)}}
+        control = {}
+        for index in range(first, min(first + cluster_size, device_count)):
+            topic = device_topic(campus, building, index)
+            device_criteria = {"device_topic": topic}
+            for label in labels:
+                device_criteria[label] = criterion_config(label, rng)
+            criteria[device_name(index)] = {COMPONENT: {"curtail": device_criteria}}
+            load = round(rng.uniform(2.0, 10.0), 1)
+            total_load += load
+            control[device_name(index)] = {COMPONENT: {
+                "device_topic": topic,
+                "device_status": {"curtail": {"condition": "FirstStageCooling",
+                                              "device_status_args": ["FirstStageCooling"]}},
+                "curtail_settings": {"point": "ZoneTemperatureSetPoint", "control_method": "offset",
+                                     "offset": 2.0, "load": load}
+            }}
+        clusters.append({"pairwise_criteria_config": pairwise_config(labels, rng),
+                         "device_criteria_config": criteria,
+                         "device_control_config": control,
+                         "cluster_priority": round(rng.uniform(0.5, 2.0), 2)})
+    return {
+        "campus": campus,
+        "building": building,
+        "agent_id": "ILC",
+        "power_meter": {"device_topic": "/".join([campus, building, "METER"]), "point": METER_POINT},
+        "demand_limit": demand_limit if demand_limit is not None else round(total_load / 2.0, 1),
+        "control_time": 15,
+        "confirm_time": 5,
+        "average_building_power_window": 15,
+        "stagger_release": False,
+        "clusters": clusters
+    }
+
+
+def device_publish(rng, extra_points=0):
+    """
+    :param extra_points: number of points the agent does not use added to the publish
+    :return: values and meta of a device all publish
+    """
+    setpoint = float(rng.randint(70, 74))
+    values = {"FirstStageCooling": int(rng.random() < 0.8),
+              "ZoneTemperature": round(setpoint + rng.uniform(-2.0, 2.0), 2),
+              "ZoneTemperatureSetPoint": setpoint}
+    for index in range(extra_points):
+        values["Analog Value {}".format(index)] = float(index)
+    meta = dict((point, {"units": "None", "type": "float", "tz": "UTC"}) for point in values)
+    return [values, meta]
+
+
+def generate_recording(config, start, minutes=10, interval=1, power=None, extra_points=0, seed=0):
+    """
+    Device and meter publishes for every device of a configuration generated by generate_campus.
+    :param config: main ILC configuration
+    :param start: timezone aware time of the first publish
+    :param minutes: length of the recording
+    :param interval: minutes between publishes
+    :param power: building power, defaults to 20% over the demand limit
+    :param extra_points: number of unused points in each device publish
+    :return: list of recorded messages for the replay harness
+    """
+    rng = random.Random(seed)
+    power = power if power is not None else config["demand_limit"] * 1.2
+    topics = []
+    for cluster in config["clusters"]:
+        for name, components in cluster["device_control_config"].items():
+            topics.append("devices/{}/all".format(components[COMPONENT]["device_topic"]))
+    meter_topic = "devices/{}/all".format(config["power_meter"]["device_topic"])
+    records = []
+    for minute in range(0, minutes, interval):
+        now = format_timestamp(start + td(minutes=minute))
+        for topic in topics:
+            records.append({"topic": topic, "headers": {"TimeStamp": now},
+                            "message": device_publish(rng, extra_points)})
+        records.append({"topic": meter_topic, "headers": {"Date": now},
+                        "message": [{METER_POINT: power}, {METER_POINT: {"units": "kiloWatts", "tz": "UTC",
+                                                                          "type": "float"}}]})
+    return records
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*- {{{
+# ===----------------------------------------------------------------------===
+#
+#                 Installable Component of Eclipse VOLTTRON
+#
+# ===----------------------------------------------------------------------===
+#
+# Copyright 2022 Battelle Memorial Institute
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+# ===----------------------------------------------------------------------===
+# }}}
+
+import time
+
+from collections import defaultdict, deque
+from datetime import datetime, timezone
+
+# Number of events kept unless the agent configures another size.
+TRACE_BUFFER_SIZE = 1000
+# Sampling rates of the per message and per scoring pass events.  Other event types keep every event.
+DEFAULT_TRACE_RATES = {
+    "new_data": 0.01,
+    "device_status": 0.01,
+    "device_evaluations": 0.1,
+    "scored_devices": 0.1
+}
+
+
+class TraceEvent(object):
+    """
+    Hot path event.  The message is a str.format template and is only formatted when the event is
+    dumped.  Arguments are kept by reference, so callers pass copies of anything they mutate.
+    """
+    __slots__ = ("time", "event", "message", "args")
+
+    def __init__(self, event, message, args):
+        self.time = time.time()
+        self.event = event
+        self.message = message
+        self.args = args
+
+    def __str__(self):
+        try:
+            return self.message.format(*self.args)
+        except Exception as ex:
+            return "{} {!r} (format error: {})".format(self.message, self.args, ex)
+
+    def to_dict(self):
+        return {
+            "time": datetime.fromtimestamp(self.time, timezone.utc).isoformat(),
+            "event": self.event,
+            "message": str(self)
+        }
+
+
+class Tracer(object):
+    """
+    Sampled trace events kept in a ring buffer.
+
+    Each event type has a sampling rate between 0 and 1, see DEFAULT_TRACE_RATES.  Sampling is
+    deterministic, a rate of 0.1 keeps every tenth event of that type.  Kept events are appended to the
+    buffer unformatted and are only formatted by dump().  Callers whose arguments need copying check
+    sample() first and copy only for kept events before calling record().
+    """
+    def __init__(self, capacity=TRACE_BUFFER_SIZE, rates=None):
+        self.buffer = deque(maxlen=capacity)
+        self.rates = dict(DEFAULT_TRACE_RATES)
+        self.rates.update(rates or {})
+        self.counter = defaultdict(int)
+        self.seen = defaultdict(int)
+        self.recorded = defaultdict(int)
+
+    def configure(self, capacity=TRACE_BUFFER_SIZE, rates=None):
+        """
+        :param capacity: number of events kept
+        :param rates: dictionary of event type to sampling rate, overriding DEFAULT_TRACE_RATES
+        """
+        if capacity != self.buffer.maxlen:
+            self.buffer = deque(self.buffer, maxlen=capacity)
+        self.rates = dict(DEFAULT_TRACE_RATES)
+        self.counter.clear()
+        for event, rate in (rates or {}).items():
+            self.set_rate(event, rate)
+
+    def set_rate(self, event, rate):
+        rate = float(rate)
+        if not 0.0 <= rate <= 1.0:
+            raise ValueError("Trace sampling rate must be between 0 and 1, got {}".format(rate))
+        self.rates[event] = rate
+        self.counter.pop(event, None)
+
+    def sample(self, event):
+        self.seen[event] += 1
+        rate = self.rates.get(event, 1.0)
+        if rate >= 1.0:
+            return True
+        count = self.counter[event] = self.counter[event] + 1
+        return int(count * rate) != int((count - 1) * rate)
+
+    def trace(self, event, message, *args):
+        """
+        Record an event if it is sampled.
+        :param event: event type, the unit sampling rates are set for
+        :param message: str.format template
+        :param args: template arguments
+        """
+        if self.sample(event):
+            self.record(event, message, *args)
+
+    def record(self, event, message, *args):
+        """
+        Record an event without sampling it, for callers that already called sample().
+        """
+        self.buffer.append(TraceEvent(event, message, args))
+        self.recorded[event] += 1
+
+    def dump(self, event=None, limit=None):
+        """
+        :param event: only return events of this type
+        :param limit: only return the newest limit events
+        :return: formatted events, oldest first, with per type counters and rates
+        """
+        records = [record for record in self.buffer if event is None or record.event == event]
+        if limit is not None:
+            records = records[-limit:] if limit > 0 else []
+        return {
+            "events": [record.to_dict() for record in records],
+            "counts": dict((name, {"seen": seen, "recorded": self.recorded[name]})
+                           for name, seen in self.seen.items()),
+            "rates": dict(self.rates),
+            "capacity": self.buffer.maxlen
+        }
+
+    def clear(self):
+        self.buffer.clear()
+        self.seen.clear()
+        self.recorded.clear()
+        self.counter.clear()
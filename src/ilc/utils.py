@@ -24,13 +24,79 @@
 
 import re
 
+# Point names are cleaned by removing spaces.
+DEFAULT_REPLACEMENTS = {" ": ""}
+# Maximum number of names memoized per normalizer.
+NORMALIZE_CACHE_SIZE = 8192
+
+
+class TextNormalizer(object):
+    """
+    Replacement of substrings in names, precompiled once.
+
+    Single character replacements are done with a str.translate table, anything longer with one
+    compiled regular expression.  Results are memoized since the same point names repeat on every
+    device publish; once the memo is full new names are still normalized, just not stored.
+    """
+    def __init__(self, rep=None, cache_size=NORMALIZE_CACHE_SIZE):
+        """
+        :param rep: dictionary of substring to replacement
+        :param cache_size: maximum number of memoized names
+        """
+        rep = dict(rep) if rep else dict(DEFAULT_REPLACEMENTS)
+        self.cache_size = cache_size
+        self.cache = {}
+        self.table = None
+        self.pattern = None
+        self.rep = rep
+        if all(len(key) == 1 for key in rep):
+            self.table = str.maketrans(rep)
+        else:
+            self.pattern = re.compile("|".join(re.escape(key) for key in rep))
+
+    def __call__(self, text):
+        new_key = self.cache.get(text)
+        if new_key is None:
+            new_key = self.normalize(text)
+        return new_key
+
+    def normalize(self, text):
+        if self.table is not None:
+            new_key = text.translate(self.table)
+        else:
+            new_key = self.pattern.sub(lambda m: self.rep[m.group(0)], text)
+        if len(self.cache) < self.cache_size:
+            self.cache[text] = new_key
+        return new_key
+
+
+_default_normalizer = TextNormalizer()
+_default_cache = _default_normalizer.cache
+_normalizers = {}
+
+
+def get_normalizer(rep=None):
+    """
+    Shared normalizer for a replacement dictionary.
+    :param rep: dictionary of substring to replacement, None for the default point name cleaning
+    :return: TextNormalizer
+    """
+    if not rep:
+        return _default_normalizer
+    key = tuple(rep.items())
+    normalizer = _normalizers.get(key)
+    if normalizer is None:
+        normalizer = _normalizers[key] = TextNormalizer(rep)
+    return normalizer
+
 
 def clean_text(text, rep=None):
-    rep = rep if rep else {" ": ""}
-    rep = dict((re.escape(k), v) for k, v in rep.items())
-    pattern = re.compile("|".join(rep.keys()))
-    new_key = pattern.sub(lambda m: rep[re.escape(m.group(0))], text)
-    return new_key
+    if not rep:
+        new_key = _default_cache.get(text)
+        if new_key is None:
+            new_key = _default_normalizer.normalize(text)
+        return new_key
+    return get_normalizer(rep)(text)
 
 
 def parse_sympy(data, condition=False):
@@ -77,6 +143,15 @@ def create_device_topic_map(arg_list, default_topic=""):
 
     return result, topics
 
+def clean_point_topic(topic):
+    """
+    Clean the point name of a device/point topic the same way point names of device publishes are cleaned.
+    :param topic: device topic and point name joined by /
+    :return: cleaned topic
+    """
+    device, _, point = topic.rpartition("/")
+    return device + "/" + clean_text(point) if device else clean_text(point)
+
 def fix_up_point_name(point, default_topic=""):
     if isinstance(point, list):
         device, point = point
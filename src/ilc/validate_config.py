@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*- {{{
+# ===----------------------------------------------------------------------===
+#
+#                 Installable Component of Eclipse VOLTTRON
+#
+# ===----------------------------------------------------------------------===
+#
+# Copyright 2022 Battelle Memorial Institute
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may not
+# use this file except in compliance with the License. You may obtain a copy
+# of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+#
+# ===----------------------------------------------------------------------===
+# }}}
+
+
+"""
+Offline check of an ILC configuration directory.  Compiles the pairwise criteria of every cluster and
+builds its criteria and control objects without starting the agent.
+
+    volttron-ilc-validate sample_configs --config ilc_config
+"""
+import argparse
+import copy
+import logging
+import os
+import sys
+
+from volttron.utils import load_config
+
+from ilc.ahp import AHPCompiler
+from ilc.control_handler import ControlCluster
+from ilc.criteria_handler import CriteriaCluster
+from ilc.ilc_matrices import CONSISTENCY_THRESHOLD
+
+CONFIG_STORE_PREFIX = "config://"
+# Cluster keys used by the agent (config store references) and by the sample configurations (file names).
+CLUSTER_KEYS = [
+    ("pairwise_criteria_config", "pairwise_criteria_file"),
+    ("device_criteria_config", "device_criteria_file"),
+    ("device_control_config", "device_control_file")
+]
+
+
+def resolve(config_dir, cluster_config, keys):
+    """
+    Load a cluster configuration given inline, as a config store reference or as a file name.
+    :param config_dir: directory holding the configuration files
+    :param cluster_config: cluster entry of the main configuration
+    :param keys: keys the configuration may be given under
+    :return: configuration dictionary
+    """
+    for key in keys:
+        value = cluster_config.get(key)
+        if value is None:
+            continue
+        if isinstance(value, dict):
+            return copy.deepcopy(value)
+        if value.startswith(CONFIG_STORE_PREFIX):
+            value = value[len(CONFIG_STORE_PREFIX):]
+        return load_config(os.path.join(config_dir, value))
+    raise ValueError("Missing {}".format(" or ".join(keys)))
+
+
+def validate_cluster(config_dir, index, cluster_config, compiler):
+    """
+    Compile and build one cluster, printing a report.
+    :return: list of error messages
+    """
+    errors = []
+    pairwise_config, criteria_config, control_config = [resolve(config_dir, cluster_config, keys)
+                                                        for keys in CLUSTER_KEYS]
+    weights = compiler.compile(pairwise_config)
+    print("Cluster {} - priority {} - pairwise digest {}".format(index, cluster_config.get("cluster_priority"),
+                                                                  weights.digest[:12]))
+    for state in weights.states:
+        print("  {}: CR {:.4f}".format(state, weights.consistency_ratio[state]))
+        for label, weight, vector in zip(weights.criteria_labels[state], weights.row_average[state],
+                                         weights.priority_vector[state]):
+            print("    {:<32} weight {:.4f}  eigenvector {:.4f}".format(label, weight, vector))
+    for state, ratio in weights.inconsistent_states().items():
+        errors.append("cluster {}: {} pairwise comparison is inconsistent (CR {:.4f} > {})".format(
+            index, state, ratio, CONSISTENCY_THRESHOLD))
+
+    actuator = cluster_config.get("cluster_actuator", "platform.actuator")
+    try:
+        criteria_cluster = CriteriaCluster(cluster_config.get("cluster_priority", 1.0), weights.criteria_labels,
+                                           weights.row_average, criteria_config, "record", None)
+        control_cluster = ControlCluster(control_config, actuator, "record", None)
+    except Exception as ex:
+        errors.append("cluster {}: {}: {}".format(index, type(ex).__name__, ex))
+        return errors
+    print("  {} criteria devices, {} control devices".format(len(criteria_cluster.criteria),
+                                                            len(control_cluster.devices)))
+    for name, device in criteria_cluster.criteria.items():
+        for (token, state), criteria in device.criteria.items():
+            if state in weights.criteria_labels and set(criteria.criteria) != set(weights.criteria_labels[state]):
+                errors.append("cluster {}: criteria of {} {} ({}) do not match the pairwise criteria".format(
+                    index, name, token, state))
+    return errors
+
+
+def validate_config_dir(config_dir, config_name="config"):
+    """
+    Validate every cluster of the main configuration in config_dir.
+    :return: list of error messages
+    """
+    config = load_config(os.path.join(config_dir, config_name))
+    compiler = AHPCompiler()
+    errors = []
+    for index, cluster_config in enumerate(config.get("clusters", [])):
+        try:
+            errors.extend(validate_cluster(config_dir, index, cluster_config, compiler))
+        except Exception as ex:
+            errors.append("cluster {}: {}: {}".format(index, type(ex).__name__, ex))
+    return errors
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("config_dir", help="directory holding the ILC configuration files")
+    arg_parser.add_argument("--config", default="config", help="name of the main ILC configuration file")
+    arg_parser.add_argument("--verbose", action="store_true", help="show agent debug logging")
+    args = arg_parser.parse_args(argv)
+    if not args.verbose:
+        logging.disable(logging.INFO)
+    errors = validate_config_dir(args.config_dir, args.config)
+    for error in errors:
+        print("ERROR: {}".format(error))
+    print("Configuration is {}".format("invalid" if errors else "valid"))
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
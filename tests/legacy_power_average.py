@@ -0,0 +1,33 @@
+"""
+Reference implementation of the building power averages before PowerAverager, used by the power
+average tests and benchmark.
+"""
+from datetime import timedelta
+
+
+class LegacyAverager(object):
+    """Sort-based averaging previously done in ILCAgent.calculate_average_power."""
+    def __init__(self, window):
+        self.window = window
+        self.bldg_power = []
+
+    def update(self, current_time, current_power):
+        if self.bldg_power:
+            average_time = self.bldg_power[-1][0] - self.bldg_power[0][0] + timedelta(seconds=15)
+        else:
+            average_time = timedelta(minutes=0)
+        if average_time >= self.window and current_power > 0:
+            self.bldg_power.append((current_time, current_power))
+            self.bldg_power.pop(0)
+        elif current_power > 0:
+            self.bldg_power.append((current_time, current_power))
+        smoothing_constant = 2.0 / (len(self.bldg_power) + 1.0) * 2.0 if self.bldg_power else 1.0
+        smoothing_constant = smoothing_constant if smoothing_constant <= 1.0 else 1.0
+        power_sort = list(self.bldg_power)
+        power_sort.sort(reverse=True)
+        exp_power = 0
+        for n in range(len(self.bldg_power)):
+            exp_power += power_sort[n][1] * smoothing_constant * (1.0 - smoothing_constant) ** n
+        exp_power += power_sort[-1][1] * (1.0 - smoothing_constant) ** (len(self.bldg_power))
+        average_power = sum(float(p) for _, p in self.bldg_power) / len(self.bldg_power)
+        return exp_power, average_power, average_time
@@ -0,0 +1,82 @@
+import random
+
+from ilc.control_handler import ControlCluster, ControlContainer
+
+
+def control_config(names):
+    return dict((name, {"Stage1": {
+        "device_topic": "CAMPUS/BUILDING/" + name,
+        "device_status": {"condition": "Stage1", "device_status_args": ["Stage1"]},
+        "curtail_settings": {"point": "ZoneTemperatureSetPoint", "control_method": "offset", "offset": 2.0,
+                             "load": 6.0}
+    }}) for name in names)
+
+
+def build_container(clusters):
+    container = ControlContainer()
+    for names, actuator in clusters:
+        container.add_control_cluster(ControlCluster(control_config(names), actuator, "record", None))
+    return container
+
+
+def publish(container, statuses):
+    container.ingest_data(None, dict(("CAMPUS/BUILDING/{}/Stage1".format(name), value)
+                                     for name, value in statuses.items()))
+
+
+def legacy_status(container, state):
+    devices = []
+    for cluster in container.clusters:
+        devices.extend(cluster.get_all_devices_status(state))
+    return devices
+
+
+def test_active_index_follows_transitions():
+    names = ["RTU{}".format(i) for i in range(20)]
+    container = build_container([(names[:10], "platform.actuator"), (names[10:], "other.actuator")])
+    assert container.get_devices_status("curtail") == []
+    rng = random.Random(7)
+    for _ in range(10):
+        publish(container, dict((name, rng.randint(0, 1)) for name in rng.sample(names, 8)))
+        assert container.get_devices_status("curtail") == legacy_status(container, "curtail")
+    publish(container, dict((name, 0) for name in names))
+    assert container.get_devices_status("curtail") == []
+
+
+def test_scored_active_join():
+    names = ["RTU{}".format(i) for i in range(10)]
+    container = build_container([(names, "platform.actuator"), (names[5:], "other.actuator")])
+    publish(container, dict((name, i % 3 != 0) for i, name in enumerate(names)))
+    scored = [(name, "Stage1") for name in reversed(names[2:])]
+    active = container.get_devices_status("curtail")
+    expected = [device for key in scored for device in active if key == device[:2]]
+    assert list(container.iter_scored_active("curtail", iter(scored))) == expected
+
+
+def test_scored_active_is_lazy():
+    names = ["RTU{}".format(i) for i in range(10)]
+    container = build_container([(names, "platform.actuator")])
+    publish(container, dict((name, 1) for name in names))
+    pulled = []
+
+    def score_order():
+        for name in names:
+            pulled.append(name)
+            yield name, "Stage1"
+
+    devices = container.iter_scored_active("curtail", score_order())
+    assert [next(devices), next(devices)] == [("RTU0", "Stage1", "platform.actuator"),
+                                              ("RTU1", "Stage1", "platform.actuator")]
+    assert pulled == ["RTU0", "RTU1"]
+
+
+def test_reused_cluster_keeps_active_devices():
+    cluster = ControlCluster(control_config(["RTU1", "RTU2"]), "platform.actuator", "record", None)
+    container = ControlContainer()
+    container.add_control_cluster(cluster)
+    publish(container, {"RTU1": 1, "RTU2": 0})
+    reloaded = ControlContainer()
+    reloaded.add_control_cluster(cluster)
+    assert reloaded.get_devices_status("curtail") == [("RTU1", "Stage1", "platform.actuator")]
+    publish(reloaded, {"RTU1": 0, "RTU2": 1})
+    assert reloaded.get_devices_status("curtail") == [("RTU2", "Stage1", "platform.actuator")]
@@ -0,0 +1,429 @@
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+import gevent
+import pytest
+
+from volttron.client.messaging import headers as headers_mod, topics
+from volttron.utils import format_timestamp
+from volttron.utils.jsonrpc import RemoteError
+
+from ilc.actuation import ActuationPool
+from ilc.control_handler import ControlCluster, ControlContainer
+from ilc.ilc_agent import ILCAgent
+from ilc.ledger import ControlledDevice
+from ilc.point_cache import PointCache
+
+LATENCY = 0.02
+DEVICE_COUNT = 20
+DEVICE_LOAD = 6.0
+
+
+class InFlight(object):
+    """Calls in progress across several fake actuators."""
+    def __init__(self):
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+
+class FakeActuator(object):
+    """Actuator agent stand-in with a fixed round trip time."""
+    def __init__(self, latency, fail_points=(), fail_reads=(), multi_point=True, unavailable=(), total=None):
+        self.latency = latency
+        self.total = total or InFlight()
+        self.unavailable = set(unavailable)
+        self.schedules = {}
+        self.fail_points = set(fail_points)
+        self.fail_reads = set(fail_reads)
+        self.multi_point = multi_point
+        self.values = {}
+        self.set_calls = []
+        self.calls = Counter()
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def get_point(self, point):
+        if point in self.fail_reads:
+            raise RemoteError("get_point failed", exc_type="ValueError", exc_args=[point])
+        return self.values.get(point, 72.0)
+
+    def set_point(self, requester, point, value):
+        if point in self.fail_points:
+            raise RemoteError("set_point failed", exc_type="ValueError", exc_args=[point])
+        self.values[point] = value
+        self.set_calls.append(point)
+        return value
+
+    def revert_point(self, requester, point):
+        if point in self.fail_points:
+            raise RemoteError("revert_point failed", exc_type="ValueError", exc_args=[point])
+        self.values.pop(point, None)
+        self.set_calls.append(point)
+
+    def request_new_schedule(self, requester, task_id, priority, requests):
+        if any(request[0] in self.unavailable for request in requests):
+            return {"result": "FAILURE", "info": "CONFLICTS_WITH_EXISTING_SCHEDULES", "data": {}}
+        self.schedules[task_id] = [request[0] for request in requests]
+        return {"result": "SUCCESS", "info": "", "data": {}}
+
+    def request_cancel_schedule(self, requester, task_id):
+        self.schedules.pop(task_id)
+        return {"result": "SUCCESS", "info": "", "data": {}}
+
+    def revert_device(self, requester, device):
+        return None
+
+    def get_multiple_points(self, points):
+        results, errors = {}, {}
+        for point in points:
+            try:
+                results[point] = self.get_point(point)
+            except RemoteError as ex:
+                errors[point] = repr(ex)
+        return results, errors
+
+    def set_multiple_points(self, requester, topics_values):
+        errors = {}
+        for point, value in topics_values:
+            try:
+                self.set_point(requester, point, value)
+            except RemoteError as ex:
+                errors[point] = repr(ex)
+        return errors
+
+    def call(self, method, *args):
+        self.calls[method] += 1
+        if method.endswith("multiple_points") and not self.multi_point:
+            raise RemoteError("No such method", exc_type="NotImplementedError", exc_args=[method])
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        self.total.in_flight += 1
+        self.total.max_in_flight = max(self.total.max_in_flight, self.total.in_flight)
+        try:
+            gevent.sleep(self.latency)
+            return getattr(self, method)(*args)
+        finally:
+            self.in_flight -= 1
+            self.total.in_flight -= 1
+
+
+class FakeRPC(object):
+    def __init__(self, actuators):
+        self.actuators = actuators
+
+    def call(self, peer, method, *args):
+        return gevent.spawn(self.actuators[peer].call, method, *args)
+
+
+class FakeResult(object):
+    def get(self, timeout=None):
+        return None
+
+
+class FakePubSub(object):
+    def publish(self, *args, **kwargs):
+        return FakeResult()
+
+
+class FakeVIP(object):
+    def __init__(self, actuators):
+        self.rpc = FakeRPC(actuators)
+        self.pubsub = FakePubSub()
+
+
+class FakeCriteria(object):
+    def __init__(self, score_order):
+        self.score_order = score_order
+
+    def get_score_order(self, state):
+        return list(self.score_order)
+
+    def iter_score_order(self, state):
+        return iter(self.score_order)
+
+
+def control_config(device_count, setpoint="ZoneTemperatureSetPoint", first=0):
+    config = {}
+    for i in range(first, first + device_count):
+        config["RTU{}".format(i)] = {
+            "FirstStageCooling": {
+                "device_topic": "CAMPUS/BUILDING/RTU{}".format(i),
+                "device_status": {"condition": "FirstStageCooling", "device_status_args": ["FirstStageCooling"]},
+                "curtail_settings": {"point": setpoint, "control_method": "offset",
+                                     "offset": 2.0, "load": DEVICE_LOAD}
+            }
+        }
+    return config
+
+
+def build_agent(actuator, pool_size, actuator_concurrency=None, need_curtailed=60.0, batch_size=1,
+                setpoint="ZoneTemperatureSetPoint"):
+    agent = ILCAgent(None)
+    agent.vip = FakeVIP({"platform.actuator": actuator})
+    container = ControlContainer()
+    container.add_control_cluster(ControlCluster(control_config(DEVICE_COUNT, setpoint), "platform.actuator", "record", agent))
+    now = datetime(2026, 7, 1, 12, 0)
+    container.ingest_data(now, {"CAMPUS/BUILDING/RTU{}/FirstStageCooling".format(i): 1 for i in range(DEVICE_COUNT)})
+    agent.control_container = container
+    agent.criteria_container = FakeCriteria([("RTU{}".format(i), "FirstStageCooling") for i in range(DEVICE_COUNT)])
+    agent.state = "curtail"
+    agent.hold = lambda: None
+    agent.avg_power = 100.0 + need_curtailed
+    agent.demand_limit = 100.0
+    agent.current_time = now
+    agent.action_time = timedelta(minutes=15)
+    agent.need_actuator_schedule = False
+    agent.longest_possible_curtail = timedelta(minutes=30)
+    agent.actuator_schedule_buffer = timedelta(minutes=30)
+    agent.base_rpc_path = topics.RPC_DEVICE_PATH(campus="", building="", unit="", path=None, point="")
+    agent.update_base_topic = "record/CAMPUS/BUILDING"
+    agent.record_topic = "record"
+    agent.sim_running = False
+    agent.actuation = ActuationPool(pool_size, actuator_concurrency, batch_size)
+    agent.agent_id = "ILC"
+    agent.current_stagger = []
+    return agent
+
+
+def curtailed_devices(agent):
+    return [device.device_name for device in agent.devices]
+
+
+def test_concurrent_matches_serial():
+    serial_actuator = FakeActuator(LATENCY)
+    serial = build_agent(serial_actuator, pool_size=1)
+    serial.modify_load()
+
+    concurrent_actuator = FakeActuator(LATENCY)
+    concurrent = build_agent(concurrent_actuator, pool_size=10)
+    concurrent.modify_load()
+
+    expected = ["RTU{}".format(i) for i in range(10)]
+    assert curtailed_devices(serial) == expected
+    assert curtailed_devices(concurrent) == expected
+    # Only the devices needed to meet the target are set.
+    assert len(concurrent_actuator.set_calls) == 10
+    assert serial_actuator.max_in_flight == 1
+    assert concurrent_actuator.max_in_flight == 10
+
+
+def test_actuator_concurrency_limit():
+    actuator = FakeActuator(LATENCY)
+    agent = build_agent(actuator, pool_size=10, actuator_concurrency=3)
+    agent.modify_load()
+    assert actuator.max_in_flight == 3
+    assert curtailed_devices(agent) == ["RTU{}".format(i) for i in range(10)]
+
+
+def test_concurrency_limits_per_actuator_and_pool():
+    total = InFlight()
+    actuator = FakeActuator(LATENCY, total=total)
+    other = FakeActuator(LATENCY, total=total)
+    agent = build_agent(actuator, pool_size=5, actuator_concurrency=3, need_curtailed=2 * DEVICE_COUNT * DEVICE_LOAD)
+    agent.vip = FakeVIP({"platform.actuator": actuator, "other.actuator": other})
+    agent.control_container.add_control_cluster(
+        ControlCluster(control_config(DEVICE_COUNT, first=DEVICE_COUNT), "other.actuator", "record", agent))
+    agent.control_container.ingest_data(agent.current_time, {"CAMPUS/BUILDING/RTU{}/FirstStageCooling".format(i): 1
+                                                             for i in range(2 * DEVICE_COUNT)})
+    # Alternate the actuators in the score order so waves span both.
+    agent.criteria_container = FakeCriteria([("RTU{}".format(i + offset), "FirstStageCooling")
+                                             for i in range(DEVICE_COUNT) for offset in (0, DEVICE_COUNT)])
+    agent.modify_load()
+    assert len(agent.devices) == 2 * DEVICE_COUNT
+    assert actuator.max_in_flight == other.max_in_flight == 3
+    assert total.max_in_flight == 5
+
+
+@pytest.mark.parametrize("pool_size, batch_size", [(1, 1), (4, 1), (10, 1), (1, 4), (2, 3)])
+def test_failed_set_is_replaced_in_score_order(pool_size, batch_size):
+    actuator = FakeActuator(LATENCY, fail_points={"CAMPUS/BUILDING/RTU2/ZoneTemperatureSetPoint"})
+    agent = build_agent(actuator, pool_size=pool_size, need_curtailed=24.0, batch_size=batch_size)
+    agent.modify_load()
+    assert curtailed_devices(agent) == ["RTU0", "RTU1", "RTU3", "RTU4"]
+    assert all(device.revert_value == 72.0 for device in agent.devices)
+    assert actuator.values["CAMPUS/BUILDING/RTU0/ZoneTemperatureSetPoint"] == 74.0
+
+
+def test_batched_round_trips():
+    actuator = FakeActuator(LATENCY)
+    agent = build_agent(actuator, pool_size=1, batch_size=DEVICE_COUNT)
+    agent.modify_load()
+    assert curtailed_devices(agent) == ["RTU{}".format(i) for i in range(10)]
+    assert actuator.calls == {"get_multiple_points": 1, "set_multiple_points": 1}
+
+
+@pytest.mark.parametrize("batch_size", [1, 5])
+def test_failed_read_skips_device(batch_size):
+    actuator = FakeActuator(LATENCY, fail_reads={"CAMPUS/BUILDING/RTU1/ZoneTemperatureSetPoint"})
+    agent = build_agent(actuator, pool_size=1, need_curtailed=18.0, batch_size=batch_size)
+    agent.modify_load()
+    assert curtailed_devices(agent) == ["RTU0", "RTU2", "RTU3"]
+
+
+def test_batch_falls_back_to_single_point_calls():
+    actuator = FakeActuator(LATENCY, multi_point=False)
+    agent = build_agent(actuator, pool_size=1, batch_size=5, need_curtailed=18.0)
+    agent.modify_load()
+    assert curtailed_devices(agent) == ["RTU0", "RTU1", "RTU2"]
+    assert actuator.calls["get_point"] == 5
+    assert actuator.calls["set_point"] == 3
+
+
+def publish_devices(agent, time_stamp, setpoint, setpoint_name="ZoneTemperatureSetPoint"):
+    header = {headers_mod.TIMESTAMP: format_timestamp(time_stamp)}
+    for i in range(DEVICE_COUNT):
+        message = [{"FirstStageCooling": 1, setpoint_name: setpoint}, {}]
+        agent.new_data("pubsub", "platform.driver", "pubsub", "devices/CAMPUS/BUILDING/RTU{}/all".format(i),
+                       header, message)
+
+
+@pytest.mark.parametrize("batch_size", [1, 5])
+def test_fresh_cached_values_replace_reads(batch_size):
+    actuator = FakeActuator(LATENCY)
+    agent = build_agent(actuator, pool_size=1, batch_size=batch_size)
+    agent.point_cache = PointCache(timedelta(minutes=5))
+    agent.current_time = agent.current_time.replace(tzinfo=timezone.utc)
+    publish_devices(agent, agent.current_time - timedelta(minutes=1), 75.0)
+    agent.modify_load()
+    assert curtailed_devices(agent) == ["RTU{}".format(i) for i in range(10)]
+    assert all(device.revert_value == 75.0 for device in agent.devices)
+    assert actuator.calls["get_point"] == actuator.calls["get_multiple_points"] == 0
+
+
+@pytest.mark.parametrize("batch_size", [1, 5])
+def test_cached_values_match_cleaned_point_names(batch_size):
+    actuator = FakeActuator(LATENCY)
+    agent = build_agent(actuator, pool_size=1, batch_size=batch_size, setpoint="Zone Temperature SetPoint")
+    agent.point_cache = PointCache(timedelta(minutes=5))
+    agent.current_time = agent.current_time.replace(tzinfo=timezone.utc)
+    publish_devices(agent, agent.current_time - timedelta(minutes=1), 75.0, "Zone Temperature SetPoint")
+    agent.modify_load()
+    assert all(device.revert_value == 75.0 for device in agent.devices)
+    assert actuator.calls["get_point"] == actuator.calls["get_multiple_points"] == 0
+    assert "CAMPUS/BUILDING/RTU0/Zone Temperature SetPoint" in actuator.values
+
+
+def test_stale_cached_values_are_read():
+    actuator = FakeActuator(LATENCY)
+    agent = build_agent(actuator, pool_size=1)
+    agent.point_cache = PointCache(timedelta(minutes=5))
+    agent.current_time = agent.current_time.replace(tzinfo=timezone.utc)
+    publish_devices(agent, agent.current_time - timedelta(minutes=10), 75.0)
+    agent.modify_load()
+    assert all(device.revert_value == 72.0 for device in agent.devices)
+    assert actuator.calls["get_point"] == 10
+
+
+@pytest.mark.parametrize("pool_size", [1, 10])
+def test_release_group(pool_size):
+    actuator = FakeActuator(LATENCY)
+    agent = build_agent(actuator, pool_size=pool_size)
+    agent.modify_load()
+    assert len(agent.devices) == 10
+    actuator.fail_points = {"CAMPUS/BUILDING/RTU4/ZoneTemperatureSetPoint"}
+    actuator.set_calls = []
+    agent.device_group_size = [10]
+    agent.reset_devices()
+    assert curtailed_devices(agent) == ["RTU4"]
+    assert list(actuator.values) == ["CAMPUS/BUILDING/RTU4/ZoneTemperatureSetPoint"]
+    # Released in reverse score order.
+    assert actuator.set_calls[0] == "CAMPUS/BUILDING/RTU9/ZoneTemperatureSetPoint"
+    assert actuator.max_in_flight == pool_size
+
+
+class ReorderingActuator(FakeActuator):
+    """Each call returns faster than the one before, so concurrent calls complete in reverse order."""
+    def call(self, method, *args):
+        self.latency = max(0.0, self.latency - 0.01)
+        return super(ReorderingActuator, self).call(method, *args)
+
+
+@pytest.mark.parametrize("pool_size", [1, 10])
+def test_shared_point_released_in_order(pool_size):
+    actuator = ReorderingActuator(0.05)
+    agent = build_agent(actuator, pool_size=pool_size)
+    point = "CAMPUS/BUILDING/RTU0/ZoneTemperatureSetPoint"
+    components = [("Stage1", 72.0), ("Stage2", 74.0)]
+    agent.control_container = ControlContainer()
+    agent.control_container.add_control_cluster(ControlCluster({"RTU0": dict(
+        (component, {"device_topic": "CAMPUS/BUILDING/RTU0",
+                     "device_status": {"condition": "FirstStageCooling",
+                                       "device_status_args": ["FirstStageCooling"]},
+                     "curtail_settings": {"point": "ZoneTemperatureSetPoint", "control_method": "offset",
+                                          "offset": 2.0, "load": DEVICE_LOAD}})
+        for component, _ in components)}, "platform.actuator", "record", agent))
+    agent.criteria_container = FakeCriteria([("RTU0", component) for component, _ in components])
+    for component, revert_value in components:
+        agent.devices.add(ControlledDevice("RTU0", component, point, revert_value, DEVICE_LOAD, 1, None,
+                                           "platform.actuator", "comfort"))
+    agent.state_at_actuation = "curtail"
+    agent.device_group_size = [2]
+    agent.reset_devices()
+    # Stage2 is released first with the value stored by Stage1, then Stage1 with the value stored by Stage2,
+    # as the sequential release did.
+    assert actuator.set_calls == [point, point]
+    assert actuator.values == {point: 74.0}
+    assert not agent.devices
+
+
+def scheduled_agent(actuator, batch_size, pool_size=1):
+    agent = build_agent(actuator, pool_size=pool_size, batch_size=batch_size)
+    agent.need_actuator_schedule = True
+    agent.agent_id = "ILC"
+    return agent
+
+
+def test_batched_schedule_request():
+    actuator = FakeActuator(LATENCY)
+    agent = scheduled_agent(actuator, batch_size=DEVICE_COUNT)
+    agent.modify_load()
+    assert curtailed_devices(agent) == ["RTU{}".format(i) for i in range(10)]
+    assert actuator.calls["request_new_schedule"] == 1
+    [devices] = actuator.schedules.values()
+    assert len(devices) == DEVICE_COUNT
+    agent.reset_all_devices()
+    assert actuator.calls["revert_device"] == DEVICE_COUNT
+    assert actuator.calls["request_cancel_schedule"] == 1
+    assert actuator.schedules == {}
+    assert agent.scheduled_devices == set()
+
+
+@pytest.mark.parametrize("batch_size, pool_size", [(1, 1), (2, 2)])
+def test_modify_load_pulls_only_needed_devices(batch_size, pool_size):
+    actuator = FakeActuator(LATENCY)
+    agent = scheduled_agent(actuator, batch_size=batch_size, pool_size=pool_size)
+    pulled = []
+
+    def iter_score_order(state):
+        for key in agent.criteria_container.score_order:
+            pulled.append(key)
+            yield key
+
+    agent.criteria_container.iter_score_order = iter_score_order
+    agent.avg_power = 100.0 + 3 * DEVICE_LOAD
+    agent.modify_load()
+    wave_size = batch_size * pool_size
+    assert curtailed_devices(agent) == ["RTU0", "RTU1", "RTU2"]
+    # At most one reservation wave beyond the devices needed.
+    assert len(pulled) <= 3 + wave_size
+    scheduled = set(device for schedule in actuator.schedules.values() for device in schedule)
+    assert len(scheduled) <= len(pulled) < DEVICE_COUNT
+
+
+@pytest.mark.parametrize("batch_size, pool_size", [(1, 1), (1, 10), (DEVICE_COUNT, 1), (8, 4)])
+def test_unavailable_device_is_tracked_per_device(batch_size, pool_size):
+    actuator = FakeActuator(LATENCY, unavailable={"CAMPUS/BUILDING/RTU3"})
+    agent = scheduled_agent(actuator, batch_size=batch_size, pool_size=pool_size)
+    agent.modify_load()
+    assert curtailed_devices(agent) == ["RTU{}".format(i) for i in range(11) if i != 3]
+    scheduled = set(device for schedule in actuator.schedules.values() for device in schedule)
+    # Devices are reserved a wave at a time as they are pulled from the score order.
+    assert scheduled >= set("CAMPUS/BUILDING/" + name for name in curtailed_devices(agent))
+    assert "CAMPUS/BUILDING/RTU3" not in scheduled
+    # A second curtailment only retries the device that could not be reserved.
+    requests = actuator.calls["request_new_schedule"]
+    agent.devices.clear()
+    agent.modify_load()
+    assert actuator.calls["request_new_schedule"] == requests + 1
+    agent.reset_all_devices()
+    assert actuator.schedules == {}
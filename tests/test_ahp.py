@@ -0,0 +1,88 @@
+import json
+
+import numpy as np
+import pytest
+
+from ilc.ahp import AHPCompiler
+from ilc.ilc_matrices import (calc_column_sums, consistency_ratio, extract_criteria, normalize_matrix,
+                              priority_vector, random_index, validate_input)
+from ilc.validate_config import validate_config_dir
+
+
+def consistent_pairwise(weights):
+    """Pairwise config whose matrix is exactly consistent with the weights."""
+    labels = ["criteria{}".format(i) for i in range(len(weights))]
+    config = {}
+    for i, label in enumerate(labels):
+        config[label] = dict((labels[j], weights[i] / weights[j]) for j in range(i + 1, len(labels)))
+    return {"curtail": config}
+
+
+@pytest.mark.parametrize("size", [3, 5, 12, 20])
+def test_consistent_matrix_any_size(size):
+    weights = np.arange(1.0, size + 1.0)
+    _, matrix, _ = extract_criteria(consistent_pairwise(weights))
+    vector, lambda_max = priority_vector(matrix["curtail"])
+    assert vector == pytest.approx(weights / weights.sum())
+    assert lambda_max == pytest.approx(size)
+    assert consistency_ratio(matrix["curtail"]) == pytest.approx(0.0, abs=1e-9)
+    assert validate_input(matrix, calc_column_sums(matrix))
+
+
+def test_inconsistent_matrix():
+    config = {"curtail": {"a": {"b": 9, "c": 1 / 9.0}, "b": {"c": 9}, "c": {}}}
+    _, matrix, _ = extract_criteria(config)
+    assert consistency_ratio(matrix["curtail"]) > 0.2
+    assert not validate_input(matrix, calc_column_sums(matrix))
+
+
+def test_random_index_extends_table():
+    assert random_index(10) == 1.49
+    assert 1.5 < random_index(16) < random_index(30) < 1.77
+
+
+def test_compiler_caches_by_content():
+    compiler = AHPCompiler()
+    config = consistent_pairwise([1.0, 2.0, 4.0])
+    weights = compiler.compile(config)
+    assert compiler.compile(json.loads(json.dumps(config))) is weights
+    assert compiler.compile(consistent_pairwise([1.0, 2.0, 5.0])) is not weights
+    labels, matrix, states = extract_criteria(config)
+    assert weights.criteria_labels == labels
+    assert weights.row_average == normalize_matrix(matrix, calc_column_sums(matrix))
+    assert weights.states == states == ["curtail"]
+    assert weights.consistent
+
+
+def write_config(path, pairwise):
+    criteria = {"RTU1": {"Stage1": {"curtail": {
+        "device_topic": "CAMPUS/BUILDING/RTU1",
+        "zone": {"operation_type": "constant", "value": 2.0},
+        "power": {"operation_type": "status", "point_name": "Stage1", "on_value": 6.0, "off_value": 0.0}
+    }}}}
+    control = {"RTU1": {"Stage1": {
+        "device_topic": "CAMPUS/BUILDING/RTU1",
+        "device_status": {"condition": "Stage1", "device_status_args": ["Stage1"]},
+        "curtail_settings": {"point": "ZoneTemperatureSetPoint", "control_method": "offset", "offset": 2.0,
+                             "load": 6.0}
+    }}}
+    config = {"clusters": [{"pairwise_criteria_config": "config://pairwise.json",
+                            "device_criteria_config": "config://criteria",
+                            "device_control_config": control,
+                            "cluster_priority": 1.0}]}
+    (path / "config").write_text(json.dumps(config))
+    (path / "criteria").write_text(json.dumps(criteria))
+    (path / "pairwise.json").write_text(json.dumps(pairwise))
+
+
+def test_validate_config_dir(tmp_path, capsys):
+    write_config(tmp_path, {"curtail": {"zone": {"power": 3}, "power": {}}})
+    assert validate_config_dir(str(tmp_path)) == []
+    assert "weight 0.7500" in capsys.readouterr().out
+
+
+def test_validate_config_dir_reports_errors(tmp_path):
+    write_config(tmp_path, {"curtail": {"zone": {"power": 3, "stage": 1 / 9.0}, "power": {"stage": 9}, "stage": {}}})
+    errors = validate_config_dir(str(tmp_path))
+    assert any("inconsistent" in error for error in errors)
+    assert any("do not match" in error for error in errors)
@@ -0,0 +1,77 @@
+import pytest
+
+from sympy.parsing.sympy_parser import parse_expr
+
+from ilc.control_handler import ControlSetting, DeviceStatus
+from ilc.criteria_handler import FormulaCriterion
+from ilc.expressions import CompiledExpression
+
+
+@pytest.mark.parametrize("operation, values", [
+    ("1/(AverageZoneTemperature-CoolingTemperatureSetPoint)",
+     {"AverageZoneTemperature": 74.5, "CoolingTemperatureSetPoint": 72.0}),
+    ("Abs(ZoneTemperature-ZoneSetPoint)*2.0", {"ZoneTemperature": 70.0, "ZoneSetPoint": 73.5}),
+    ("Max(a, b) + Min(a, b)/4", {"a": 3.0, "b": -8.0}),
+    ("2809.8*FirstStageCooling-500.0", {"FirstStageCooling": 1}),
+])
+def test_compiled_matches_sympy(operation, values):
+    compiled = CompiledExpression(parse_expr(operation), values.keys())
+    assert compiled.compiled
+    assert compiled.evaluate(values) == pytest.approx(float(compiled.subs(values)))
+
+
+def test_uncompilable_expression_falls_back_to_sympy():
+    # "E" sympifies to Euler's number, so substitution semantics cannot be reproduced by the callable.
+    compiled = CompiledExpression(parse_expr("E + a"), ["E", "a"])
+    assert not compiled.compiled
+    values = {"E": 1.0, "a": 2.0}
+    assert compiled.evaluate(values) == compiled.subs(values)
+
+
+def test_non_numeric_and_error_inputs_use_sympy():
+    compiled = CompiledExpression(parse_expr("1/(a-b)"), ["a", "b"])
+    assert compiled.evaluate({"a": "3.0", "b": 1.0}) == compiled.subs({"a": "3.0", "b": 1.0})
+    assert compiled.evaluate({"a": 1.0, "b": 1.0}) == compiled.subs({"a": 1.0, "b": 1.0})
+
+
+def test_formula_criterion_keeps_bounds():
+    criterion = FormulaCriterion(operation="1/(AverageZoneTemperature-CoolingTemperatureSetPoint)",
+                                 operation_args=["CoolingTemperatureSetPoint", "AverageZoneTemperature"],
+                                 minimum=0, maximum=10, device_topic="CAMPUS/BUILDING/HP1")
+    assert criterion.evaluate_criterion() == 0
+    criterion.ingest_data(None, {"CAMPUS/BUILDING/HP1/CoolingTemperatureSetPoint": 72.0,
+                                 "CAMPUS/BUILDING/HP1/AverageZoneTemperature": 74.0})
+    assert criterion.evaluate_criterion() == pytest.approx(0.5)
+    criterion.ingest_data(None, {"CAMPUS/BUILDING/HP1/AverageZoneTemperature": 72.05})
+    assert criterion.evaluate_criterion() == 10
+    # Division by zero evaluates to zoo through sympy, which numeric_check maps to zero.
+    criterion.ingest_data(None, {"CAMPUS/BUILDING/HP1/AverageZoneTemperature": 72.0})
+    assert criterion.evaluate_criterion() == 0.0
+
+
+@pytest.mark.parametrize("condition, values, expected", [
+    ("FirstStageCooling", {"FirstStageCooling": 1}, True),
+    ("FirstStageCooling", {"FirstStageCooling": 0}, False),
+    ("FirstStageCooling < 1", {"FirstStageCooling": 0.0}, True),
+    (["Eq(CompressorCommand,1)", "&", "Eq(ReversingValve,0)"], {"CompressorCommand": 1, "ReversingValve": 0}, True),
+    (["Eq(CompressorCommand,1)", "&", "Eq(ReversingValve,0)"], {"CompressorCommand": 1, "ReversingValve": 1}, False),
+    (["ZoneTemperature > 72.0", "|", "SupplyFanStatus < 1"], {"ZoneTemperature": 70.0, "SupplyFanStatus": 0}, True),
+])
+def test_device_status_predicate(condition, values, expected):
+    status = DeviceStatus("record", None, device_status_args=list(values), condition=condition,
+                          default_device="CAMPUS/BUILDING/HP5")
+    assert status.predicate.compiled
+    status.ingest_data(None, {"CAMPUS/BUILDING/HP5/" + point: value for point, value in values.items()})
+    assert status.command_status is expected
+    assert bool(status.expr.subs(list(values.items()))) is expected
+
+
+def test_control_setting_condition():
+    setting = ControlSetting("record", None, point="ZoneTemperatureSetPoint", offset=2.0, load=6.0,
+                             control_method="offset", condition=["ZoneTemperature > 72.0"],
+                             conditional_args=["ZoneTemperature"], default_device="CAMPUS/BUILDING/HP1")
+    assert not setting.check_condition()
+    setting.ingest_data(None, {"CAMPUS/BUILDING/HP1/ZoneTemperature": 74.0})
+    assert setting.check_condition()
+    setting.ingest_data(None, {"CAMPUS/BUILDING/HP1/ZoneTemperature": 71.0})
+    assert not setting.check_condition()
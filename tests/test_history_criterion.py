@@ -0,0 +1,51 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from ilc.criteria_handler import HistoryBuffer, HistoryCriterion
+
+TOPIC = "CAMPUS/BUILDING/HP1/AverageZoneTemperature"
+START = datetime(2026, 7, 1, 12, 0)
+
+
+def make_criterion(**kwargs):
+    return HistoryCriterion(comparison_type="direct", point_name="AverageZoneTemperature", previous_time=15,
+                            device_topic="CAMPUS/BUILDING/HP1", **kwargs)
+
+
+def test_minimum_until_history_reaches_back():
+    criterion = make_criterion(minimum=0)
+    assert criterion.evaluate() == 0
+    for minute in range(15):
+        criterion.ingest_data(START + timedelta(minutes=minute), {TOPIC: 70.0 + minute})
+    assert criterion.evaluate() == 0
+
+
+def test_interpolates_value_at_previous_time():
+    criterion = make_criterion()
+    # Samples every 2 minutes rising 1 degree per sample.
+    for step in range(12):
+        criterion.ingest_data(START + timedelta(minutes=2 * step), {TOPIC: 70.0 + step})
+    # Latest sample at 22 minutes is 81.0, the value 15 minutes earlier (7 minutes) is 73.5.
+    assert criterion.evaluate() == pytest.approx(81.0 - 73.5)
+    # Evaluating does not consume the history.
+    assert criterion.evaluate() == pytest.approx(81.0 - 73.5)
+
+
+def test_history_is_bounded():
+    criterion = make_criterion()
+    for second in range(0, 6 * 3600, 10):
+        criterion.ingest_data(START + timedelta(seconds=second), {TOPIC: 70.0 + (second % 600) / 60.0})
+    # 15 minutes of 10 second samples plus the interpolation bracket.
+    assert len(criterion.history) == 15 * 6 + 1
+    assert len(criterion.history.timestamps) <= 2 * len(criterion.history) + HistoryBuffer.MIN_COMPACT
+
+
+def test_out_of_order_sample():
+    criterion = make_criterion()
+    for minute in (0, 10, 5, 20):
+        criterion.ingest_data(START + timedelta(minutes=minute), {TOPIC: 70.0 + minute})
+    assert criterion.history.timestamps[criterion.history.start:] == sorted(criterion.history.timestamps[
+                                                                            criterion.history.start:])
+    # history time is 5 minutes after the last ingest (20 - 15), which lands exactly on a sample.
+    assert criterion.evaluate() == pytest.approx(90.0 - 75.0)
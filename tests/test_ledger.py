@@ -0,0 +1,46 @@
+import pytest
+
+from ilc.ledger import ControlledDevice, DeviceLedger
+
+
+def record(name, device_id, load=1.0, actuator="platform.actuator", mode="offset"):
+    return ControlledDevice(name, device_id, "SetPoint", 72.0, load, None, "2022-01-01T00:00:00", actuator, mode)
+
+
+@pytest.fixture
+def ledger():
+    ledger = DeviceLedger()
+    for name, device_id in [("RTU1", "Stage1"), ("RTU2", "Stage1"), ("RTU1", "Stage2")]:
+        ledger.add(record(name, device_id))
+    return ledger
+
+
+def test_records_are_slotted():
+    with pytest.raises(AttributeError):
+        record("RTU1", "Stage1").extra = 1
+
+
+def test_add_and_lookup(ledger):
+    assert not ledger.add(record("RTU1", "Stage1"))
+    assert len(ledger) == 3
+    assert ("RTU1", "Stage2") in ledger and ("RTU3", "Stage1") not in ledger
+    assert [r.key for r in ledger.device_records("RTU1")] == [("RTU1", "Stage1"), ("RTU1", "Stage2")]
+    assert ledger.device_records("RTU3") == []
+
+
+def test_is_controlled(ledger):
+    assert ledger.is_controlled("RTU1", "Stage1", "platform.actuator")
+    assert not ledger.is_controlled("RTU1", "Stage1", "other.actuator")
+    ledger.add(record("RTU3", "Stage1", mode="dollar"))
+    assert not ledger.is_controlled("RTU3", "Stage1", "platform.actuator", exclude_mode="dollar")
+
+
+def test_ordered_and_replace(ledger):
+    keys = [("RTU1", "Stage2"), ("RTU9", "Stage1"), ("RTU2", "Stage1"), ("RTU1", "Stage1")]
+    ordered = ledger.ordered(keys)
+    assert [r.key for r in ordered] == [keys[0], keys[2], keys[3]]
+    ledger.replace(ordered[::-1][:2])
+    assert [r.key for r in ledger] == [("RTU1", "Stage1"), ("RTU2", "Stage1")]
+    assert [r.key for r in ledger.device_records("RTU1")] == [("RTU1", "Stage1")]
+    ledger.clear()
+    assert not ledger and ledger.device_records("RTU1") == []
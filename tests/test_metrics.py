@@ -0,0 +1,70 @@
+import pytest
+
+from ilc.metrics import Histogram, MetricsRegistry, timed
+from ilc.replay import ReplayHarness
+
+from test_replay import agent_config, recording
+
+
+def test_histogram_buckets_and_quantiles():
+    histogram = Histogram(buckets=(0.1, 1.0, 10.0))
+    for value in (0.05, 0.05, 0.5, 5.0, 50.0):
+        histogram.observe(value)
+    snapshot = histogram.snapshot()
+    assert snapshot["count"] == 5
+    assert snapshot["buckets"] == {"0.1": 2, "1.0": 1, "10.0": 1, "inf": 1}
+    assert snapshot["max"] == 50.0
+    assert histogram.quantile(0.4) == 0.1
+    assert histogram.quantile(0.6) == 1.0
+    assert histogram.quantile(1.0) == 50.0
+    assert Histogram().quantile(0.5) == 0.0
+
+
+def test_timer_records_when_block_raises():
+    registry = MetricsRegistry()
+    with pytest.raises(ValueError):
+        with registry.timer("failing"):
+            raise ValueError("boom")
+    assert registry.histogram("failing").count == 1
+
+
+def test_timed_decorator_uses_instance_registry():
+    class Worker(object):
+        def __init__(self):
+            self.metrics = MetricsRegistry()
+
+        @timed("work")
+        def work(self, value):
+            return value * 2
+
+    worker = Worker()
+    assert worker.work(2) == 4
+    assert worker.work.__name__ == "work"
+    assert worker.metrics.snapshot()["latency"]["work"]["count"] == 1
+
+
+def test_agent_metrics_after_replay():
+    config = agent_config()
+    config["metrics_publish_interval"] = 60
+    harness = ReplayHarness(config)
+    harness.replay(recording())
+    metrics = harness.agent.get_metrics()
+    latency = metrics["latency"]
+    assert latency["new_data"]["count"] == 40
+    assert latency["load_message_handler"]["count"] == 10
+    assert latency["modify_load"]["count"] >= 1
+    assert latency["rpc.set_point"]["count"] >= 1
+    assert latency["meter_to_decision"]["count"] >= 1
+    assert metrics["counters"]["transition.curtail"] >= 1
+    assert metrics["counters"]["devices_controlled"] >= 1
+    assert harness.core.periodic_fired >= 1
+    assert any(topic.endswith("/Metrics") for topic in harness.bus.published)
+
+
+def test_metrics_publish_disabled():
+    config = agent_config()
+    config["metrics_publish_interval"] = 0
+    harness = ReplayHarness(config)
+    harness.replay(recording())
+    assert harness.agent.metrics_task is None
+    assert not any(topic.endswith("/Metrics") for topic in harness.bus.published)
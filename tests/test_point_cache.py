@@ -0,0 +1,37 @@
+from datetime import datetime, timedelta, timezone
+
+from ilc.point_cache import PointCache
+
+NOW = datetime(2026, 7, 1, 12, 0, tzinfo=timezone.utc)
+TOPIC = "CAMPUS/BUILDING/RTU0/ZoneTemperatureSetPoint"
+
+
+def test_fresh_value_is_returned():
+    cache = PointCache(timedelta(minutes=5))
+    cache.update(NOW, {TOPIC: 72.0})
+    assert cache.get(TOPIC, NOW + timedelta(minutes=5)) == 72.0
+
+
+def test_stale_or_missing_value_is_none():
+    cache = PointCache(timedelta(minutes=5))
+    cache.update(NOW, {TOPIC: 72.0, "CAMPUS/BUILDING/RTU0/Fault": None})
+    assert cache.get(TOPIC, NOW + timedelta(minutes=5, seconds=1)) is None
+    assert cache.get("CAMPUS/BUILDING/RTU1/ZoneTemperatureSetPoint", NOW) is None
+    assert cache.get("CAMPUS/BUILDING/RTU0/Fault", NOW) is None
+    # Naive timestamps cannot be aged against aware ones.
+    assert cache.get(TOPIC, NOW.replace(tzinfo=None)) is None
+
+
+def test_latest_value_wins():
+    cache = PointCache(timedelta(minutes=5))
+    cache.update(NOW, {TOPIC: 72.0})
+    cache.update(NOW + timedelta(minutes=1), {TOPIC: 74.0})
+    assert cache.get(TOPIC, NOW + timedelta(minutes=1)) == 74.0
+    assert len(cache) == 1
+
+
+def test_disabled_cache_stores_nothing():
+    cache = PointCache()
+    cache.update(NOW, {TOPIC: 72.0})
+    assert len(cache) == 0
+    assert cache.get(TOPIC, NOW) is None
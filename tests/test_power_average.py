@@ -0,0 +1,52 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from ilc.power_average import PowerAverager
+
+from legacy_power_average import LegacyAverager
+
+START = datetime(2026, 7, 1, 12, 0)
+
+
+def compare(samples, window=timedelta(minutes=15)):
+    legacy = LegacyAverager(window)
+    streaming = PowerAverager(window)
+    for current_time, current_power in samples:
+        expected = legacy.update(current_time, current_power)
+        result = streaming.update(current_time, current_power)
+        assert result[0] == pytest.approx(expected[0], rel=1e-9)
+        assert result[1] == pytest.approx(expected[1], rel=1e-9)
+        assert result[2] == expected[2]
+        assert len(streaming) == len(legacy.bldg_power)
+
+
+@pytest.mark.parametrize("period", [1, 10, 60])
+def test_matches_legacy_regular_samples(period):
+    rng = random.Random(period)
+    samples = [(START + timedelta(seconds=period * i), rng.uniform(100.0, 500.0)) for i in range(3000)]
+    compare(samples)
+
+
+def test_matches_legacy_with_gaps_and_zero_power():
+    rng = random.Random(7)
+    samples = []
+    current_time = START
+    for _ in range(3000):
+        current_time += timedelta(seconds=rng.choice([1, 5, 30, 120]))
+        samples.append((current_time, rng.choice([0.0, -5.0]) if rng.random() < 0.1 else rng.uniform(50.0, 900.0)))
+    compare(samples)
+
+
+def test_matches_legacy_out_of_order_samples():
+    rng = random.Random(11)
+    samples = [(START + timedelta(seconds=10 * i + rng.randint(-15, 15)), rng.uniform(100.0, 500.0))
+               for i in range(1000)]
+    compare(samples)
+
+
+def test_empty_window():
+    averager = PowerAverager(timedelta(minutes=15))
+    assert averager.update(START, 0.0) == (0.0, 0.0, timedelta(0))
+    assert not averager
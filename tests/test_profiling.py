@@ -0,0 +1,79 @@
+import os
+import pstats
+import time
+
+import pytest
+
+from ilc.profiling import ProfileSession
+from ilc.replay import ReplayHarness
+
+from test_replay import agent_config, recording
+
+
+def busy_work(seconds):
+    total = 0
+    end = time.process_time() + seconds
+    while time.process_time() < end:
+        total += sum(range(100))
+    return total
+
+
+@pytest.mark.parametrize("kwargs", [
+    {"mode": "tracing", "duration": 1.0},
+    {"mode": "sampling"},
+    {"mode": "sampling", "duration": 0},
+    {"mode": "sampling", "duration": 1.0e6},
+    {"mode": "deterministic", "messages": 0},
+    {"mode": "deterministic", "duration": 1.0, "sort": "calls"},
+])
+def test_session_rejects_bad_arguments(tmp_path, kwargs):
+    with pytest.raises(ValueError):
+        ProfileSession(directory=str(tmp_path), **kwargs)
+
+
+def test_deterministic_session_writes_pstats(tmp_path):
+    session = ProfileSession("deterministic", str(tmp_path / "profiles"), duration=10.0, top=5)
+    session.start()
+    busy_work(0.05)
+    summary = session.stop()
+    assert os.path.exists(summary["path"])
+    assert pstats.Stats(summary["path"]).total_calls > 0
+    assert len(summary["functions"]) == 5
+    assert any("busy_work" in function["function"] for function in summary["functions"])
+
+
+def test_sampling_session_writes_collapsed_stacks(tmp_path):
+    session = ProfileSession("sampling", str(tmp_path), duration=10.0, sort="cumulative", interval=0.001,
+                             top=1000)
+    session.start()
+    busy_work(0.2)
+    summary = session.stop()
+    assert summary["samples"] > 0
+    functions = summary["functions"]
+    ranks = [(function["total_samples"], function["self_samples"]) for function in functions]
+    assert ranks == sorted(ranks, reverse=True)
+    [busy] = [index for index, function in enumerate(functions) if "(busy_work)" in function["function"]]
+    [caller] = [index for index, function in enumerate(functions)
+                if "(test_sampling_session_writes_collapsed_stacks)" in function["function"]]
+    assert functions[busy]["self_samples"] > 0
+    # The caller is on every stack busy_work is on, so it only ranks first with more samples.
+    assert (busy < caller) == (functions[busy]["total_samples"] == functions[caller]["total_samples"])
+    with open(summary["path"]) as folded:
+        lines = folded.read().splitlines()
+    assert sum(int(line.rsplit(" ", 1)[1]) for line in lines) == summary["samples"]
+
+
+def test_agent_profile_bounded_by_messages(tmp_path):
+    config = agent_config()
+    config["profile_directory"] = str(tmp_path)
+    harness = ReplayHarness(config)
+    started = harness.agent.start_profile(duration=None, messages=20, top=10)
+    with pytest.raises(RuntimeError):
+        harness.agent.start_profile()
+    harness.replay(recording())
+    assert harness.agent.profile_session is None
+    result = harness.agent.stop_profile()
+    assert result["path"] == started["path"]
+    assert result["messages"] == 20
+    assert len(result["functions"]) == 10
+    assert os.path.dirname(result["path"]) == str(tmp_path)
@@ -0,0 +1,60 @@
+from ilc.control_handler import ControlCluster, ControlContainer
+from ilc.criteria_handler import CriteriaContainer
+from ilc.ilc_agent import ILCAgent
+from ilc.projection import PointProjection
+
+DEVICE = "CAMPUS/BUILDING/RTU1"
+CONTROL_CONFIG = {
+    "RTU1": {
+        "FirstStageCooling": {
+            "device_topic": DEVICE,
+            "device_status": {"condition": "First Stage Cooling", "device_status_args": ["First Stage Cooling"]},
+            "curtail_settings": {
+                "point": "ZoneTemperatureSetPoint",
+                "control_method": "equation",
+                "equation": {"operation": "ZoneTemperature+0.5", "equation_args": ["ZoneTemperature"],
+                             "minimum": 69.0, "maximum": 77.0},
+                "load": {"operation": "SupplyFanPower*2", "equation_args": ["SupplyFanPower"]}
+            }
+        }
+    }
+}
+WANTED = {"FirstStageCooling", "ZoneTemperatureSetPoint", "ZoneTemperature", "SupplyFanPower"}
+
+
+def build_agent():
+    agent = ILCAgent(None)
+    agent.criteria_container = CriteriaContainer()
+    agent.control_container = ControlContainer()
+    agent.control_container.add_control_cluster(ControlCluster(CONTROL_CONFIG, "platform.actuator", "record", agent))
+    agent.setup_topics()
+    return agent
+
+
+def publish(extra=50):
+    values = {"First Stage Cooling": 1, "ZoneTemperatureSetPoint": 72.0, "ZoneTemperature": 73.5,
+              "SupplyFanPower": 1.5}
+    for i in range(extra):
+        values["Point {}".format(i)] = float(i)
+    meta = dict((point, {"units": "None", "type": "float", "tz": "UTC"}) for point in values)
+    return values, meta
+
+
+def test_projection_keeps_consumed_and_read_points():
+    agent = build_agent()
+    message = publish()
+    values, meta = agent.breakout_all_publish("devices/{}/all".format(DEVICE), message, agent.projection,
+                                              include_meta=False)
+    full_values, full_meta = agent.breakout_all_publish("devices/{}/all".format(DEVICE), message)
+    assert set(values) == set(DEVICE + "/" + point for point in WANTED)
+    assert values == dict((topic, value) for topic, value in full_values.items() if topic in values)
+    assert meta == {}
+    assert len(full_values) == len(full_meta) == 54
+
+
+def test_projection_relearns_changed_points():
+    projection = PointProjection({DEVICE + "/ZoneTemperature", DEVICE + "/NewPoint"})
+    values, _ = publish(extra=5)
+    assert projection.get_points(DEVICE, values) == [("ZoneTemperature", DEVICE + "/ZoneTemperature")]
+    values["New Point"] = 1.0
+    assert projection.get_points(DEVICE, values)[-1] == ("New Point", DEVICE + "/NewPoint")
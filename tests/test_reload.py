@@ -0,0 +1,91 @@
+import copy
+
+from ilc.ilc_agent import ILCAgent
+
+
+def criteria_config(device):
+    return {device: {"Stage1": {"curtail": {
+        "device_topic": "CAMPUS/BUILDING/" + device,
+        "zone": {"operation_type": "constant", "value": 2.0},
+        "power": {"operation_type": "status", "point_name": "Stage1", "on_value": 6.0, "off_value": 0.0}
+    }}}}
+
+
+def control_config(device):
+    return {device: {"Stage1": {
+        "device_topic": "CAMPUS/BUILDING/" + device,
+        "device_status": {"condition": "Stage1", "device_status_args": ["Stage1"]},
+        "curtail_settings": {"point": "ZoneTemperatureSetPoint", "control_method": "offset", "offset": 2.0,
+                             "load": 6.0}
+    }}}
+
+
+def cluster(device, priority=1.0):
+    return {"pairwise_criteria_config": {"curtail": {"zone": {"power": 3}, "power": {}}},
+            "device_criteria_config": criteria_config(device),
+            "device_control_config": control_config(device),
+            "cluster_priority": priority}
+
+
+def build_agent():
+    agent = ILCAgent(None)
+    agent.record_topic = "record"
+    return agent
+
+
+def clusters(agent):
+    return agent.criteria_container.clusters, agent.control_container.clusters
+
+
+def test_unchanged_clusters_are_reused():
+    agent = build_agent()
+    configs = [cluster("RTU1"), cluster("RTU2")]
+    agent.load_clusters(copy.deepcopy(configs))
+    criteria, control = clusters(agent)
+    device = agent.control_container.get_device(("RTU1", "platform.actuator"))
+    device.ingest_data(None, {"CAMPUS/BUILDING/RTU1/Stage1": 1})
+
+    configs[1] = cluster("RTU3")
+    agent.load_clusters(copy.deepcopy(configs))
+    new_criteria, new_control = clusters(agent)
+    assert new_criteria[0] is criteria[0] and new_control[0] is control[0]
+    assert new_criteria[1] is not criteria[1] and new_control[1] is not control[1]
+    assert agent.control_container.get_device(("RTU1", "platform.actuator")) is device
+    assert ("RTU2", "platform.actuator") not in agent.control_container.devices
+    assert set(agent.criteria_container.devices) == {"RTU1", "RTU3"}
+
+
+def test_priority_change_keeps_cluster_and_rescores():
+    agent = build_agent()
+    agent.load_clusters([cluster("RTU1"), cluster("RTU2")])
+    criteria, _ = clusters(agent)
+    agent.criteria_container.get_score_order("curtail")
+    assert agent.criteria_container.score_order
+
+    agent.load_clusters([cluster("RTU1", priority=5.0), cluster("RTU2")])
+    new_criteria, _ = clusters(agent)
+    assert new_criteria[0] is criteria[0]
+    assert new_criteria[0].priority == 5.0
+    assert not agent.criteria_container.score_order
+
+
+def test_duplicate_clusters_are_not_shared():
+    agent = build_agent()
+    agent.load_clusters([cluster("RTU1"), cluster("RTU1")])
+    criteria, _ = clusters(agent)
+    agent.load_clusters([cluster("RTU1"), cluster("RTU1")])
+    new_criteria, _ = clusters(agent)
+    assert new_criteria[0] is criteria[0] and new_criteria[1] is criteria[1]
+    assert new_criteria[0] is not new_criteria[1]
+
+
+def test_pairwise_change_rebuilds_criteria_only():
+    agent = build_agent()
+    agent.load_clusters([cluster("RTU1")])
+    criteria, control = clusters(agent)
+    changed = cluster("RTU1")
+    changed["pairwise_criteria_config"] = {"curtail": {"zone": {"power": 5}, "power": {}}}
+    agent.load_clusters([changed])
+    new_criteria, new_control = clusters(agent)
+    assert new_criteria[0] is not criteria[0]
+    assert new_control[0] is control[0]
@@ -0,0 +1,104 @@
+import json
+from datetime import datetime, timedelta, timezone
+
+from volttron.utils import format_timestamp
+
+from ilc.replay import ReplayHarness, load_recording, main
+
+DEVICES = ["RTU{}".format(i) for i in range(4)]
+START = datetime(2026, 7, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def criteria_config():
+    return dict((name, {"Stage1": {"curtail": {
+        "device_topic": "CAMPUS/BUILDING/" + name,
+        "zone": {"operation_type": "constant", "value": float(i + 1)},
+        "power": {"operation_type": "status", "point_name": "Stage1", "on_value": 6.0, "off_value": 0.0}
+    }}}) for i, name in enumerate(DEVICES))
+
+
+def control_config():
+    return dict((name, {"Stage1": {
+        "device_topic": "CAMPUS/BUILDING/" + name,
+        "device_status": {"condition": "Stage1", "device_status_args": ["Stage1"]},
+        "curtail_settings": {"point": "ZoneTemperatureSetPoint", "control_method": "offset", "offset": 2.0,
+                             "load": 6.0}
+    }}) for name in DEVICES)
+
+
+def agent_config():
+    return {
+        "campus": "CAMPUS",
+        "building": "BUILDING",
+        "power_meter": {"device_topic": "CAMPUS/BUILDING/METER", "point": "WholeBuildingPower"},
+        "demand_limit": 100.0,
+        "control_time": 15,
+        "confirm_time": 5,
+        "stagger_release": False,
+        "clusters": [{"pairwise_criteria_config": {"curtail": {"zone": {"power": 3}, "power": {}}},
+                      "device_criteria_config": criteria_config(),
+                      "device_control_config": control_config(),
+                      "cluster_priority": 1.0}]
+    }
+
+
+def recording(minutes=10, power=110.0):
+    records = []
+    for minute in range(minutes):
+        now = format_timestamp(START + timedelta(minutes=minute))
+        for name in DEVICES:
+            records.append({"topic": "devices/CAMPUS/BUILDING/{}/all".format(name),
+                            "headers": {"TimeStamp": now},
+                            "message": [{"Stage1": 1, "ZoneTemperatureSetPoint": 72.0}, {}]})
+        records.append({"topic": "devices/CAMPUS/BUILDING/METER/all", "headers": {"Date": now},
+                        "message": [{"WholeBuildingPower": power}, {"WholeBuildingPower": {"tz": "UTC"}}]})
+    return records
+
+
+def test_replay_curtails_over_limit():
+    harness = ReplayHarness(agent_config())
+    report = harness.replay(recording())
+    assert report["messages"] == 50
+    assert report["latency"]["new_data"]["count"] == 40
+    assert report["latency"]["load_message_handler"]["count"] == 10
+    assert report["messages_per_second"] > 0
+    decisions = harness.actuator.decisions
+    # 10 kW over the limit takes two 6 kW devices, the highest scored first.
+    assert [(d["method"], d["point"], d["value"]) for d in decisions[:2]] == [
+        ("set_point", "CAMPUS/BUILDING/RTU3/ZoneTemperatureSetPoint", 74.0),
+        ("set_point", "CAMPUS/BUILDING/RTU2/ZoneTemperatureSetPoint", 74.0)]
+
+
+def test_replay_under_limit_makes_no_decisions():
+    harness = ReplayHarness(agent_config())
+    harness.replay(recording(power=50.0))
+    assert harness.actuator.decisions == []
+
+
+def test_replay_runs_scheduled_targets():
+    harness = ReplayHarness(agent_config())
+    target = {"start": format_timestamp(START + timedelta(minutes=2)),
+              "end": format_timestamp(START + timedelta(minutes=30)), "target": 200.0, "id": "target1"}
+    records = [{"topic": "record/target_agent", "headers": {"Date": format_timestamp(START)},
+                "message": [{"value": target}, {"value": {"tz": "UTC"}}]}] + recording()
+    report = harness.replay(records)
+    assert report["scheduled_callbacks"] == 1
+    assert harness.agent.demand_limit == 200.0
+    assert harness.actuator.decisions == []
+
+
+def test_replay_cli(tmp_path, capsys):
+    config = agent_config()
+    cluster = config["clusters"][0]
+    for key in ("pairwise_criteria_config", "device_criteria_config", "device_control_config"):
+        (tmp_path / key).write_text(json.dumps(cluster[key]))
+        cluster[key] = "config://" + key
+    (tmp_path / "config").write_text(json.dumps(config))
+    with open(tmp_path / "recording.jsonl", "w") as output:
+        for record in recording():
+            output.write(json.dumps(record) + "\n")
+    assert len(list(load_recording(str(tmp_path / "recording.jsonl")))) == 50
+    decisions = tmp_path / "decisions.json"
+    assert main([str(tmp_path), str(tmp_path / "recording.jsonl"), "--decisions", str(decisions)]) == 0
+    assert "new_data" in capsys.readouterr().out
+    assert json.loads(decisions.read_text())[0]["method"] == "set_point"
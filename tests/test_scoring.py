@@ -0,0 +1,119 @@
+import random
+
+from itertools import islice
+
+import pytest
+
+from ilc.criteria_handler import CriteriaCluster, CriteriaContainer
+from ilc.ilc_matrices import build_score, calc_column_sums, extract_criteria, input_matrix, normalize_matrix
+
+PAIRWISE = {
+    "zone": {"power": 3, "stage": 5},
+    "power": {"stage": 2},
+    "stage": {}
+}
+
+
+def cluster_config(device_count, seed):
+    rng = random.Random(seed)
+    config = {}
+    for i in range(device_count):
+        criteria = {"device_topic": "CAMPUS/BUILDING/RTU{}".format(i)}
+        for label in PAIRWISE:
+            # Small integer values produce both zero evaluations and exact ties.
+            criteria[label] = {"operation_type": "constant", "value": float(rng.randint(0, 4))}
+        config["RTU{}".format(i)] = {"Stage1": {"curtail": criteria}}
+    return config
+
+
+def build_container(clusters):
+    container = CriteriaContainer()
+    for device_count, priority, seed in clusters:
+        labels, matrix, _ = extract_criteria({"curtail": PAIRWISE})
+        row_average = normalize_matrix(matrix, calc_column_sums(matrix))
+        cluster = CriteriaCluster(priority, labels, row_average, cluster_config(device_count, seed), "record", None)
+        container.add_criteria_cluster(cluster)
+    return container
+
+
+def legacy_score_order(container, state):
+    all_scored = []
+    for cluster in container.clusters:
+        evaluations = cluster.get_all_evaluations(state)
+        input_arr = input_matrix(evaluations, cluster.criteria_labels[state])
+        all_scored.extend(build_score(input_arr, cluster.row_average[state], cluster.priority))
+    all_scored.sort(reverse=True)
+    return [x[1] for x in all_scored]
+
+
+@pytest.mark.parametrize("clusters", [
+    [(5, 1.0, 1)],
+    [(200, 1.0, 2)],
+    [(150, 1.0, 3), (80, 0.5, 4), (40, 2.0, 5)],
+])
+def test_score_order_matches_legacy(clusters):
+    container = build_container(clusters)
+    assert container.get_score_order("curtail") == legacy_score_order(container, "curtail")
+
+
+def test_unconfigured_state_is_skipped():
+    container = build_container([(5, 1.0, 1)])
+    assert container.get_score_order("augment") == []
+
+
+def test_only_updated_criteria_are_evaluated(monkeypatch):
+    config = cluster_config(50, 6)
+    for i, device in enumerate(config.values()):
+        device["Stage1"]["curtail"]["power"] = {"operation_type": "status", "on_value": float(i + 1),
+                                                "point_name": "FirstStageCooling"}
+    labels, matrix, _ = extract_criteria({"curtail": PAIRWISE})
+    row_average = normalize_matrix(matrix, calc_column_sums(matrix))
+    container = CriteriaContainer()
+    container.add_criteria_cluster(CriteriaCluster(1.0, labels, row_average, config, "record", None))
+    container.get_score_order("curtail")
+
+    evaluated = []
+    for name, device in container.devices.items():
+        for criteria in device.criteria.values():
+            original = criteria.evaluate
+            monkeypatch.setattr(criteria, "evaluate", lambda n=name, f=original: evaluated.append(n) or f())
+
+    order = container.get_score_order("curtail")
+    assert evaluated == []
+    assert order == legacy_score_order(container, "curtail")
+
+    del evaluated[:]
+    for name in ("RTU3", "RTU17"):
+        container.devices[name].ingest_data(None, {"CAMPUS/BUILDING/{}/FirstStageCooling".format(name): 1})
+    order = container.get_score_order("curtail")
+    assert sorted(evaluated) == ["RTU17", "RTU3"]
+    assert order == legacy_score_order(container, "curtail")
+
+
+def test_lazy_score_order_merges_clusters():
+    container = build_container([(150, 1.0, 3), (80, 0.5, 4), (40, 2.0, 5)])
+    expected = legacy_score_order(container, "curtail")
+    assert list(islice(container.iter_score_order("curtail"), 10)) == expected[:10]
+    assert list(container.iter_score_order("curtail")) == expected
+    assert container.get_score_order("curtail") == expected
+
+
+def test_lazy_score_order_rescores_only_updated_clusters(monkeypatch):
+    container = build_container([(20, 1.0, 7), (20, 1.0, 8)])
+    container.get_score_order("curtail")
+    scored = []
+    for cluster in container.clusters:
+        original = cluster.get_evaluation_matrix
+        monkeypatch.setattr(cluster, "get_evaluation_matrix",
+                            lambda state, c=cluster, f=original: scored.append(c) or f(state))
+    next(container.iter_score_order("curtail"))
+    assert scored == []
+
+    second = container.clusters[1]
+    row = second.rows["curtail"].index(("RTU3", ("Stage1", "curtail")))
+    second.dirty_rows["curtail"].add(row)
+    next(container.iter_score_order("curtail"))
+    assert scored == [second]
+    # The cached full order was dropped when the cluster was scored again.
+    assert "curtail" not in container.score_order
+    assert container.get_score_order("curtail") == legacy_score_order(container, "curtail")
@@ -0,0 +1,91 @@
+from collections import defaultdict
+
+from ilc.subscriptions import SubscriptionManager
+
+
+class FakePubSub(object):
+    """Prefix matching message bus recording subscribe and unsubscribe calls."""
+    def __init__(self):
+        self.subscriptions = defaultdict(list)
+        self.calls = 0
+
+    def subscribe(self, peer, prefix, callback):
+        self.subscriptions[prefix].append(callback)
+        self.calls += 1
+
+    def unsubscribe(self, peer, prefix, callback):
+        self.subscriptions[prefix].remove(callback)
+        self.calls += 1
+
+    def publish(self, topic, message):
+        for prefix, callbacks in list(self.subscriptions.items()):
+            if topic.startswith(prefix):
+                for callback in callbacks:
+                    callback("pubsub", "sender", "", topic, {}, message)
+
+
+class Handler(object):
+    def __init__(self):
+        self.received = defaultdict(int)
+
+    def new_data(self, peer, sender, bus, topic, headers, message):
+        self.received[topic] += 1
+
+    def load(self, peer, sender, bus, topic, headers, message):
+        self.received["load", topic] += 1
+
+
+def device_topics(count):
+    return ["devices/CAMPUS/BUILDING/RTU{}/all".format(i) for i in range(count)]
+
+
+def wanted(handler, topics):
+    return [(topic, handler.new_data) for topic in topics] + [("record/target_agent", handler.load)]
+
+
+def test_reload_is_idempotent():
+    pubsub = FakePubSub()
+    handler = Handler()
+    manager = SubscriptionManager(pubsub)
+    assert manager.update(wanted(handler, device_topics(3))) == 4
+    for _ in range(5):
+        assert manager.update(wanted(handler, device_topics(3))) == 0
+    pubsub.publish("devices/CAMPUS/BUILDING/RTU1/all", {})
+    assert handler.received == {"devices/CAMPUS/BUILDING/RTU1/all": 1}
+
+
+def test_update_applies_delta():
+    pubsub = FakePubSub()
+    handler = Handler()
+    manager = SubscriptionManager(pubsub)
+    manager.update(wanted(handler, device_topics(3)))
+    pubsub.calls = 0
+    assert manager.update(wanted(handler, device_topics(2))) == 1
+    pubsub.publish("devices/CAMPUS/BUILDING/RTU2/all", {})
+    assert not handler.received
+    assert manager.clear() == 3
+    assert not any(pubsub.subscriptions.values())
+
+
+def test_prefix_consolidation():
+    pubsub = FakePubSub()
+    handler = Handler()
+    manager = SubscriptionManager(pubsub, prefix_depth=3)
+    topics = device_topics(50) + ["devices/CAMPUS/METER/all"]
+    manager.update(wanted(handler, topics) + [("devices/CAMPUS/BUILDING/RTU1/all", handler.load)])
+    assert manager.active == {("devices/CAMPUS/BUILDING/", manager.dispatch),
+                              ("devices/CAMPUS/METER/all", handler.new_data),
+                              ("record/target_agent", handler.load)}
+    for _ in range(3):
+        manager.update(wanted(handler, topics) + [("devices/CAMPUS/BUILDING/RTU1/all", handler.load)])
+    pubsub.publish("devices/CAMPUS/BUILDING/RTU1/all", {})
+    pubsub.publish("devices/CAMPUS/BUILDING/UNKNOWN/all", {})
+    pubsub.publish("devices/CAMPUS/METER/all", {})
+    assert handler.received == {"devices/CAMPUS/BUILDING/RTU1/all": 1,
+                                ("load", "devices/CAMPUS/BUILDING/RTU1/all"): 1,
+                                "devices/CAMPUS/METER/all": 1}
+
+    manager.prefix_depth = 0
+    manager.update(wanted(handler, topics))
+    assert ("devices/CAMPUS/BUILDING/", manager.dispatch) not in manager.active
+    assert len(manager.active) == 52
@@ -0,0 +1,39 @@
+import copy
+from datetime import datetime, timezone
+
+from ilc.ahp import AHPCompiler
+from ilc.replay import ReplayHarness
+from ilc.synthetic import CRITERION_KINDS, generate_campus, generate_recording
+
+START = datetime(2026, 7, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def test_generate_campus():
+    config = generate_campus(25, criteria_count=7, cluster_size=10)
+    assert generate_campus(25, criteria_count=7, cluster_size=10) == config
+    assert [len(cluster["device_control_config"]) for cluster in config["clusters"]] == [10, 10, 5]
+    compiler = AHPCompiler()
+    for cluster in config["clusters"]:
+        weights = compiler.compile(cluster["pairwise_criteria_config"])
+        assert weights.consistent
+        criteria = cluster["device_criteria_config"]
+        assert "zone_type" in criteria["mappers"]
+        kinds = set()
+        for name, components in criteria.items():
+            if name == "mappers":
+                continue
+            device_criteria = components["FirstStageCooling"]["curtail"]
+            assert set(device_criteria) - {"device_topic"} == set(weights.criteria_labels["curtail"])
+            kinds.update(item["operation_type"] for key, item in device_criteria.items() if key != "device_topic")
+        assert kinds == set(CRITERION_KINDS)
+
+
+def test_synthetic_campus_replays():
+    config = generate_campus(30, cluster_size=10)
+    harness = ReplayHarness(copy.deepcopy(config))
+    assert len(harness.agent.criteria_container.devices) == 30
+    records = generate_recording(config, START, minutes=6, extra_points=5)
+    assert len(records) == 6 * 31
+    report = harness.replay(records)
+    assert report["latency"]["new_data"]["count"] == 6 * 30
+    assert report["decisions"] > 0
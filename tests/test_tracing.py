@@ -0,0 +1,74 @@
+import pytest
+
+from ilc.replay import ReplayHarness
+from ilc.tracing import DEFAULT_TRACE_RATES, Tracer
+
+from test_replay import agent_config, recording
+
+
+class CountingValue(object):
+    def __init__(self):
+        self.formatted = 0
+
+    def __format__(self, spec):
+        self.formatted += 1
+        return "value"
+
+
+def test_formatting_is_deferred_until_dump():
+    value = CountingValue()
+    trace = Tracer()
+    trace.trace("event", "Value: {}", value)
+    assert value.formatted == 0
+    assert trace.dump()["events"][0]["message"] == "Value: value"
+    assert value.formatted == 1
+
+
+def test_sampling_rate_per_event_type():
+    trace = Tracer(rates={"sampled": 0.25})
+    for index in range(20):
+        trace.trace("sampled", "{}", index)
+        trace.trace("full", "{}", index)
+    dump = trace.dump(event="sampled")
+    assert [event["message"] for event in dump["events"]] == ["3", "7", "11", "15", "19"]
+    assert dump["counts"] == {"sampled": {"seen": 20, "recorded": 5}, "full": {"seen": 20, "recorded": 20}}
+    with pytest.raises(ValueError):
+        trace.set_rate("sampled", 2.0)
+
+
+def test_hot_events_are_sampled_by_default():
+    trace = Tracer()
+    for index in range(200):
+        trace.trace("new_data", "{}", index)
+    assert trace.dump()["counts"]["new_data"] == {"seen": 200, "recorded": 2}
+    trace.configure(rates={"new_data": 1.0})
+    assert trace.dump()["rates"] == dict(DEFAULT_TRACE_RATES, new_data=1.0)
+
+
+def test_ring_buffer_keeps_newest_events():
+    trace = Tracer(capacity=5)
+    for index in range(8):
+        trace.trace("event", "{}", index)
+    assert [event["message"] for event in trace.dump()["events"]] == ["3", "4", "5", "6", "7"]
+    trace.configure(capacity=2)
+    assert [event["message"] for event in trace.dump(limit=5)["events"]] == ["6", "7"]
+    assert trace.dump(limit=0)["events"] == []
+
+
+def test_agent_trace_dump():
+    config = agent_config()
+    config["trace_sample_rates"] = {"new_data": 0.5, "device_status": 1.0}
+    harness = ReplayHarness(config)
+    other = ReplayHarness(agent_config())
+    harness.replay(recording())
+    dump = harness.agent.get_trace(event="new_data", limit=3)
+    assert len(dump["events"]) == 3
+    assert dump["events"][-1]["message"].startswith("Data Received for devices/CAMPUS/BUILDING/")
+    assert dump["counts"]["new_data"] == {"seen": 40, "recorded": 20}
+    assert dump["counts"]["device_status"]["recorded"] == 40
+    # Each agent has its own tracer.
+    assert "new_data" not in other.agent.get_trace()["counts"]
+    harness.agent.set_trace_rate("device_status", 0.0)
+    harness.replay(recording())
+    assert harness.agent.get_trace()["counts"]["device_status"]["recorded"] == 40
+    assert other.agent.tracer.rates["device_status"] == DEFAULT_TRACE_RATES["device_status"]
@@ -0,0 +1,42 @@
+import re
+
+import pytest
+
+from ilc.utils import TextNormalizer, clean_text, create_device_topic_map, parse_sympy
+
+
+def legacy_clean_text(text, rep=None):
+    rep = rep if rep else {" ": ""}
+    rep = dict((re.escape(k), v) for k, v in rep.items())
+    pattern = re.compile("|".join(rep.keys()))
+    return pattern.sub(lambda m: rep[re.escape(m.group(0))], text)
+
+
+NAMES = ["ZoneTemperature", "Zone Temperature", " Leading and trailing ", "Analog Value 12", "",
+         "Supply-Air.Temp (F)", "Zone  Temperature\tSetPoint"]
+REPLACEMENTS = [None, {" ": "_"}, {" ": "", "-": "_", ".": ""}, {"Temp": "Temperature", " ": ""},
+                {"(F)": "", " ": "", "Supply-Air": "SA"}]
+
+
+@pytest.mark.parametrize("rep", REPLACEMENTS)
+def test_matches_legacy_clean_text(rep):
+    for name in NAMES:
+        assert clean_text(name, rep) == legacy_clean_text(name, rep)
+        # Second call is served from the memo.
+        assert clean_text(name, rep) == legacy_clean_text(name, rep)
+
+
+def test_memo_is_bounded():
+    normalizer = TextNormalizer(cache_size=10)
+    for i in range(100):
+        assert normalizer("Point {}".format(i)) == "Point{}".format(i)
+    assert len(normalizer.cache) == 10
+
+
+def test_parse_sympy_and_topic_map():
+    assert parse_sympy({"Zone Temperature": 1}) == {"ZoneTemperature": 1}
+    assert parse_sympy(["Zone Temperature > 70", "&", "Fan Status"], condition=True) == \
+        "(ZoneTemperature>70)&(FanStatus)"
+    assert create_device_topic_map(["Zone Temperature", ["CAMPUS/AHU1", "Fan Status"]], "CAMPUS/RTU1") == (
+        {"CAMPUS/RTU1/ZoneTemperature": "ZoneTemperature", "CAMPUS/AHU1/FanStatus": "FanStatus"},
+        {"CAMPUS/RTU1", "CAMPUS/AHU1"})